@@ -0,0 +1,56 @@
+from multiprocessing import cpu_count
+from os import environ, getenv
+from pathlib import Path
+from shutil import rmtree
+
+# ? Приложение загружается в мастере один раз, воркеры получают его через fork.
+# ? Поэтому kill -HUP перезапускает воркеры со старым кодом: после выкладки нужен
+# ? полный перезапуск, а для выкладки через HUP - GUNICORN_PRELOAD=0
+wsgi_app = "configs.asgi:application"
+chdir = "src"
+preload_app = getenv("GUNICORN_PRELOAD", "1") == "1"
+
+bind = getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn_worker.UvicornWorker"
+# ? Воркеры асинхронные, а CPU уходит в пул хеширования - по одному на ядро
+workers = int(getenv("GUNICORN_WORKERS", 0)) or cpu_count()
+
+# ? Перезапуск воркеров после N запросов ограничивает рост памяти,
+# ? jitter не даёт им перезапуститься одновременно
+max_requests = int(getenv("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(getenv("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+timeout = int(getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+# ? Дольше keepalive_timeout в upstream nginx, чтобы соединение закрывал nginx
+keepalive = int(getenv("GUNICORN_KEEPALIVE", 75))
+
+accesslog = getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+# ? Метрики всех воркеров в общем каталоге: /metrics любого воркера отдаёт их
+# ? сумму. Задаётся до загрузки приложения, prometheus_client читает его при импорте
+environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-metrics")
+
+
+def on_starting(server) -> None:
+    # ? Файлы прошлого запуска дали бы счётчикам лишнее
+    directory = Path(environ["PROMETHEUS_MULTIPROC_DIR"])
+    rmtree(directory, ignore_errors=True)
+    directory.mkdir(parents=True)
+
+
+def child_exit(server, worker) -> None:
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker) -> None:
+    # ? Пул хеширования поднимается в каждом воркере после fork, а не в мастере
+    from api.utils.hash_utils import CON, hash_pool
+
+    if not CON.HASH_WORKERS:
+        # ? Ядра делятся между воркерами, а не отдаются целиком каждому
+        hash_pool.resize(workers=max(1, cpu_count() // workers))
+    hash_pool.start()
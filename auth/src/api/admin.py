@@ -1 +1,10 @@
 from django.contrib import admin
+
+from .models import ProfilingRule
+
+
+@admin.register(ProfilingRule)
+class ProfilingRuleAdmin(admin.ModelAdmin):
+    list_display = ("view_name", "sample_rate", "is_active", "updated_at")
+    list_editable = ("sample_rate", "is_active")
+    search_fields = ("view_name",)
@@ -1,9 +1,9 @@
-from drf_yasg import openapi
-from drf_yasg.utils import swagger_auto_schema
+from .doc_utils import swagger_schema
 
 
-def signup_swagger_schema():
-    return swagger_auto_schema(
+@swagger_schema
+def signup_swagger_schema(openapi):
+    return dict(
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             required=["email", "password"],
@@ -66,8 +66,9 @@ def signup_swagger_schema():
     )
 
 
-def signin_swagger_schema():
-    return swagger_auto_schema(
+@swagger_schema
+def signin_swagger_schema(openapi):
+    return dict(
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             required=["email", "password"],
@@ -131,8 +132,9 @@ def signin_swagger_schema():
     )
 
 
-def refresh_token_swagger_schema():
-    return swagger_auto_schema(
+@swagger_schema
+def refresh_token_swagger_schema(openapi):
+    return dict(
         manual_parameters=[
             openapi.Parameter(
                 name="Authorization",
@@ -183,8 +185,9 @@ def refresh_token_swagger_schema():
     )
 
 
-def logout_swagger_schema():
-    return swagger_auto_schema(
+@swagger_schema
+def logout_swagger_schema(openapi):
+    return dict(
         manual_parameters=[
             openapi.Parameter(
                 name="Authorization",
@@ -0,0 +1,34 @@
+from functools import wraps
+
+from django.conf import settings
+
+
+def swagger_schema(function):
+    """
+    Декоратор описаний схемы: drf_yasg импортируется только при
+    API_DOCS_LIVE, в остальных случаях декоратор ничего не делает.
+    """
+
+    @wraps(function)
+    def wrapper():
+        if not settings.API_DOCS_LIVE:
+            return lambda view: view
+        from drf_yasg import openapi
+        from drf_yasg.utils import swagger_auto_schema
+
+        return swagger_auto_schema(**function(openapi))
+
+    return wrapper
+
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="VideoRazer backend API",
+        default_version="v1",
+        description="VideoRazer backend",
+        terms_of_service="https://www.org.com",
+        contact=openapi.Contact(email="org@gmail.com"),
+        license=openapi.License(name="Org License"),
+    )
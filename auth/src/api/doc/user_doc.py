@@ -0,0 +1,119 @@
+from .doc_utils import swagger_schema
+
+
+@swagger_schema
+def users_batch_swagger_schema(openapi):
+    return dict(
+        manual_parameters=[
+            openapi.Parameter(
+                name="X-Service-Key",
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                description="Ключ внутреннего сервиса",
+                required=True,
+            ),
+            openapi.Parameter(
+                name="ids",
+                in_=openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                description="ID пользователей через запятую (для GET)",
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Данные пользователей",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "users": openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                        ),
+                        "missing": openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                        ),
+                    },
+                ),
+                headers={
+                    "ETag": openapi.Parameter(
+                        name="ETag",
+                        in_=openapi.IN_HEADER,
+                        type=openapi.TYPE_STRING,
+                        description="Хеш ответа для If-None-Match",
+                    )
+                },
+            ),
+            304: openapi.Response(description="Данные не изменились"),
+            400: openapi.Response(
+                description="Данные запроса некорректны",
+                examples={"application/json": {"error": "Неверный запрос"}},
+            ),
+            401: openapi.Response(
+                description="Неверный ключ сервиса",
+                examples={"application/json": {"error": "Невалидный токен"}},
+            ),
+        },
+        operation_description="Данные нескольких пользователей для других сервисов",
+    )
+
+
+@swagger_schema
+def session_generation_swagger_schema(openapi):
+    return dict(
+        manual_parameters=[
+            openapi.Parameter(
+                name="X-Service-Key",
+                in_=openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                description="Ключ внутреннего сервиса",
+                required=True,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Текущее поколение сессии",
+                examples={"application/json": {"generation": 3}},
+            ),
+            401: openapi.Response(
+                description="Неверный ключ сервиса",
+                examples={"application/json": {"error": "Невалидный токен"}},
+            ),
+            404: openapi.Response(
+                description="Пользователь не найден",
+                examples={"application/json": {"error": "Не найдено"}},
+            ),
+        },
+        operation_description="Поколение сессии пользователя для других сервисов",
+    )
+
+
+@swagger_schema
+def avatar_swagger_schema(openapi):
+    return dict(
+        manual_parameters=[
+            openapi.Parameter(
+                name="avatar",
+                in_=openapi.IN_FORM,
+                type=openapi.TYPE_FILE,
+                description="Изображение .jpg, .jpeg или .png до 5MB",
+                required=True,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Аватар принят, уменьшенные копии строятся в фоне",
+                examples={
+                    "application/json": {
+                        "avatarPath": "/media/avatars/staging/1f0e.jpg"
+                    }
+                },
+            ),
+            400: openapi.Response(
+                description="Файла нет или он не является изображением",
+                examples={"application/json": {"error": "Недостаточно данных"}},
+            ),
+            401: openapi.Response(description="Пользователь не авторизован"),
+        },
+        operation_description="Загрузка аватара текущего пользователя",
+    )
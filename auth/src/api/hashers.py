@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+class TieredHasherMixin:
+    """
+    Берёт параметры стоимости из PASSWORD_HASH_TIERS.
+
+    Если алгоритм уровня не совпадает с алгоритмом хешера, используются
+    значения по умолчанию: такой хешер нужен только для проверки старых
+    хешей перед их пересчётом.
+    """
+
+    tier = None
+
+    def tier_param(self, name: str, default: int) -> int:
+        params = settings.PASSWORD_HASH_TIERS[self.tier or settings.PASSWORD_HASH_TIER]
+        if params["algorithm"] != self.algorithm:
+            return default
+        return params.get(name, default)
+
+
+class TieredPBKDF2PasswordHasher(TieredHasherMixin, PBKDF2PasswordHasher):
+    @property
+    def iterations(self) -> int:
+        return self.tier_param("iterations", PBKDF2PasswordHasher.iterations)
+
+
+class TieredScryptPasswordHasher(TieredHasherMixin, ScryptPasswordHasher):
+    @property
+    def work_factor(self) -> int:
+        return self.tier_param("work_factor", ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self) -> int:
+        return self.tier_param("block_size", ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self) -> int:
+        return self.tier_param("parallelism", ScryptPasswordHasher.parallelism)
+
+
+class TieredArgon2PasswordHasher(TieredHasherMixin, Argon2PasswordHasher):
+    @property
+    def time_cost(self) -> int:
+        return self.tier_param("time_cost", Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self) -> int:
+        return self.tier_param("memory_cost", Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self) -> int:
+        return self.tier_param("parallelism", Argon2PasswordHasher.parallelism)
+
+
+TIERED_HASHERS = {
+    hasher.algorithm: hasher
+    for hasher in (
+        TieredPBKDF2PasswordHasher,
+        TieredScryptPasswordHasher,
+        TieredArgon2PasswordHasher,
+    )
+}
+
+
+def hasher_for_tier(tier: str):
+    hasher = TIERED_HASHERS[settings.PASSWORD_HASH_TIERS[tier]["algorithm"]]()
+    hasher.tier = tier
+    return hasher
@@ -0,0 +1,303 @@
+import subprocess
+from datetime import datetime, timezone
+from json import dumps, loads
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Barrier, Thread
+from time import perf_counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from ...utils.auth_utils import JWTAuth
+from ...utils.benchmark_utils import (
+    HttpTransport,
+    LocalTransport,
+    Sample,
+    compare_results,
+    summarize,
+)
+
+SCENARIOS = ("signup", "signin", "refresh", "logout", "authenticate", "users-batch")
+PASSWORD = "benchmark-password"
+
+
+class Worker:
+    """Состояние одного потока: свой пользователь и свои токены."""
+
+    def __init__(self, transport, run_id: str, index: int, service_key: str) -> None:
+        self.transport = transport
+        self.email = f"bench-{run_id}-{index}@example.com"
+        self.run_id = run_id
+        self.index = index
+        self.service_key = service_key
+        self.user_id = None
+        self.token = None
+        self.access = None
+        self.counter = 0
+
+    def post(self, viewname: str, data=None, token: str = None):
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        return self.transport.request(
+            method="POST", path=reverse(viewname), data=data, headers=headers
+        )
+
+    def signin(self) -> Sample:
+        data = {"email": self.email, "password": PASSWORD}
+        sample, body = self.post("sign-in", data=data)
+        self.token = body.get("token")
+        self.user_id = body.get("userData", {}).get("id")
+        client = getattr(self.transport, "client", None)
+        if client is not None and "token" in client.cookies:
+            self.access = client.cookies["token"].value
+        return sample
+
+    def prepare(self) -> None:
+        data = {"email": self.email, "password": PASSWORD, "name": "bench"}
+        sample, _ = self.post("sign-up", data=data)
+        if sample.status >= 400:
+            raise CommandError(f"Sign-up for {self.email} failed: {sample.status}")
+        self.signin()
+
+    # ? Каждый метод run_* выполняет одну замеряемую операцию
+
+    def run_signup(self) -> Sample:
+        self.counter += 1
+        email = f"bench-{self.run_id}-{self.index}-{self.counter}@example.com"
+        data = {"email": email, "password": PASSWORD, "name": "bench"}
+        return self.post("sign-up", data=data)[0]
+
+    def run_signin(self) -> Sample:
+        return self.signin()
+
+    def run_refresh(self) -> Sample:
+        sample, body = self.post("refresh", token=self.token)
+        self.token = body.get("token", self.token)
+        return sample
+
+    def run_logout(self) -> Sample:
+        # ? Выход закрывает сессию, поэтому вход перед ним не замеряется
+        self.signin()
+        return self.post("logout", token=self.token)[0]
+
+    def run_authenticate(self) -> Sample:
+        request = RequestFactory().get("/")
+        request.COOKIES["token"] = self.access
+        started = perf_counter()
+        try:
+            JWTAuth().authenticate(request=request)
+            status = 200
+        except Exception:
+            status = 401
+        return Sample(perf_counter() - started, status, None)
+
+    def run_users_batch(self) -> Sample:
+        path = f"{reverse('users-batch')}?ids={self.user_id}"
+        headers = {"X-Service-Key": self.service_key}
+        return self.transport.request(method="GET", path=path, headers=headers)[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный замер эндпоинтов auth: задержки p50/p95/p99, "
+        "пропускная способность и число SQL-запросов"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--scenarios",
+            nargs="+",
+            default=list(SCENARIOS),
+            choices=SCENARIOS,
+            help="Сценарии для замера (по умолчанию все)",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=4, help="Число параллельных потоков"
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=50,
+            help="Запросов на поток в каждом сценарии",
+        )
+        parser.add_argument(
+            "--base-url",
+            help="Адрес запущенного стека; без него замер идёт в процессе "
+            "на временной тестовой базе",
+        )
+        parser.add_argument(
+            "--service-key",
+            default="benchmark-service-key",
+            help="X-Service-Key для users-batch (в режиме --base-url)",
+        )
+        parser.add_argument(
+            "--fast-hasher",
+            action="store_true",
+            help="MD5 вместо настоящего хешера: замер без стоимости хеширования",
+        )
+        parser.add_argument("--output", help="Файл для результатов в JSON")
+        parser.add_argument("--compare", help="JSON прошлого запуска для сравнения")
+        parser.add_argument(
+            "--fail-threshold",
+            type=float,
+            help=(
+                "Ошибка, если p95 любого сценария вырос больше чем на N процентов "
+                "или выросла доля ошибок"
+            ),
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["base_url"]:
+            scenarios = [s for s in options["scenarios"] if s != "authenticate"]
+            results = self.run(options=options, scenarios=scenarios)
+        else:
+            results = self.run_local(options=options)
+
+        self.report(results=results)
+        if options["output"]:
+            Path(options["output"]).write_text(dumps(results, indent=2))
+            self.stdout.write(f"saved to {options['output']}")
+        if options["compare"]:
+            baseline = loads(Path(options["compare"]).read_text())
+            self.report_comparison(
+                baseline=baseline,
+                results=results,
+                threshold=options["fail_threshold"],
+            )
+
+    def run_local(self, options: dict) -> dict:
+        # ? Отдельная тестовая база: рабочие данные не трогаются
+        # ? Без ограничений частоты: иначе замеряются ответы 429
+        overrides = {"SERVICE_API_KEY": options["service_key"], "THROTTLE_RATES": {}}
+        if options["fast_hasher"]:
+            overrides["PASSWORD_HASHERS"] = [
+                "django.contrib.auth.hashers.MD5PasswordHasher"
+            ]
+        setup_test_environment()
+        with TemporaryDirectory() as directory, override_settings(**overrides):
+            if connection.vendor == "sqlite":
+                # ? Файловая база вместо :memory:, чтобы потоки работали параллельно
+                test_name = str(Path(directory) / "benchmark.sqlite3")
+                connection.settings_dict["TEST"]["NAME"] = test_name
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                return self.run(options=options, scenarios=options["scenarios"])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+
+    def run(self, options: dict, scenarios: list[str]) -> dict:
+        concurrency = options["concurrency"]
+        run_id = uuid4().hex[:8]
+        if options["base_url"]:
+            transports = [
+                HttpTransport(base_url=options["base_url"]) for _ in range(concurrency)
+            ]
+        else:
+            transports = [LocalTransport() for _ in range(concurrency)]
+        workers = [
+            Worker(transport, run_id, index, options["service_key"])
+            for index, transport in enumerate(transports)
+        ]
+        for worker in workers:
+            worker.prepare()
+
+        results = {
+            "timestamp": datetime.now(tz=timezone.utc).isoformat(),
+            "commit": self.commit(),
+            "mode": "http" if options["base_url"] else "local",
+            "concurrency": concurrency,
+            "requests_per_worker": options["requests"],
+            "fast_hasher": options["fast_hasher"],
+            "scenarios": {},
+        }
+        for scenario in scenarios:
+            results["scenarios"][scenario] = self.measure(
+                workers=workers, scenario=scenario, requests=options["requests"]
+            )
+        return results
+
+    def measure(self, workers: list[Worker], scenario: str, requests: int) -> dict:
+        method = f"run_{scenario.replace('-', '_')}"
+        samples = [[] for _ in workers]
+        barrier = Barrier(len(workers) + 1)
+
+        def target(index: int) -> None:
+            worker = workers[index]
+            # ? Свежая сессия: прошлый сценарий (logout, refresh) мог её закрыть
+            worker.signin()
+            barrier.wait()
+            try:
+                for _ in range(requests):
+                    samples[index].append(getattr(worker, method)())
+            finally:
+                connection.close()
+
+        threads = [Thread(target=target, args=(i,)) for i in range(len(workers))]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - started
+        return summarize(
+            samples=[sample for thread in samples for sample in thread],
+            elapsed=elapsed,
+        )
+
+    def commit(self) -> str | None:
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, results: dict) -> None:
+        self.stdout.write(
+            f"mode: {results['mode']}, concurrency: {results['concurrency']}, "
+            f"commit: {results['commit']}"
+        )
+        for name, stats in results["scenarios"].items():
+            queries = stats["queries_mean"]
+            self.stdout.write(
+                f"{name:<13} {stats['throughput']:>8.1f} req/s "
+                f"p50 {stats['p50_ms']:>7.1f} p95 {stats['p95_ms']:>7.1f} "
+                f"p99 {stats['p99_ms']:>7.1f} ms "
+                f"queries {'-' if queries is None else f'{queries:.1f}':>5} "
+                f"errors {stats['errors']}"
+            )
+
+    def report_comparison(self, baseline: dict, results: dict, threshold) -> None:
+        def fmt(value) -> str:
+            return "-" if value is None else f"{value:+.1f}%"
+
+        self.stdout.write(f"compared with {baseline.get('commit')}:")
+        regressions = []
+        for row in compare_results(baseline=baseline, current=results):
+            self.stdout.write(
+                f"{row['scenario']:<13} p95 {fmt(row['p95_delta']):>8} "
+                f"throughput {fmt(row['throughput_delta']):>8} "
+                f"queries {fmt(row['queries_delta']):>8} "
+                f"errors {row['error_rate_delta']:+.1f} pp"
+            )
+            if threshold is None:
+                continue
+            if (row["p95_delta"] or 0) > threshold:
+                regressions.append(f"{row['scenario']} (p95)")
+            if row["error_rate_delta"] > 0:
+                regressions.append(f"{row['scenario']} (errors)")
+        if regressions:
+            raise CommandError(f"Regression in: {', '.join(regressions)}")
@@ -0,0 +1,75 @@
+from json import dumps
+from os import cpu_count
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...hashers import hasher_for_tier
+
+
+class Command(BaseCommand):
+    help = "Замеряет скорость хеширования паролей для уровней PASSWORD_HASH_TIERS"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--tiers",
+            nargs="+",
+            default=list(settings.PASSWORD_HASH_TIERS),
+            help="Уровни для замера (по умолчанию все)",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=2.0,
+            help="Время замера одного уровня в секундах",
+        )
+        parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+
+    def handle(self, *args, **options) -> None:
+        cores = cpu_count() or 1
+        results = [
+            self.measure(tier=tier, duration=options["duration"], cores=cores)
+            for tier in options["tiers"]
+        ]
+        if options["json"]:
+            self.stdout.write(dumps({"cores": cores, "results": results}, indent=2))
+            return
+        self.stdout.write(f"cores: {cores}")
+        for result in results:
+            if "error" in result:
+                self.stdout.write(
+                    f"{result['tier']:<10} unavailable: {result['error']}"
+                )
+                continue
+            self.stdout.write(
+                f"{result['tier']:<10} {result['algorithm']:<14} "
+                f"{result['ms_per_hash']:>8.1f} ms/hash "
+                f"{result['hashes_per_second_per_core']:>8.2f} hash/s/core "
+                f"{result['estimated_hashes_per_second']:>8.2f} hash/s est. total"
+            )
+
+    def measure(self, tier: str, duration: float, cores: int) -> dict:
+        hasher = hasher_for_tier(tier=tier)
+        result = {"tier": tier, "algorithm": hasher.algorithm}
+        try:
+            hasher.encode(password="benchmark", salt=hasher.salt())
+        except ValueError as e:
+            result["error"] = str(e)
+            return result
+        count = 0
+        started = perf_counter()
+        while True:
+            hasher.encode(password="benchmark", salt=hasher.salt())
+            count += 1
+            elapsed = perf_counter() - started
+            if elapsed >= duration:
+                break
+        per_core = count / elapsed
+        result.update(
+            hashes=count,
+            ms_per_hash=elapsed / count * 1000,
+            hashes_per_second_per_core=per_core,
+            estimated_hashes_per_second=per_core * cores,
+        )
+        return result
@@ -0,0 +1,158 @@
+import subprocess
+import sys
+from json import dumps, loads
+from os import environ
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Barrier, Thread
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from razer_common.db import SQLITE_PROFILES
+
+from ...models import User
+
+PASSWORD = "benchmark-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность входа при разных SQLITE_PROFILE "
+        "на параллельных потоках"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            default=["journal", "default", "performance"],
+            choices=list(SQLITE_PROFILES),
+            help="Профили SQLite для сравнения",
+        )
+        parser.add_argument("--threads", type=int, default=8, help="Число потоков")
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=5.0,
+            help="Время замера одного профиля в секундах",
+        )
+        parser.add_argument(
+            "--session-mode",
+            default=settings.CONSTANTS.SESSION_MODE,
+            choices=["generation", "table"],
+            help="Режим сессий: UPDATE поколения или TokenSession",
+        )
+        parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+        # ? Внутренний режим: замер в отдельном процессе с уже заданным профилем
+        parser.add_argument("--worker", action="store_true", help="Служебный")
+
+    def handle(self, *args, **options) -> None:
+        if options["worker"]:
+            result = self.measure(
+                threads=options["threads"], duration=options["duration"]
+            )
+            self.stdout.write(dumps(result))
+            return
+
+        results = [
+            self.run_profile(profile=p, options=options) for p in options["profiles"]
+        ]
+        if options["json"]:
+            self.stdout.write(dumps({"results": results}, indent=2))
+            return
+        self.stdout.write(
+            f"threads: {options['threads']}, session mode: {options['session_mode']}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['profile']:<12} {result['signins_per_second']:>9.1f} sign-in/s "
+                f"{result['p95_ms']:>8.1f} ms p95 {result['errors']:>6} errors"
+            )
+
+    def run_profile(self, profile: str, options: dict) -> dict:
+        # ? Настройки базы читаются при старте, поэтому каждый профиль - свой процесс
+        with TemporaryDirectory() as directory:
+            env = {
+                **environ,
+                "DB_ENGINE": "sqlite",
+                "SQLITE_PROFILE": profile,
+                "DB_SQLITE_PATH": str(Path(directory) / "benchmark.sqlite3"),
+                "SESSION_MODE": options["session_mode"],
+            }
+            process = subprocess.run(
+                [
+                    sys.executable,
+                    str(Path(settings.BASE_DIR) / "manage.py"),
+                    "benchmark_sqlite",
+                    "--worker",
+                    f"--threads={options['threads']}",
+                    f"--duration={options['duration']}",
+                ],
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+        if process.returncode != 0:
+            raise CommandError(process.stderr)
+        return {"profile": profile, **loads(process.stdout.splitlines()[-1])}
+
+    def measure(self, threads: int, duration: float) -> dict:
+        call_command("migrate", verbosity=0)
+        # ? Быстрый хешер: замеряется работа с базой, а не PBKDF2
+        # ? Без ограничений частоты: иначе замеряются ответы 429
+        with override_settings(
+            PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+            THROTTLE_RATES={},
+        ):
+            emails = [f"bench{index}@example.com" for index in range(threads)]
+            for email in emails:
+                User().create_user(email=email, password=PASSWORD, name="bench")
+            connection.close()
+
+            latencies = [[] for _ in range(threads)]
+            errors = [0] * threads
+            barrier = Barrier(threads + 1)
+
+            def worker(index: int) -> None:
+                client = Client(HTTP_HOST="localhost")
+                data = {"email": emails[index], "password": PASSWORD}
+                barrier.wait()
+                deadline = perf_counter() + duration
+                try:
+                    while perf_counter() < deadline:
+                        started = perf_counter()
+                        response = client.post(
+                            reverse("sign-in"),
+                            data=data,
+                            content_type="application/json",
+                        )
+                        if response.status_code == 200:
+                            latencies[index].append(perf_counter() - started)
+                        else:
+                            errors[index] += 1
+                finally:
+                    connection.close()
+
+            workers = [Thread(target=worker, args=(i,)) for i in range(threads)]
+            for thread in workers:
+                thread.start()
+            barrier.wait()
+            started = perf_counter()
+            for thread in workers:
+                thread.join()
+            elapsed = perf_counter() - started
+
+        samples = sorted(sample for thread in latencies for sample in thread)
+        p95 = samples[int(len(samples) * 0.95)] if samples else 0
+        return {
+            "signins": len(samples),
+            "errors": sum(errors),
+            "signins_per_second": len(samples) / elapsed,
+            "p95_ms": p95 * 1000,
+        }
@@ -0,0 +1,52 @@
+import gzip
+from os import replace
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Собирает OpenAPI-схему и её сжатые варианты для OpenAPISchemaView"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--output",
+            default=str(settings.OPENAPI_DIR),
+            help="Каталог для openapi.json (по умолчанию OPENAPI_DIR)",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if not settings.API_DOCS_LIVE:
+            raise CommandError("drf_yasg is disabled, run with API_DOCS_LIVE=1")
+        from drf_yasg.codecs import OpenAPICodecJson
+        from drf_yasg.generators import OpenAPISchemaGenerator
+
+        from ...doc.doc_utils import api_info
+
+        schema = OpenAPISchemaGenerator(info=api_info()).get_schema(
+            request=None, public=True
+        )
+        content = OpenAPICodecJson(validators=[]).encode(schema)
+
+        output = Path(options["output"])
+        output.mkdir(parents=True, exist_ok=True)
+        variants = {
+            "openapi.json": content,
+            "openapi.json.gz": gzip.compress(content, compresslevel=9, mtime=0),
+        }
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+        if brotli is not None:
+            variants["openapi.json.br"] = brotli.compress(content, quality=11)
+        else:
+            # ? Устаревший .br от прошлой сборки не должен расходиться с json
+            (output / "openapi.json.br").unlink(missing_ok=True)
+
+        for name, data in variants.items():
+            temp = output / f".{name}.tmp"
+            temp.write_bytes(data)
+            replace(temp, output / name)
+            self.stdout.write(f"{output / name}: {len(data)} bytes")
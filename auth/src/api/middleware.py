@@ -0,0 +1,155 @@
+from hmac import compare_digest
+from logging import getLogger
+from random import random
+from threading import Lock, get_ident
+from time import monotonic, strftime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, resolve
+from razer_common.profiling import StackSampler, rotate, write_collapsed
+
+from .models import ProfilingRule
+
+logger = getLogger(__name__)
+
+CON = settings.CONSTANTS
+
+
+class ProfilingRules:
+    """Правила из админки, перечитываются не чаще раза в PROFILING_RULES_TTL."""
+
+    def __init__(self) -> None:
+        self._rules: dict[str, float] = {}
+        self._loaded_at = None
+        self._lock = Lock()
+
+    def get(self) -> dict[str, float]:
+        if self._claim_reload():
+            self._store(rules=dict(self._queryset()))
+        return self._rules
+
+    async def aget(self) -> dict[str, float]:
+        if self._claim_reload():
+            self._store(rules={name: rate async for name, rate in self._queryset()})
+        return self._rules
+
+    def rate(self, view_name: str) -> float:
+        return self.get().get(view_name, 0.0)
+
+    def _queryset(self):
+        return ProfilingRule.objects.filter(is_active=True).values_list(
+            "view_name", "sample_rate"
+        )
+
+    def _claim_reload(self) -> bool:
+        with self._lock:
+            stale = (
+                self._loaded_at is None
+                or monotonic() - self._loaded_at >= CON.PROFILING_RULES_TTL
+            )
+            if stale:
+                # ? Метку ставим до запроса, чтобы параллельные запросы не грузили их же
+                self._loaded_at = monotonic()
+        return stale
+
+    def _store(self, rules: dict[str, float]) -> None:
+        with self._lock:
+            self._rules = rules
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rules = {}
+            self._loaded_at = None
+
+
+profiling_rules = ProfilingRules()
+
+
+class ProfilingMiddleware:
+    """
+    Сэмплирующий профилировщик на запрос. Включается заголовком X-Profile
+    со значением PROFILING_TOKEN или правилом ProfilingRule для view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.start(request=request, rules=profiling_rules.get())
+        return self.finish(request=request, response=self.get_response(request))
+
+    async def __acall__(self, request):
+        self.start(request=request, rules=await profiling_rules.aget())
+        response = await self.get_response(request)
+        return self.finish(request=request, response=response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs) -> None:
+        """
+        Сэмплер запускается здесь, а не в __acall__: под ASGI синхронный view
+        выполняется в потоке sync_to_async, а не в потоке event loop. Django
+        вызывает синхронный process_view в том же потоке, что и такой view.
+        """
+        thread_id = getattr(request, "_profiling_thread", None)
+        if thread_id is None:
+            return None
+        if not iscoroutinefunction(view_func):
+            thread_id = get_ident()
+        request._profiling_sampler = StackSampler(
+            thread_id=thread_id, interval=CON.PROFILING_INTERVAL
+        ).start()
+        return None
+
+    def start(self, request, rules: dict[str, float]) -> None:
+        forced = self.is_forced(request=request)
+        if not forced:
+            if not rules:
+                return
+            try:
+                view_name = resolve(request.path_info).view_name
+            except Resolver404:
+                return
+            rate = rules.get(view_name, 0.0)
+            if rate <= 0 or random() * 100 >= rate:
+                return
+        request._profiling_forced = forced
+        request._profiling_started = monotonic()
+        # ? Поток middleware; асинхронный view выполняется в нём же
+        request._profiling_thread = get_ident()
+
+    def finish(self, request, response):
+        sampler = getattr(request, "_profiling_sampler", None)
+        if sampler is not None:
+            name = self.save(request=request, stacks=sampler.stop())
+            if name and request._profiling_forced:
+                response["X-Profile-File"] = name
+        return response
+
+    def is_forced(self, request) -> bool:
+        token = settings.PROFILING_TOKEN
+        header = request.headers.get("X-Profile")
+        return bool(token and header and compare_digest(header, token))
+
+    def save(self, request, stacks) -> str | None:
+        if not stacks:
+            return None
+        duration = monotonic() - request._profiling_started
+        match = request.resolver_match
+        view = match.view_name.replace(":", "_") if match else "unmatched"
+        name = f"{strftime('%Y%m%d-%H%M%S')}_{view}_{duration * 1000:.0f}ms.folded"
+        try:
+            directory = settings.PROFILING_DIR
+            directory.mkdir(parents=True, exist_ok=True)
+            write_collapsed(stacks=stacks, path=directory / name)
+            rotate(directory=directory, keep=CON.PROFILING_MAX_FILES)
+        except OSError:
+            logger.exception("Failed to save profile %s", name)
+            return None
+        return name
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_user_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='session_generation',
+            field=models.PositiveIntegerField(default=0, verbose_name='Поколение сессии'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+
+def normalize_emails(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    # ? Почты, отличающиеся только регистром, - разные аккаунты; какой из них
+    # ? оставить, решает человек, поэтому миграция останавливается до изменений
+    duplicates = list(
+        User.objects.values(normalized=Lower(Trim('email')))
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list('normalized', flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Emails differing only by case or spaces, merge or rename these '
+            'accounts before migrating: ' + ', '.join(sorted(duplicates))
+        )
+    User.objects.update(email=Lower(Trim('email')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_user_session_generation'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.CharField(max_length=100, unique=True, verbose_name='Почта'),
+        ),
+        migrations.AddIndex(
+            model_name='tokensession',
+            index=models.Index(fields=['user', 'created_date'], name='api_session_user_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='tokensession',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.user', verbose_name='Пользователь'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+def fill_password_algorithm(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    users = User.objects.only('id', 'password').iterator(chunk_size=2000)
+    batch = []
+    for user in users:
+        user.password_algorithm = user.password.split('$', 1)[0]
+        batch.append(user)
+        if len(batch) == 2000:
+            User.objects.bulk_update(batch, ['password_algorithm'])
+            batch = []
+    User.objects.bulk_update(batch, ['password_algorithm'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_user_email_unique_session_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='password_algorithm',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Алгоритм пароля'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='password_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата изменения пароля'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='password',
+            field=models.CharField(max_length=256, verbose_name='Пароль'),
+        ),
+        migrations.RunPython(fill_password_algorithm, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:12
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_avatar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(max_length=100, unique=True, verbose_name='Имя view')),
+                ('sample_rate', models.FloatField(default=1.0, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='Доля запросов, %')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Включено')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Правило профилирования',
+                'verbose_name_plural': 'Правила профилирования',
+                'ordering': ('view_name',),
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:20
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_profilingrule'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='api_user_email_lower_uniq'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.conf import settings
-from django.contrib.auth.hashers import make_password
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 CON = settings.CONSTANTS
 
@@ -16,11 +19,23 @@ class User(models.Model):
     )
     password = models.CharField(
         verbose_name="Пароль",
+        max_length=CON.PASSWORD_LEN,
+    )
+    password_algorithm = models.CharField(
+        verbose_name="Алгоритм пароля",
         max_length=CON.INITIALS_LEN,
+        blank=True,
+        default="",
+    )
+    password_updated_at = models.DateTimeField(
+        verbose_name="Дата изменения пароля",
+        null=True,
+        blank=True,
     )
     email = models.CharField(
         verbose_name="Почта",
         max_length=CON.INITIALS_LEN,
+        unique=True,
     )
     avatar = models.ImageField(
         verbose_name="Аватар",
@@ -46,6 +61,10 @@ class User(models.Model):
         verbose_name="Актитивен",
         default=False,
     )
+    session_generation = models.PositiveIntegerField(
+        verbose_name="Поколение сессии",
+        default=0,
+    )
 
     @classmethod
     def create_user(
@@ -55,18 +74,53 @@ class User(models.Model):
         name: str,
         role: str = None,
     ):
-        user = self.objects.create(
-            email=email,
+        user = self(
+            email=self.normalize_email(email=email),
             name=name,
-            password=make_password(password=password),
             role=role,
         )
+        user.set_password(password=password)
+        user.save(force_insert=True)
         return user
 
+    @classmethod
+    def get_by_id(self, id: int):
+        return self.objects.get(id=id)
+
+    @classmethod
+    def get_by_email(self, email: str):
+        return self.objects.get(email=self.normalize_email(email=email))
+
+    def set_password(self, password: str, encoded: str = None) -> None:
+        self.password = encoded or make_password(password=password)
+        self.password_algorithm = identify_hasher(encoded=self.password).algorithm
+        self.password_updated_at = timezone.now()
+
+    def check_password(self, password: str) -> bool:
+        # ? Хеш старого алгоритма или стоимости пересчитывается при входе
+        def setter(password: str) -> None:
+            self.set_password(password=password)
+            self.save(
+                update_fields=("password", "password_algorithm", "password_updated_at")
+            )
+
+        return check_password(password=password, encoded=self.password, setter=setter)
+
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        return email.strip().lower()
+
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователь"
         ordering = ("id",)
+        constraints = (
+            # ? Запись мимо normalize_email (админка, shell) не создаст A@x рядом с a@x
+            models.UniqueConstraint(
+                Lower("email"),
+                name="api_user_email_lower_uniq",
+            ),
+        )
 
 
 class TokenSession(models.Model):
@@ -74,6 +128,7 @@ class TokenSession(models.Model):
         verbose_name="Пользователь",
         to=User,
         on_delete=models.CASCADE,
+        db_index=False,
     )
     created_date = models.DateTimeField(
         verbose_name="Дата создания",
@@ -84,3 +139,55 @@ class TokenSession(models.Model):
         verbose_name = "Сессия"
         verbose_name_plural = "Сессии"
         ordering = ("created_date",)
+        indexes = (
+            models.Index(
+                fields=("user", "created_date"),
+                name="api_session_user_created_idx",
+            ),
+        )
+
+
+class Avatar(models.Model):
+    digest = models.CharField(
+        verbose_name="SHA-256",
+        max_length=64,
+        primary_key=True,
+    )
+    ref_count = models.PositiveIntegerField(
+        verbose_name="Количество ссылок",
+        default=0,
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Дата создания",
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = "Аватар"
+        verbose_name_plural = "Аватары"
+
+
+class ProfilingRule(models.Model):
+    view_name = models.CharField(
+        verbose_name="Имя view",
+        max_length=CON.INITIALS_LEN,
+        unique=True,
+    )
+    sample_rate = models.FloatField(
+        verbose_name="Доля запросов, %",
+        default=1.0,
+        validators=(MinValueValidator(0), MaxValueValidator(100)),
+    )
+    is_active = models.BooleanField(
+        verbose_name="Включено",
+        default=True,
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="Дата изменения",
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = "Правило профилирования"
+        verbose_name_plural = "Правила профилирования"
+        ordering = ("view_name",)
@@ -1,17 +1,61 @@
-from os import makedirs, path, remove
+import gzip
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from json import loads
+from tempfile import mkdtemp
+from shutil import rmtree
+from os import environ, listdir, makedirs, path, remove
+from pathlib import Path
+from subprocess import run
+from sys import executable
+from unittest import mock
 
+from asgiref.sync import iscoroutinefunction
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.http import HttpResponse
+from django.test import override_settings
 from django.urls import reverse
+from django.utils.translation import gettext_lazy
 from django.conf import settings
 from PIL import Image
+from razer_common.db import ReplicaRouter, database_settings, use_replica
+from razer_common.fastjson import FastJSONParser, FastJSONRenderer
+from razer_common.jwt_verify import session_generation_key
+from razer_common.metrics import registry
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
 
-from .models import User
+from .middleware import ProfilingMiddleware, profiling_rules
+from .models import Avatar, ProfilingRule, User
+from .utils.auth_utils import JWTAuth
+from .utils.benchmark_utils import Sample, compare_results, percentile, summarize
+from .utils.hash_utils import hash_pool
+from .utils.token_utils import CON, token_cache
+from .utils.throttle_utils import LocalBucketStore, local_store
+from .utils.user_utils import handle_avatar_upload, user_info, validate_avatar
 
 RESP = settings.RESPONSES
 max_id = 0
 
+# ? Ограничения частоты проверяются только в ThrottleTests
+no_throttling = override_settings(THROTTLE_RATES={})
+
+
+def setUpModule() -> None:
+    no_throttling.enable()
+
+
+def tearDownModule() -> None:
+    no_throttling.disable()
+
 
 class TestUtils:
     USER_DATA = {
@@ -20,6 +64,12 @@ class TestUtils:
         "name": "test",
     }
 
+    def assertViewQueries(self, num: int):
+        # ? Правила профилирования перечитываются раз в PROFILING_RULES_TTL,
+        # ? их запрос не должен попадать в замер view
+        profiling_rules.get()
+        return self.assertNumQueries(num)
+
     def signin(self, email: str, password: str) -> HttpResponse:
         signin_url = reverse(viewname="sign-in")
         data = {"email": email, "password": password}
@@ -83,6 +133,20 @@ class SignUpTests(APITestCase, TestUtils):
             RESP.ALREADY_EXISTS.data,
         )
 
+    def test_existing_email_other_case_signup(self) -> None:
+        User().create_user(email="test@test.test", password="test", name="test")
+        data = dict(self.USER_DATA, email=" Test@TEST.test")
+        response = self.client.post(path=self.url, data=data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, RESP.ALREADY_EXISTS.data)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_email_unique_ignoring_case_in_database(self) -> None:
+        User().create_user(email="test@test.test", password="test", name="test")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create(email="Test@TEST.test", password="test", name="test")
+        self.assertEqual(User.objects.count(), 1)
+
 
 class SignInTests(APITestCase, TestUtils):
     def setUp(self) -> None:
@@ -100,6 +164,15 @@ class SignInTests(APITestCase, TestUtils):
         self.assertEqual(User.objects.count(), 1)
         self.assertEqual(User.objects.get().email, self.USER_DATA["email"])
 
+    def test_signin_email_case_insensitive(self) -> None:
+        self.signup_brand(
+            email=self.USER_DATA["email"],
+            password=self.USER_DATA["password"],
+        )
+        data = dict(self.USER_DATA, email=self.USER_DATA["email"].upper())
+        response = self.client.post(path=self.url, data=data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_missing_fields_signin(self) -> None:
         data = {"email": "test@test.com"}
         response = self.client.post(path=self.url, data=data, format="json")
@@ -183,3 +256,629 @@ class LogoutTests(APITestCase, TestUtils):
         headers = {"Authorization": "Bearer BAD_TOKEN"}
         response = self.client.post(path=self.url, format="json", headers=headers)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SESSION_CACHE_SHARED=True)
+class TokenCacheTests(APITestCase, TestUtils):
+    def setUp(self) -> None:
+        token_cache.clear()
+        self.factory = APIRequestFactory()
+        signin = self.signup_brand(
+            email=self.USER_DATA["email"],
+            password=self.USER_DATA["password"],
+        )
+        self.request = self.factory.get(path="/")
+        self.request.COOKIES["token"] = signin.cookies["token"].value
+
+    def test_repeat_authenticate_hits_cache(self) -> None:
+        user, _ = JWTAuth().authenticate(request=self.request)
+        with self.assertNumQueries(0):
+            cached_user, _ = JWTAuth().authenticate(request=self.request)
+        self.assertEqual(cached_user.id, user.id)
+
+    def test_cache_returns_fresh_user(self) -> None:
+        user, _ = JWTAuth().authenticate(request=self.request)
+        user.name = "changed"
+        cached_user, _ = JWTAuth().authenticate(request=self.request)
+        self.assertIsNot(cached_user, user)
+        self.assertEqual(cached_user.name, "name")
+        self.assertEqual(cached_user.avatar.name, user.avatar.name)
+
+    @override_settings(SESSION_CACHE_SHARED=False)
+    def test_cache_hit_checks_generation(self) -> None:
+        JWTAuth().authenticate(request=self.request)
+        # ? Ротация в другом воркере: его token_cache здесь не сбрасывается
+        User.objects.update(session_generation=F("session_generation") + 1)
+        with self.assertRaises(AuthenticationFailed):
+            JWTAuth().authenticate(request=self.request)
+
+    def test_new_session_invalidates_cache(self) -> None:
+        JWTAuth().authenticate(request=self.request)
+        self.signin(email=self.USER_DATA["email"], password=self.USER_DATA["password"])
+        with self.assertRaises(AuthenticationFailed):
+            JWTAuth().authenticate(request=self.request)
+
+
+class SessionGenerationTests(APITestCase, TestUtils):
+    def setUp(self) -> None:
+        self.refresh_url = reverse(viewname="refresh")
+
+    def test_signin_rotates_generation(self) -> None:
+        first = self.signup_brand(
+            email=self.USER_DATA["email"],
+            password=self.USER_DATA["password"],
+        )
+        generation = User.objects.get().session_generation
+        self.signin(email=self.USER_DATA["email"], password=self.USER_DATA["password"])
+        self.assertEqual(User.objects.get().session_generation, generation + 1)
+        headers = {"Authorization": "Bearer " + first.data["token"]}
+        response = self.client.post(path=self.refresh_url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SESSION_CACHE_SHARED=True)
+    def test_refresh_skips_session_table(self) -> None:
+        signin = self.signup_brand(
+            email=self.USER_DATA["email"],
+            password=self.USER_DATA["password"],
+        )
+        headers = {"Authorization": "Bearer " + signin.data["token"]}
+        with self.assertViewQueries(1):
+            response = self.client.post(path=self.refresh_url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_worker_cache_ignored_without_shared_cache(self) -> None:
+        signin = self.signup_brand(
+            email=self.USER_DATA["email"],
+            password=self.USER_DATA["password"],
+        )
+        user = User.objects.get()
+        # ? Поколение, оставшееся в LocMem другого воркера до ротации
+        key = session_generation_key(user_id=user.id)
+        caches["sessions"].set(key=key, value=user.session_generation - 1)
+        self.addCleanup(caches["sessions"].clear)
+        headers = {"Authorization": "Bearer " + signin.data["token"]}
+        response = self.client.post(path=self.refresh_url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(SERVICE_API_KEY="service-key")
+    def test_generation_for_services(self) -> None:
+        self.signup_brand(
+            email=self.USER_DATA["email"],
+            password=self.USER_DATA["password"],
+        )
+        user = User.objects.get()
+        url = reverse(viewname="session-generation", kwargs={"id": user.id})
+        headers = {"X-Service-Key": "service-key"}
+        response = self.client.get(path=url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"generation": user.session_generation})
+        response = self.client.get(path=url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        url = reverse(viewname="session-generation", kwargs={"id": user.id + 1})
+        response = self.client.get(path=url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @mock.patch.object(CON, "SESSION_MODE", "table")
+    def test_table_mode_refresh(self) -> None:
+        signin = self.signup_brand(
+            email=self.USER_DATA["email"],
+            password=self.USER_DATA["password"],
+        )
+        headers = {"Authorization": "Bearer " + signin.data["token"]}
+        response = self.client.post(path=self.refresh_url, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class AsyncAuthTests(APITestCase, TestUtils):
+    def setUp(self) -> None:
+        self.signup_url = reverse(viewname="sign-up-async")
+        self.signin_url = reverse(viewname="sign-in-async")
+
+    def test_async_signup_and_signin(self) -> None:
+        response = self.client.post(
+            path=self.signup_url,
+            data=self.USER_DATA,
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(member="token", container=response.json())
+        response = self.client.post(
+            path=self.signin_url,
+            data=self.USER_DATA,
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.cookies["token"])
+
+    def test_async_wrong_credentials(self) -> None:
+        User().create_user(**self.USER_DATA)
+        data = dict(self.USER_DATA, password="wrong")
+        response = self.client.post(
+            path=self.signin_url,
+            data=data,
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), RESP.INVALID_CRED.data)
+
+    @mock.patch.object(hash_pool, "capacity", 0)
+    def test_full_hash_pool_rejects(self) -> None:
+        User().create_user(**self.USER_DATA)
+        response = self.client.post(
+            path=self.signin_url,
+            data=self.USER_DATA,
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "1")
+
+
+class PasswordTests(APITestCase, TestUtils):
+    def test_set_and_check_password(self) -> None:
+        user = User().create_user(**self.USER_DATA)
+        self.assertEqual(user.password_algorithm, "pbkdf2_sha256")
+        self.assertIsNotNone(user.password_updated_at)
+        self.assertTrue(user.check_password(password=self.USER_DATA["password"]))
+        self.assertFalse(user.check_password(password="wrong"))
+
+    def test_rehash_on_signin(self) -> None:
+        with override_settings(PASSWORD_HASH_TIER="low"):
+            user = User().create_user(**self.USER_DATA)
+        self.assertIn("$300000$", user.password)
+        response = self.signin(
+            email=self.USER_DATA["email"],
+            password=self.USER_DATA["password"],
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertIn("$870000$", user.password)
+
+    def test_benchmark_hashers(self) -> None:
+        out = StringIO()
+        call_command("benchmark_hashers", tiers=["low"], duration=0.01, stdout=out)
+        self.assertIn("hash/s/core", out.getvalue())
+
+
+class AvatarTests(APITestCase, TestUtils):
+    def setUp(self) -> None:
+        self.media_root = mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.user = User().create_user(**self.USER_DATA)
+
+    def tearDown(self) -> None:
+        self.override.disable()
+        rmtree(self.media_root)
+
+    def make_upload(self, size: tuple = (1600, 1200), color: str = "red"):
+        buffer = BytesIO()
+        Image.new(mode="RGB", size=size, color=color).save(buffer, format="JPEG")
+        return SimpleUploadedFile(name="photo.JPG", content=buffer.getvalue())
+
+    def upload(self, upload, user: User = None) -> str:
+        with mock.patch(
+            "api.utils.avatar_utils.avatar_executor.submit",
+            side_effect=lambda job: job(),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                return handle_avatar_upload(
+                    user=user or self.user,
+                    avatar_file=upload,
+                )
+
+    def test_upload_returns_pending_url_and_builds_variants(self) -> None:
+        pending = self.upload(upload=self.make_upload())
+        self.assertIn("/staging/", pending)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar.name.endswith("_500.jpg"))
+        for size in CON.AVATAR_SIZES:
+            name = self.user.avatar.name.replace("_500.jpg", f"_{size}.jpg")
+            with Image.open(fp=path.join(self.media_root, name)) as img:
+                self.assertEqual(max(img.size), size)
+        staging = path.join(self.media_root, CON.AVATAR_DIR, "staging")
+        self.assertEqual(listdir(staging), [])
+
+    def test_replacing_avatar_removes_old_variants(self) -> None:
+        self.upload(upload=self.make_upload())
+        self.user.refresh_from_db()
+        old = path.join(self.media_root, self.user.avatar.name)
+        self.upload(upload=self.make_upload(color="blue"))
+        self.assertFalse(path.exists(old))
+
+    def test_validate_rejects_non_image(self) -> None:
+        upload = SimpleUploadedFile(name="photo.png", content=b"not an image")
+        with self.assertRaises(ValidationError):
+            validate_avatar(file=upload)
+
+    def test_identical_avatars_are_stored_once(self) -> None:
+        other = User().create_user(email="other@test.test", password="x", name="o")
+        self.upload(upload=self.make_upload())
+        self.upload(upload=self.make_upload(), user=other)
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.avatar.name, other.avatar.name)
+        avatar = Avatar.objects.get()
+        self.assertEqual(avatar.ref_count, 2)
+        self.upload(upload=self.make_upload(color="blue"), user=other)
+        avatar.refresh_from_db()
+        self.assertEqual(avatar.ref_count, 1)
+        self.assertTrue(path.exists(path.join(self.media_root, self.user.avatar.name)))
+
+    def test_avatar_endpoint(self) -> None:
+        url = reverse(viewname="avatar")
+        data = {"avatar": self.make_upload()}
+        response = self.client.post(path=url, data=data, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.signin(email=self.USER_DATA["email"], password=self.USER_DATA["password"])
+        with mock.patch(
+            "api.utils.avatar_utils.avatar_executor.submit",
+            side_effect=lambda job: job(),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    path=url, data={"avatar": self.make_upload()}, format="multipart"
+                )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("/staging/", response.data["avatarPath"])
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar.name.endswith("_500.jpg"))
+        upload = SimpleUploadedFile(name="photo.png", content=b"not an image")
+        response = self.client.post(
+            path=url, data={"avatar": upload}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_user_info_returns_hashed_variant_urls(self) -> None:
+        self.upload(upload=self.make_upload())
+        self.user.refresh_from_db()
+        variants = user_info(user=self.user)["avatarVariants"]
+        self.assertEqual(set(variants), {str(size) for size in CON.AVATAR_SIZES})
+        self.assertTrue(variants["500"].endswith(self.user.avatar.name))
+
+
+@override_settings(SERVICE_API_KEY="service-key")
+class UsersBatchTests(APITestCase, TestUtils):
+    def setUp(self) -> None:
+        self.url = reverse(viewname="users-batch")
+        self.headers = {"X-Service-Key": "service-key"}
+        self.users = [
+            User().create_user(email=f"user{i}@test.test", password="x", name=f"u{i}")
+            for i in range(3)
+        ]
+
+    def test_batch_lookup_single_query(self) -> None:
+        ids = [user.id for user in self.users] + [999999]
+        with self.assertViewQueries(1):
+            response = self.client.post(
+                path=self.url,
+                data={"ids": ids},
+                format="json",
+                headers=self.headers,
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual([user["id"] for user in body["users"]], ids[:3])
+        self.assertEqual(body["missing"], [999999])
+
+    def test_batch_etag_not_modified(self) -> None:
+        ids = ",".join(str(user.id) for user in self.users)
+        response = self.client.get(
+            path=self.url,
+            data={"ids": ids},
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        headers = dict(self.headers, **{"If-None-Match": response["ETag"]})
+        response = self.client.get(path=self.url, data={"ids": ids}, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_batch_requires_service_key(self) -> None:
+        response = self.client.get(path=self.url, data={"ids": "1"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class JWKSTests(APITestCase):
+    def test_symmetric_algorithm_publishes_no_keys(self) -> None:
+        response = self.client.get(path=reverse(viewname="jwks"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"keys": []})
+
+
+class OpenAPISchemaTests(APITestCase):
+    def setUp(self) -> None:
+        self.dir = mkdtemp()
+        call_command("generate_openapi", output=self.dir, stdout=StringIO())
+
+    def tearDown(self) -> None:
+        rmtree(self.dir)
+
+    def get_schema(self, **headers) -> HttpResponse:
+        with override_settings(OPENAPI_DIR=Path(self.dir)):
+            return self.client.get(path=reverse(viewname="schema-json"), **headers)
+
+    def test_prebuilt_schema_served(self) -> None:
+        response = self.get_schema()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("/auth/signin", loads(response.content)["paths"])
+        self.assertIn("ETag", response)
+
+    def test_gzip_variant_and_not_modified(self) -> None:
+        response = self.get_schema(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("paths", loads(gzip.decompress(response.content)))
+        cached = self.get_schema(
+            HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ReplicaRouterTests(APITestCase):
+    def test_reads_use_replica_only_inside_block(self) -> None:
+        router = ReplicaRouter()
+        router.replicas = ["replica_0"]
+        self.assertEqual(router.db_for_read(model=User), "default")
+        with use_replica():
+            self.assertEqual(router.db_for_read(model=User), "replica_0")
+            self.assertEqual(router.db_for_write(model=User), "default")
+        self.assertEqual(router.db_for_read(model=User), "default")
+
+
+class DatabaseSettingsTests(APITestCase):
+    @mock.patch.dict("os.environ", {"SQLITE_PROFILE": "performance"})
+    def test_sqlite_performance_profile(self) -> None:
+        options = database_settings(base_dir=Path("."))["default"]["OPTIONS"]
+        self.assertEqual(options["transaction_mode"], "IMMEDIATE")
+        self.assertIn("synchronous=NORMAL", options["init_command"])
+
+    @mock.patch.dict("os.environ", {"DB_ENGINE": "postgres", "DB_POOL": "1"})
+    def test_postgres_pool_disables_persistent_connections(self) -> None:
+        default = database_settings(base_dir=Path("."))["default"]
+        self.assertEqual(default["CONN_MAX_AGE"], 0)
+        self.assertIn("pool", default["OPTIONS"])
+
+
+class BenchmarkUtilsTests(APITestCase):
+    def test_summary_percentiles_and_errors(self) -> None:
+        samples = [
+            Sample(latency=i / 1000, status=200, queries=2) for i in range(1, 101)
+        ]
+        samples.append(Sample(latency=1, status=500, queries=5))
+        stats = summarize(samples=samples, elapsed=1.0)
+        self.assertEqual(stats["errors"], 1)
+        # ? Ошибочный ответ не входит в пропускную способность
+        self.assertAlmostEqual(stats["throughput"], 100)
+        self.assertAlmostEqual(stats["p50_ms"], 50)
+        self.assertAlmostEqual(stats["p99_ms"], 99)
+        self.assertEqual(stats["queries_max"], 5)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_compare_reports_relative_change(self) -> None:
+        old = {"p95_ms": 10.0, "throughput": 100.0, "queries_mean": 2.0}
+        new = {"p95_ms": 15.0, "throughput": 80.0, "queries_mean": 2.0}
+        rows = compare_results(
+            baseline={"scenarios": {"signin": old}},
+            current={"scenarios": {"signin": new, "logout": new}},
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertAlmostEqual(rows[0]["p95_delta"], 50)
+        self.assertAlmostEqual(rows[0]["throughput_delta"], -20)
+
+    def test_compare_reports_error_rate_change(self) -> None:
+        old = {"p95_ms": 10.0, "throughput": 100.0, "queries_mean": 2.0}
+        new = dict(old, error_rate=0.25)
+        rows = compare_results(
+            baseline={"scenarios": {"signin": dict(old, errors=0, requests=10)}},
+            current={"scenarios": {"signin": new}},
+        )
+        self.assertAlmostEqual(rows[0]["error_rate_delta"], 25)
+
+
+class MetricsTests(APITestCase, TestUtils):
+    def setUp(self) -> None:
+        registry.clear()
+
+    def test_view_latency_and_queries_exported(self) -> None:
+        self.client.get(path=reverse(viewname="jwks"))
+        response = self.client.get(path=reverse(viewname="metrics"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn(
+            "http_request_duration_seconds_count"
+            '{method="GET",status="200",view="jwks"} 1.0',
+            body,
+        )
+        self.assertIn("http_request_render_seconds_total", body)
+
+    def test_workers_summed_in_multiprocess_mode(self) -> None:
+        # ? Как воркеры gunicorn: отдельные процессы с общим каталогом метрик
+        directory = mkdtemp()
+        self.addCleanup(rmtree, directory)
+        env = dict(environ, PROMETHEUS_MULTIPROC_DIR=directory)
+        setup = "import django; django.setup(); from razer_common import metrics; "
+        observe = (
+            "metrics.registry.observe(labels=('jwks', 'GET', 200), duration=0.01, "
+            "stats=metrics.RequestStats(), response_bytes=10)"
+        )
+        for _ in range(2):
+            run(
+                [executable, "-c", setup + observe],
+                env=env,
+                cwd=settings.BASE_DIR,
+                check=True,
+            )
+        output = run(
+            [executable, "-c", setup + "print(metrics.registry.render().decode())"],
+            env=env,
+            cwd=settings.BASE_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        self.assertIn(
+            "http_request_duration_seconds_count"
+            '{method="GET",status="200",view="jwks"} 2.0',
+            output,
+        )
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_logged_with_sql(self) -> None:
+        with self.assertLogs(logger="razer.metrics", level="WARNING") as logs:
+            self.signin(email="missing@test.test", password="test")
+        entry = loads(logs.records[0].getMessage())
+        self.assertEqual(entry["view"], "sign-in")
+        self.assertGreaterEqual(entry["queries"], 1)
+        self.assertIn("SELECT", entry["slowest_sql"][0]["sql"])
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token_required(self) -> None:
+        response = self.client.get(path=reverse(viewname="metrics"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ProfilingTests(APITestCase, TestUtils):
+    def setUp(self) -> None:
+        self.dir = mkdtemp()
+        profiling_rules.clear()
+        User().create_user(
+            email="profile@test.test", password="test", name="name", role="brand"
+        )
+
+    def tearDown(self) -> None:
+        rmtree(self.dir)
+        profiling_rules.clear()
+
+    def test_header_token_writes_collapsed_stacks(self) -> None:
+        with override_settings(PROFILING_DIR=Path(self.dir), PROFILING_TOKEN="tok"):
+            response = self.client.post(
+                path=reverse(viewname="sign-in"),
+                data={"email": "profile@test.test", "password": "test"},
+                format="json",
+                HTTP_X_PROFILE="tok",
+            )
+        name = response["X-Profile-File"]
+        self.assertIn("sign-in", name)
+        with open(path.join(self.dir, name)) as file:
+            content = file.read()
+        self.assertIn("check_password", content)
+        self.assertGreater(int(content.splitlines()[0].rsplit(" ", 1)[1]), 0)
+
+    def test_rule_samples_view(self) -> None:
+        ProfilingRule.objects.create(view_name="sign-in", sample_rate=100)
+        with override_settings(PROFILING_DIR=Path(self.dir)):
+            self.signin(email="profile@test.test", password="test")
+            self.client.get(path=reverse(viewname="jwks"))
+        self.assertEqual(len(listdir(self.dir)), 1)
+
+    def test_async_chain_stays_async(self) -> None:
+        async def async_view(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(ProfilingMiddleware(async_view)))
+        self.assertFalse(
+            iscoroutinefunction(ProfilingMiddleware(lambda request: HttpResponse()))
+        )
+
+    async def test_async_stack_of_sync_view(self) -> None:
+        # ? Под ASGI синхронный view работает не в потоке event loop
+        with override_settings(PROFILING_DIR=Path(self.dir), PROFILING_TOKEN="tok"):
+            response = await self.async_client.post(
+                reverse(viewname="sign-in"),
+                data={"email": "profile@test.test", "password": "test"},
+                content_type="application/json",
+                headers={"X-Profile": "tok"},
+            )
+        with open(path.join(self.dir, response["X-Profile-File"])) as file:
+            self.assertIn("check_password", file.read())
+
+    async def test_async_rule_samples_view(self) -> None:
+        await ProfilingRule.objects.acreate(view_name="sign-in-async", sample_rate=100)
+        with override_settings(PROFILING_DIR=Path(self.dir)):
+            await self.async_client.post(
+                reverse(viewname="sign-in-async"),
+                data={"email": "profile@test.test", "password": "test"},
+                content_type="application/json",
+            )
+        self.assertEqual(len(listdir(self.dir)), 1)
+
+
+@override_settings(
+    THROTTLE_RATES={"signin_ip": "3/min", "signin_email": "2/min"},
+    THROTTLE_BACKEND="local",
+)
+class ThrottleTests(APITestCase, TestUtils):
+    def setUp(self) -> None:
+        local_store.clear()
+
+    def tearDown(self) -> None:
+        local_store.clear()
+
+    def test_email_throttled_before_db(self) -> None:
+        for _ in range(2):
+            self.signin(email="Victim@test.test", password="test")
+        with self.assertViewQueries(0):
+            response = self.signin(email="victim@test.test", password="test")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+
+    def test_ip_throttled_across_emails(self) -> None:
+        for index in range(3):
+            self.signin(email=f"user{index}@test.test", password="test")
+        response = self.signin(email="other@test.test", password="test")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_async_signin_throttled(self) -> None:
+        url = reverse(viewname="sign-in-async")
+        data = {"email": "victim@test.test", "password": "test"}
+        for _ in range(2):
+            self.client.post(path=url, data=data, format="json")
+        response = self.client.post(path=url, data=data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "30")
+
+    def test_bucket_refills(self) -> None:
+        store = LocalBucketStore(max_keys=10)
+        self.assertEqual(store.take(key="k", capacity=1, period=60), 0.0)
+        self.assertAlmostEqual(store.take(key="k", capacity=1, period=60), 60, delta=1)
+        with mock.patch("api.utils.throttle_utils.monotonic") as monotonic:
+            monotonic.return_value = 10**9
+            self.assertEqual(store.take(key="k", capacity=1, period=60), 0.0)
+
+
+class StaticResponseTests(APITestCase):
+    def test_fresh_prerendered_response_per_access(self) -> None:
+        first = RESP.SUCCESS
+        first.delete_cookie(key="token")
+        second = RESP.SUCCESS
+        self.assertIsNot(first, second)
+        self.assertNotIn("token", second.cookies)
+        self.assertEqual(loads(second.content), second.data)
+        self.assertEqual(RESP.BUSY["Retry-After"], "1")
+
+    def test_data_is_read_only(self) -> None:
+        with self.assertRaises(TypeError):
+            RESP.NOT_FOUND.data["error"] = "changed"
+
+
+class FastJSONTests(APITestCase):
+    def test_renderer_matches_drf_output(self) -> None:
+        data = {
+            "name": "Имя",
+            "price": Decimal("1.50"),
+            "lazy": gettext_lazy("Not found."),
+            "items": [1, 2.5, None, True],
+            "created": datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+            "day": date(2026, 1, 2),
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_parser_errors(self) -> None:
+        self.assertEqual(FastJSONParser().parse(BytesIO(b'{"a": 1}')), {"a": 1})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b"{broken"))
+
+    def test_async_signin_rejects_broken_json(self) -> None:
+        response = self.client.post(
+            path=reverse(viewname="sign-in-async"), data=b"{broken", format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,29 +1,23 @@
+from django.conf import settings
 from django.urls import path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import permissions
 
+from .views.async_auth_views import AsyncSignInView, AsyncSignUpView
 from .views.auth_views import *
-
-schema_view = get_schema_view(
-    info=openapi.Info(
-        title="VideoRazer backend API",
-        default_version="v1",
-        description="VideoRazer backend",
-        terms_of_service="https://www.org.com",
-        contact=openapi.Contact(email="org@gmail.com"),
-        license=openapi.License(name="Org License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
+from .views.doc_views import OpenAPISchemaView
+from .views.user_views import (
+    AvatarAPIView,
+    SessionGenerationAPIView,
+    UsersBatchAPIView,
 )
 
 urlpatterns = [
     # ? Документация
     path(
-        route="swagger/",
-        view=schema_view.with_ui(renderer="swagger", cache_timeout=0),
-        name="schema-swagger-ui",
+        route="swagger.json",
+        view=OpenAPISchemaView.as_view(),
+        name="schema-json",
     ),
     #######################################################################################
     # ? Аутентификация
@@ -47,6 +41,21 @@ urlpatterns = [
         view=RefreshTokenAPIView.as_view(),
         name="refresh",
     ),
+    path(
+        route="auth/async/signup",
+        view=csrf_exempt(AsyncSignUpView.as_view()),
+        name="sign-up-async",
+    ),
+    path(
+        route="auth/async/signin",
+        view=csrf_exempt(AsyncSignInView.as_view()),
+        name="sign-in-async",
+    ),
+    path(
+        route="auth/jwks.json",
+        view=JWKSAPIView.as_view(),
+        name="jwks",
+    ),
     path(
         route="auth/confirm-email/<uidb64>/<token>",
         view=ConfirmEmailAPIView.as_view(),
@@ -62,4 +71,39 @@ urlpatterns = [
         view=UpdatePasswordAPIView.as_view(),
         name="update-password",
     ),
+    #######################################################################################
+    # ? Пользователи
+    path(
+        route="users/batch",
+        view=UsersBatchAPIView.as_view(),
+        name="users-batch",
+    ),
+    path(
+        route="users/me/avatar",
+        view=AvatarAPIView.as_view(),
+        name="avatar",
+    ),
+    path(
+        route="users/<int:id>/session",
+        view=SessionGenerationAPIView.as_view(),
+        name="session-generation",
+    ),
 ]
+
+if settings.API_DOCS_LIVE:
+    from drf_yasg.views import get_schema_view
+
+    from .doc.doc_utils import api_info
+
+    schema_view = get_schema_view(
+        info=api_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )
+    urlpatterns.append(
+        path(
+            route="swagger/",
+            view=schema_view.with_ui(renderer="swagger", cache_timeout=0),
+            name="schema-swagger-ui",
+        )
+    )
@@ -1,4 +1,3 @@
-from django.contrib.auth.hashers import check_password
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_decode
 from rest_framework import status
@@ -7,44 +6,82 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from ..models import User
-from ..utils.token_utils import Token, is_session_valid
+from ..utils.token_utils import (
+    Token,
+    is_session_valid,
+    token_cache,
+    token_session_claims,
+)
 from ..utils.user_utils import user_info
 
 
+def user_snapshot(user: User) -> tuple:
+    """Значения полей из базы: в кэше нет общего для запросов объекта модели."""
+    return tuple(
+        field.get_prep_value(field.value_from_object(user))
+        for field in User._meta.concrete_fields
+    )
+
+
+def user_from_snapshot(values: tuple) -> User:
+    return User.from_db(
+        db=None,
+        field_names=[field.attname for field in User._meta.concrete_fields],
+        values=values,
+    )
+
+
 class JWTAuth(JWTAuthentication):
     def authenticate(self, request) -> tuple[User, Token]:
         cookie_token = request.COOKIES.get("token")
         if cookie_token is None:
             raise AuthenticationFailed(detail="No token provided", code="invalid_token")
+        cached = token_cache.get(raw_token=cookie_token)
+        if cached is not None:
+            values, validated_token = cached
+            # ? Сессию могли закрыть в другом воркере: поколение проверяется всегда
+            if is_session_valid(**token_session_claims(token=validated_token)):
+                return user_from_snapshot(values=values), validated_token
+            token_cache.invalidate_user(user_id=validated_token.get(key="user_id"))
         try:
             validated_token = self.get_validated_token(raw_token=cookie_token)
         except AuthenticationFailed:
             raise AuthenticationFailed(
                 detail="Invalid token", code="invalid_token"
             ) from None
-        return self.get_user(validated_token=validated_token), validated_token
+        user = self.get_user(validated_token=validated_token)
+        token_cache.set(
+            raw_token=cookie_token,
+            user_id=user.id,
+            value=(user_snapshot(user=user), validated_token),
+            exp=validated_token.get(key="exp"),
+        )
+        return user, validated_token
 
     def get_user(self, validated_token) -> User:
         try:
             user_id = validated_token.get(key="user_id")
-            created = validated_token.get(key="created")
             user = User().get_by_id(id=user_id)
         except User.DoesNotExist:
             raise AuthenticationFailed(
                 detail="User not found", code="user_not_found"
             ) from None
-        if not is_session_valid(user_id=user, created_date=created):
+        if not is_session_valid(**token_session_claims(token=validated_token)):
             raise AuthenticationFailed(detail="Session expired", code="session_expired")
         return user
 
 
-def auth_response_builder(user: User = None, refresh: Token = None) -> dict:
+def auth_response_builder(
+    user: User = None,
+    refresh: Token = None,
+    response_class: type = Response,
+) -> Response:
     response_data = {}
     if user:
         response_data["userData"] = user_info(user=user)
     if refresh:
         response_data["token"] = str(refresh)
-    response = Response(data=response_data, status=status.HTTP_200_OK)
+    response = response_class(data=response_data, status=status.HTTP_200_OK)
     if refresh:
         response.set_cookie(
             key="token",
@@ -90,7 +127,7 @@ def reset_password(uidb64, token, password) -> int:
 
 
 def update_password(user: User, old_password: str, new_password: str) -> int:
-    if check_password(password=old_password, encoded=user.password):
+    if user.check_password(password=old_password):
         user.set_password(password=new_password)
         user.save()
         return 1
@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from io import BytesIO
+from logging import getLogger
+from os import makedirs, path, remove, replace
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from PIL import Image
+
+from ..models import Avatar, User
+
+CON = settings.CONSTANTS
+logger = getLogger(__name__)
+
+avatar_executor = ThreadPoolExecutor(
+    max_workers=CON.AVATAR_WORKERS,
+    thread_name_prefix="avatar",
+)
+
+
+def variant_name(digest: str, size: int) -> str:
+    return f"{CON.AVATAR_DIR}/{digest}_{size}.jpg"
+
+
+def atomic_write(name: str, write) -> None:
+    full_path = default_storage.path(name=name)
+    makedirs(path.dirname(full_path), exist_ok=True)
+    tmp_path = f"{full_path}.{uuid4().hex}.tmp"
+    try:
+        write(tmp_path)
+        replace(tmp_path, full_path)
+    finally:
+        if path.exists(tmp_path):
+            remove(tmp_path)
+
+
+def stage_upload(file: UploadedFile) -> str:
+    ext = path.splitext(p=file.name)[1].lower()
+    name = f"{CON.AVATAR_DIR}/staging/{uuid4().hex}{ext}"
+
+    def write(tmp_path: str) -> None:
+        with open(tmp_path, "wb") as out:
+            for chunk in file.chunks():
+                out.write(chunk)
+
+    atomic_write(name=name, write=write)
+    return name
+
+
+def render_variants(source: str) -> dict[int, bytes]:
+    sizes = sorted(CON.AVATAR_SIZES, reverse=True)
+    with Image.open(fp=default_storage.path(name=source)) as img:
+        if img.format == "JPEG":
+            # ? JPEG декодируется сразу в уменьшенном масштабе (DCT scaling)
+            img.draft(mode="RGB", size=(sizes[0], sizes[0]))
+        img = img.convert(mode="RGB")
+    variants = {}
+    for size in sizes:
+        img = img.copy()
+        img.thumbnail(size=(size, size), reducing_gap=2.0)
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=85, optimize=True)
+        variants[size] = buffer.getvalue()
+    return variants
+
+
+def parse_variant_name(name: str) -> str | None:
+    digest, _, size = path.splitext(path.basename(name))[0].rpartition("_")
+    if len(digest) != 64 or not size.isdigit():
+        return None
+    return digest
+
+
+def acquire_avatar(variants: dict[int, bytes]) -> str:
+    # ? Ключ - SHA-256 обработанного изображения, одинаковые хранятся один раз
+    digest = sha256(variants[max(variants)]).hexdigest()
+    with transaction.atomic():
+        avatar, created = Avatar.objects.select_for_update().get_or_create(
+            digest=digest
+        )
+        if created or not default_storage.exists(
+            name=variant_name(digest=digest, size=max(variants))
+        ):
+            for size, content in variants.items():
+                atomic_write(
+                    name=variant_name(digest=digest, size=size),
+                    write=lambda tmp_path: Path(tmp_path).write_bytes(content),
+                )
+        Avatar.objects.filter(digest=digest).update(ref_count=F("ref_count") + 1)
+    return variant_name(digest=digest, size=max(variants))
+
+
+def release_avatar(name: str) -> None:
+    if not name:
+        return
+    digest = parse_variant_name(name=name)
+    if digest is None:
+        if not User.objects.filter(avatar=name).exists():
+            default_storage.delete(name=name)
+        return
+    with transaction.atomic():
+        avatar = Avatar.objects.select_for_update().filter(digest=digest).first()
+        if avatar is None:
+            return
+        if avatar.ref_count > 1:
+            Avatar.objects.filter(digest=digest).update(ref_count=F("ref_count") - 1)
+            return
+        for size in CON.AVATAR_SIZES:
+            default_storage.delete(name=variant_name(digest=digest, size=size))
+        avatar.delete()
+
+
+def process_avatar(user_id: int, staged: str, previous: str = None) -> str | None:
+    try:
+        name = acquire_avatar(variants=render_variants(source=staged))
+    except Exception:
+        logger.exception("Avatar processing failed for user %s", user_id)
+        User.objects.filter(id=user_id, avatar=staged).update(avatar=previous)
+        return None
+    finally:
+        default_storage.delete(name=staged)
+    if User.objects.filter(id=user_id, avatar=staged).update(avatar=name):
+        release_avatar(name=previous)
+        return name
+    # ? Пока шла обработка, пользователь загрузил другой аватар
+    release_avatar(name=name)
+    return None
+
+
+def submit_avatar_job(user_id: int, staged: str, previous: str = None):
+    def job() -> str | None:
+        try:
+            return process_avatar(user_id=user_id, staged=staged, previous=previous)
+        finally:
+            close_old_connections()
+
+    return avatar_executor.submit(job)
+
+
+def avatar_urls(name: str) -> dict[str, str] | None:
+    digest = parse_variant_name(name=name) if name else None
+    if digest is None:
+        return None
+    return {
+        str(size): default_storage.url(name=variant_name(digest=digest, size=size))
+        for size in CON.AVATAR_SIZES
+    }
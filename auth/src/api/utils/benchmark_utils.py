@@ -0,0 +1,134 @@
+from json import dumps, loads
+from math import ceil
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+class Sample:
+    __slots__ = ("latency", "status", "queries")
+
+    def __init__(self, latency: float, status: int, queries: int | None) -> None:
+        self.latency = latency
+        self.status = status
+        self.queries = queries
+
+
+class LocalTransport:
+    """Запросы через тестовый клиент Django в текущем процессе, со счётом SQL."""
+
+    def __init__(self) -> None:
+        self.client = Client(HTTP_HOST="localhost")
+
+    def request(
+        self, method: str, path: str, data=None, headers=None
+    ) -> tuple[Sample, dict]:
+        with CaptureQueriesContext(connection=connection) as queries:
+            started = perf_counter()
+            response = self.client.generic(
+                method=method,
+                path=path,
+                data=dumps(data) if data is not None else "",
+                content_type="application/json",
+                headers=headers or {},
+            )
+            latency = perf_counter() - started
+        try:
+            body = loads(response.content) if response.content else {}
+        except ValueError:
+            body = {}
+        return Sample(latency, response.status_code, len(queries)), body
+
+
+class HttpTransport:
+    """Запросы к запущенному стеку по HTTP; число SQL-запросов недоступно."""
+
+    def __init__(self, base_url: str, timeout: float = 30) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(
+        self, method: str, path: str, data=None, headers=None
+    ) -> tuple[Sample, dict]:
+        request = Request(
+            url=f"{self.base_url}{path}",
+            method=method,
+            data=dumps(data).encode() if data is not None else None,
+            headers={"Content-Type": "application/json", **(headers or {})},
+        )
+        started = perf_counter()
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                status, content = response.status, response.read()
+        except HTTPError as e:
+            status, content = e.code, e.read()
+        latency = perf_counter() - started
+        try:
+            body = loads(content) if content else {}
+        except ValueError:
+            body = {}
+        return Sample(latency, status, None), body
+
+
+def percentile(values: list[float], percent: float) -> float:
+    # ? Nearest-rank по отсортированному списку
+    if not values:
+        return 0.0
+    return values[max(0, ceil(len(values) * percent / 100) - 1)]
+
+
+def summarize(samples: list[Sample], elapsed: float) -> dict:
+    ok = sorted(s.latency for s in samples if s.status < 400)
+    queries = [s.queries for s in samples if s.queries is not None]
+    errors = len(samples) - len(ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        # ? Только успешные ответы: быстрые 4xx/5xx не должны выглядеть ускорением
+        "throughput": len(ok) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ok, 50) * 1000,
+        "p95_ms": percentile(ok, 95) * 1000,
+        "p99_ms": percentile(ok, 99) * 1000,
+        "mean_ms": sum(ok) / len(ok) * 1000 if ok else 0.0,
+        "queries_mean": sum(queries) / len(queries) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+
+def compare_results(baseline: dict, current: dict) -> list[dict]:
+    """
+    Изменение p95, пропускной способности и числа запросов в процентах,
+    доли ошибок - в процентных пунктах.
+    """
+
+    def delta(old, new) -> float | None:
+        if old in (None, 0) or new is None:
+            return None
+        return (new - old) / old * 100
+
+    def error_rate(stats: dict) -> float:
+        # ? В старых сохранённых результатах поля error_rate нет
+        if "error_rate" in stats:
+            return stats["error_rate"]
+        return stats["errors"] / stats["requests"] if stats.get("requests") else 0.0
+
+    rows = []
+    for name, stats in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            continue
+        rows.append(
+            {
+                "scenario": name,
+                "p95_delta": delta(old["p95_ms"], stats["p95_ms"]),
+                "throughput_delta": delta(old["throughput"], stats["throughput"]),
+                "queries_delta": delta(old["queries_mean"], stats["queries_mean"]),
+                "error_rate_delta": (error_rate(stats) - error_rate(old)) * 100,
+            }
+        )
+    return rows
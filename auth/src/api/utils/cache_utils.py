@@ -0,0 +1,64 @@
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from typing import Any
+
+
+class TokenCache:
+    """
+    Ограниченный LRU-кэш проверенных токенов.
+
+    Запись живёт не дольше `ttl` секунд и не дольше `exp` самого токена.
+    Для каждого пользователя хранится набор его токенов, чтобы при смене
+    сессии можно было сбросить их разом.
+    """
+
+    def __init__(self, max_size: int, ttl: int) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+        self._by_user: dict[int, set[str]] = {}
+        self._lock = Lock()
+
+    def get(self, raw_token: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(raw_token)
+            if entry is None:
+                return None
+            expires_at, user_id, value = entry
+            if expires_at <= time():
+                self._pop(raw_token)
+                return None
+            self._entries.move_to_end(raw_token)
+            return value
+
+    def set(self, raw_token: str, user_id: int, value: Any, exp: int = None) -> None:
+        expires_at = time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        with self._lock:
+            self._pop(raw_token)
+            self._entries[raw_token] = (expires_at, user_id, value)
+            self._by_user.setdefault(user_id, set()).add(raw_token)
+            while len(self._entries) > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for raw_token in self._by_user.pop(user_id, ()):
+                self._entries.pop(raw_token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _pop(self, raw_token: str) -> None:
+        entry = self._entries.pop(raw_token, None)
+        if entry is None:
+            return
+        tokens = self._by_user.get(entry[1])
+        if tokens is not None:
+            tokens.discard(raw_token)
+            if not tokens:
+                del self._by_user[entry[1]]
@@ -0,0 +1,98 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from os import cpu_count
+from threading import Lock
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+CON = settings.CONSTANTS
+
+
+class HashPoolBusy(Exception):
+    pass
+
+
+def _init_worker() -> None:
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _make_password(password: str) -> str:
+    return hashers.make_password(password=password)
+
+
+def _check_password(password: str, encoded: str) -> tuple[bool, str | None]:
+    # ? Вместе с результатом возвращается новый хеш, если старый устарел
+    rehashed = []
+    valid = hashers.check_password(
+        password=password,
+        encoded=encoded,
+        setter=lambda password: rehashed.append(hashers.make_password(password)),
+    )
+    return valid, rehashed[0] if rehashed else None
+
+
+class HashPool:
+    """
+    Пул процессов для хеширования паролей.
+
+    Одновременно принимается не больше `workers + queue_limit` задач,
+    остальные сразу получают HashPoolBusy, а не встают в очередь.
+    """
+
+    def __init__(self, workers: int, queue_limit: int) -> None:
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.capacity = workers + queue_limit
+        self._executor = None
+        self._pending = 0
+        self._lock = Lock()
+
+    def resize(self, workers: int) -> None:
+        with self._lock:
+            if self._executor is not None:
+                raise RuntimeError("Hash pool is already started")
+            self.workers = workers
+            self.capacity = workers + self.queue_limit
+
+    def start(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=get_context(method="spawn"),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    async def run(self, function, *args):
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise HashPoolBusy
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.start(), partial(function, *args))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def make_password(self, password: str) -> str:
+        return await self.run(_make_password, password)
+
+    async def check_password(
+        self, password: str, encoded: str
+    ) -> tuple[bool, str | None]:
+        return await self.run(_check_password, password, encoded)
+
+
+hash_pool = HashPool(
+    workers=CON.HASH_WORKERS or cpu_count() or 1,
+    queue_limit=CON.HASH_QUEUE_LIMIT,
+)
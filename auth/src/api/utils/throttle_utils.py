@@ -0,0 +1,134 @@
+from functools import lru_cache
+from hashlib import blake2b
+from time import monotonic, time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from ..models import User
+
+CON = settings.CONSTANTS
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate: str) -> tuple[int, int]:
+    """20/min -> (20, 60): ёмкость ведра и время его полного наполнения."""
+    count, period = rate.split("/")
+    return int(count), PERIODS[period[0]]
+
+
+class LocalBucketStore:
+    """
+    Token bucket в памяти процесса без блокировок: состояние ключа - кортеж,
+    который заменяется целиком. При гонке двух потоков один из них может
+    получить лишний токен, что для защиты от перебора допустимо.
+    """
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._buckets: dict[str, tuple[float, float, float]] = {}
+
+    def take(self, key: str, capacity: int, period: int) -> float:
+        now = monotonic()
+        refill = capacity / period
+        tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill)
+            return (1 - tokens) / refill
+        tokens -= 1
+        self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill)
+        if len(self._buckets) > self.max_keys:
+            self.prune(now=now)
+        return 0.0
+
+    def prune(self, now: float) -> None:
+        # ? Полные вёдра ничем не отличаются от отсутствующих
+        for key, (_, _, full_at) in list(self._buckets.items()):
+            if full_at <= now:
+                self._buckets.pop(key, None)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Общий для всех процессов счётчик в кэше Django (Redis в продакшене).
+    Атомарен только incr, поэтому вместо ведра - фиксированное окно.
+    """
+
+    def take(self, key: str, capacity: int, period: int) -> float:
+        now = time()
+        window = int(now // period)
+        cache_key = f"throttle:{key}:{window}"
+        cache.add(key=cache_key, value=0, timeout=period + 1)
+        try:
+            count = cache.incr(key=cache_key)
+        except ValueError:
+            # ? Ключ истёк между add и incr
+            cache.set(key=cache_key, value=1, timeout=period + 1)
+            count = 1
+        if count > capacity:
+            return (window + 1) * period - now
+        return 0.0
+
+    def clear(self) -> None:
+        pass
+
+
+local_store = LocalBucketStore(max_keys=CON.THROTTLE_MAX_KEYS)
+cache_store = CacheBucketStore()
+
+
+def throttle_wait(scope: str, ident: str) -> float:
+    rate = settings.THROTTLE_RATES.get(scope)
+    if not rate:
+        return 0.0
+    store = cache_store if settings.THROTTLE_BACKEND == "cache" else local_store
+    capacity, period = parse_rate(rate=rate)
+    return store.take(key=f"{scope}:{ident}", capacity=capacity, period=period)
+
+
+def email_ident(email: str) -> str:
+    # ? В ключах кэша хеш, а не сам адрес
+    normalized = User.normalize_email(email=email)
+    return blake2b(normalized.encode(), digest_size=16).hexdigest()
+
+
+def auth_throttle_wait(request, action: str, email=None) -> float:
+    """Секунды до следующей попытки или 0, если попытка разрешена."""
+    wait = throttle_wait(
+        scope=f"{action}_ip", ident=BaseThrottle().get_ident(request=request)
+    )
+    if wait or not isinstance(email, str) or not email:
+        return wait
+    return throttle_wait(scope=f"{action}_email", ident=email_ident(email=email))
+
+
+class AuthThrottle(BaseThrottle):
+    """Ограничение по IP и по почте до разбора пароля и обращений к базе."""
+
+    action = None
+
+    def allow_request(self, request, view) -> bool:
+        data = request.data
+        email = data.get("email", None) if hasattr(data, "get") else None
+        self._wait = auth_throttle_wait(
+            request=request, action=self.action, email=email
+        )
+        return not self._wait
+
+    def wait(self) -> float:
+        return self._wait
+
+
+class SignInThrottle(AuthThrottle):
+    action = "signin"
+
+
+class SignUpThrottle(AuthThrottle):
+    action = "signup"
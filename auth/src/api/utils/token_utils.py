@@ -1,9 +1,72 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from razer_common.jwt_verify import session_generation_key
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from ..models import TokenSession, User
+from .cache_utils import TokenCache
 
+CON = settings.CONSTANTS
 
-def is_session_valid(user_id, created_date) -> TokenSession | None:
+token_cache = TokenCache(max_size=CON.TOKEN_CACHE_SIZE, ttl=CON.TOKEN_CACHE_TTL)
+
+
+def read_session_generation(user_id) -> int | None:
+    return (
+        User.objects.filter(id=user_id)
+        .values_list("session_generation", flat=True)
+        .first()
+    )
+
+
+def get_session_generation(user_id) -> int | None:
+    # ? Кэш sessions общий с video и без срока жизни: запись в нём и есть
+    # ? текущее поколение, после ротации старые токены отклоняются сразу
+    if not settings.SESSION_CACHE_SHARED:
+        # ? LocMem у каждого воркера свой, ротацию в другом воркере он не увидит
+        return read_session_generation(user_id=user_id)
+    key = session_generation_key(user_id=user_id)
+    generation = caches["sessions"].get(key=key)
+    if generation is None:
+        generation = read_session_generation(user_id=user_id)
+        if generation is not None:
+            # ? add, а не set: не затираем значение, записанное ротацией
+            # ? после нашего чтения из базы
+            caches["sessions"].add(key=key, value=generation, timeout=None)
+    return generation
+
+
+def rotate_session_generation(user_id) -> int | None:
+    # ? Один атомарный UPDATE ... RETURNING вместо exists + delete + insert
+    qn = connection.ops.quote_name
+    table = qn(User._meta.db_table)
+    column = qn(User._meta.get_field("session_generation").column)
+    # ? Кэш пишется, пока строка заблокирована UPDATE: параллельные ротации
+    # ? одного пользователя записывают поколения в порядке их появления
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {column} = {column} + 1 "
+            f"WHERE {qn(User._meta.pk.column)} = %s RETURNING {column}",
+            [user_id],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        if settings.SESSION_CACHE_SHARED:
+            caches["sessions"].set(
+                key=session_generation_key(user_id=user_id),
+                value=row[0],
+                timeout=None,
+            )
+    return row[0]
+
+
+def is_session_valid(user_id, created_date=None, generation=None) -> bool:
+    if CON.SESSION_MODE == "generation":
+        if generation is None:
+            return False
+        return get_session_generation(user_id=user_id) == generation
     try:
         TokenSession.objects.get(user_id=user_id, created_date=created_date)
         return True
@@ -12,53 +75,66 @@ def is_session_valid(user_id, created_date) -> TokenSession | None:
 
 
 def delete_session(user_id) -> int:
+    if CON.SESSION_MODE == "generation":
+        if rotate_session_generation(user_id=user_id) is None:
+            return -1
+        token_cache.invalidate_user(user_id=user_id)
+        return 0
     try:
-        user = User.objects.get(id=user_id)
-        TokenSession.objects.get(user=user).delete()
+        TokenSession.objects.get(user_id=user_id).delete()
+        token_cache.invalidate_user(user_id=user_id)
         return 0
     except TokenSession.DoesNotExist:
         return -1
 
 
-def create_session(user) -> TokenSession:
-    if TokenSession.objects.filter(user=user).exists():
-        TokenSession.objects.filter(user=user).delete()
-    session = TokenSession.objects.create(user=user)
-    return session
+def create_session(user_id) -> dict:
+    if CON.SESSION_MODE == "generation":
+        generation = rotate_session_generation(user_id=user_id)
+        if generation is None:
+            raise User.DoesNotExist
+        token_cache.invalidate_user(user_id=user_id)
+        return {"generation": generation}
+    # ? Одна транзакция записи; в профиле SQLite performance это BEGIN IMMEDIATE
+    with transaction.atomic():
+        TokenSession.objects.filter(user_id=user_id).delete()
+        session = TokenSession.objects.create(user_id=user_id)
+    token_cache.invalidate_user(user_id=user_id)
+    return {"created": session.created_date.isoformat()}
+
+
+def token_session_claims(token) -> dict:
+    return {
+        "user_id": token.get("user_id"),
+        "created_date": token.get("created"),
+        "generation": token.get("generation"),
+    }
 
 
 class Token(RefreshToken):
     @classmethod
     def for_user(cls, user) -> RefreshToken:
         token = super().for_user(user=user)
-        session = create_session(user=user)
         token["user_id"] = user.id
-        token["created"] = session.created_date.isoformat()
+        for claim, value in create_session(user_id=user.id).items():
+            token[claim] = value
         return token
 
     @classmethod
     def refresh(cls, token) -> RefreshToken:
         token = RefreshToken(token=token)
-        if not is_session_valid(
-            user_id=token["user_id"],
-            created_date=token["created"],
-        ):
+        if not is_session_valid(**token_session_claims(token=token)):
             raise Exception("Session expired")
-        user = User.objects.get(id=token["user_id"])
-        session = create_session(user=user)
-        token["created"] = session.created_date.isoformat()
+        for claim, value in create_session(user_id=token["user_id"]).items():
+            token[claim] = value
         return token
 
     @classmethod
     def delete(cls, token) -> int:
         try:
             token = RefreshToken(token=token)
-            if not is_session_valid(
-                user_id=token["user_id"],
-                created_date=token["created"],
-            ):
+            if not is_session_valid(**token_session_claims(token=token)):
                 return -1
-            user = User.objects.get(id=token["user_id"])
         except Exception:
             return -1
-        return delete_session(user_id=user.id)
+        return delete_session(user_id=token["user_id"])
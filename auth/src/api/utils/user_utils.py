@@ -1,12 +1,18 @@
-from os import path, remove
+from os import path
 from random import choices
 from string import ascii_letters, digits, punctuation
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
 from PIL import Image
 
 from ..models import User
+from .avatar_utils import avatar_urls, stage_upload, submit_avatar_job
+
+CON = settings.CONSTANTS
 
 
 def validate_avatar(file: UploadedFile) -> None:
@@ -16,31 +22,28 @@ def validate_avatar(file: UploadedFile) -> None:
     ext = path.splitext(p=file.name)[1].lower()
     if ext not in valid_extensions:
         raise ValidationError(message="Поддерживаются только файлы .jpg, .jpeg и .png")
+    # ? Читается только заголовок, полное декодирование - в фоновой задаче
     try:
-        img = Image.open(fp=file)
-        img.verify()
+        with Image.open(fp=file) as img:
+            valid = img.format in ("JPEG", "PNG")
+            valid = valid and img.width * img.height <= CON.AVATAR_MAX_PIXELS
     except Exception:
-        raise ValidationError(
-            message="Файл поврежден или не является изображением"
-        ) from ValidationError
+        valid = False
+    finally:
+        file.seek(0)
+    if not valid:
+        raise ValidationError(message="Файл поврежден или не является изображением")
 
 
 def handle_avatar_upload(user: User, avatar_file: UploadedFile) -> str:
-    if user.avatar:
-        if path.isfile(path=user.avatar.path):
-            remove(path=user.avatar.path)
-    user.avatar = avatar_file
-    user.save()
-    if user.avatar:
-        img_path = user.avatar.path
-        img = Image.open(fp=img_path)
-        if img.mode != "RGB":
-            img = img.convert(mode="RGB")
-        if img.height > 500 or img.width > 500:
-            output_size = (500, 500)
-            img.thumbnail(size=output_size)
-        img.save(fp=img_path, quality=85, optimize=True)
-    return user.avatar.url if user.avatar else None
+    previous = user.avatar.name if user.avatar else None
+    staged = stage_upload(file=avatar_file)
+    user.avatar.name = staged
+    user.save(update_fields=("avatar", "updated_at"))
+    transaction.on_commit(
+        lambda: submit_avatar_job(user_id=user.id, staged=staged, previous=previous)
+    )
+    return user.avatar.url
 
 
 def generate_password(length: int = 15) -> str:
@@ -53,13 +56,40 @@ def generate_password(length: int = 15) -> str:
     return "".join(choices(population=safe_characters, k=length))
 
 
-def user_info(user: User) -> dict:
-    info = {
-        "id": user.id,
-        "email": user.email,
-        "name": user.name,
-        "role": user.role,
-        "isActive": user.is_active,
-        "avatarPath": user.avatar.url if user.avatar else None,
+USER_INFO_FIELDS = ("id", "email", "name", "role", "is_active", "avatar")
+
+
+def user_info_row(
+    id: int,
+    email: str,
+    name: str,
+    role: str,
+    is_active: bool,
+    avatar: str,
+) -> dict:
+    return {
+        "id": id,
+        "email": email,
+        "name": name,
+        "role": role,
+        "isActive": is_active,
+        "avatarPath": default_storage.url(name=avatar) if avatar else None,
+        "avatarVariants": avatar_urls(name=avatar),
     }
-    return info
+
+
+def user_info(user: User) -> dict:
+    return user_info_row(
+        id=user.id,
+        email=user.email,
+        name=user.name,
+        role=user.role,
+        is_active=user.is_active,
+        avatar=user.avatar.name,
+    )
+
+
+def users_info(ids: list[int]) -> list[dict]:
+    # ? Один запрос за кортежами полей, без создания экземпляров модели
+    rows = User.objects.filter(id__in=ids).values_list(*USER_INFO_FIELDS)
+    return [user_info_row(*row) for row in rows]
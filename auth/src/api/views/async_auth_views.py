@@ -0,0 +1,129 @@
+from math import ceil
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.views import View
+from razer_common.fastjson import FastJsonResponse, loads
+
+from ..models import User
+from ..utils.auth_utils import auth_response_builder
+from ..utils.hash_utils import HashPoolBusy, hash_pool
+from ..utils.throttle_utils import auth_throttle_wait
+from ..utils.token_utils import Token
+
+RESP = settings.RESPONSES
+
+
+@sync_to_async
+def create_user(encoded: str, **fields) -> User:
+    user = User(**fields)
+    user.set_password(password=None, encoded=encoded)
+    with transaction.atomic():
+        user.save(force_insert=True)
+    return user
+
+
+@sync_to_async
+def update_password(user: User, encoded: str) -> None:
+    user.set_password(password=None, encoded=encoded)
+    user.save(update_fields=("password", "password_algorithm", "password_updated_at"))
+
+
+def parse_body(request) -> dict | None:
+    try:
+        data = loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def throttled_response(request, action: str, email) -> HttpResponse | None:
+    wait = auth_throttle_wait(request=request, action=action, email=email)
+    if not wait:
+        return None
+    response = RESP.THROTTLED
+    response["Retry-After"] = str(ceil(wait))
+    return response
+
+
+class AsyncSignUpView(View):
+    async def post(self, request) -> HttpResponse:
+        data = parse_body(request=request)
+        if data is None:
+            return RESP.BAD_REQUEST
+        name = data.get("name", None)
+        email = data.get("email", None)
+        password = data.get("password", None)
+
+        if not email or not password or not name:
+            return RESP.NOT_ENOUGH_DATA
+
+        throttled = throttled_response(request=request, action="signup", email=email)
+        if throttled:
+            return throttled
+
+        try:
+            encoded = await hash_pool.make_password(password=password)
+        except HashPoolBusy:
+            return RESP.BUSY
+
+        try:
+            user = await create_user(
+                name=name,
+                email=User.normalize_email(email=email),
+                encoded=encoded,
+                role="brand",
+            )
+        except IntegrityError:
+            return RESP.ALREADY_EXISTS
+
+        refresh = await sync_to_async(Token.for_user)(user=user)
+        return auth_response_builder(
+            user=user,
+            refresh=refresh,
+            response_class=FastJsonResponse,
+        )
+
+
+class AsyncSignInView(View):
+    async def post(self, request) -> HttpResponse:
+        data = parse_body(request=request)
+        if data is None:
+            return RESP.BAD_REQUEST
+        email = data.get("email", None)
+        password = data.get("password", None)
+
+        if not email or not password:
+            return RESP.NOT_ENOUGH_DATA
+
+        throttled = throttled_response(request=request, action="signin", email=email)
+        if throttled:
+            return throttled
+
+        try:
+            user = await User.objects.aget(email=User.normalize_email(email=email))
+        except User.DoesNotExist:
+            return RESP.NOT_FOUND
+
+        try:
+            valid, rehashed = await hash_pool.check_password(
+                password=password,
+                encoded=user.password,
+            )
+        except HashPoolBusy:
+            return RESP.BUSY
+
+        if not valid:
+            return RESP.INVALID_CRED
+
+        if rehashed:
+            await update_password(user=user, encoded=rehashed)
+
+        refresh = await sync_to_async(Token.for_user)(user=user)
+        return auth_response_builder(
+            user=user,
+            refresh=refresh,
+            response_class=FastJsonResponse,
+        )
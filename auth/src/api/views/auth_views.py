@@ -1,8 +1,12 @@
+from hashlib import sha256
+
+import jwt
 from django.conf import settings
-from django.contrib.auth.hashers import check_password
+from django.db import IntegrityError, transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from razer_common.jwt_verify import ASYMMETRIC_ALGORITHMS
 
 from ..utils.auth_utils import Token, auth_response_builder
 from ..doc.auth_doc import (
@@ -13,12 +17,15 @@ from ..doc.auth_doc import (
 )
 from ..utils.token_utils import Token
 from ..utils.response_utils import response_handler
+from ..utils.throttle_utils import SignInThrottle, SignUpThrottle
 from ..models import User
 
 RESP = settings.RESPONSES
 
 
 class SignUpAPIView(APIView):
+    throttle_classes = (SignUpThrottle,)
+
     @signup_swagger_schema()
     @response_handler
     def post(self, request) -> Response:
@@ -29,21 +36,24 @@ class SignUpAPIView(APIView):
         if not email or not password or not name:
             return RESP.NOT_ENOUGH_DATA
 
-        if User.objects.filter(email=email).exists():
+        try:
+            with transaction.atomic():
+                user = User().create_user(
+                    name=name,
+                    email=email,
+                    password=password,
+                    role="brand",
+                )
+        except IntegrityError:
             return RESP.ALREADY_EXISTS
 
-        user = User().create_user(
-            name=name,
-            email=email,
-            password=password,
-            role="brand",
-        )
-
         refresh = Token.for_user(user=user)
         return auth_response_builder(user=user, refresh=refresh)
 
 
 class SignInAPIView(APIView):
+    throttle_classes = (SignInThrottle,)
+
     @signin_swagger_schema()
     @response_handler
     def post(self, request) -> Response:
@@ -54,11 +64,11 @@ class SignInAPIView(APIView):
             return RESP.NOT_ENOUGH_DATA
 
         try:
-            user = User.objects.get(email=email)
+            user = User.get_by_email(email=email)
         except User.DoesNotExist:
             return RESP.NOT_FOUND
 
-        if not check_password(password=password, encoded=user.password):
+        if not user.check_password(password=password):
             return RESP.INVALID_CRED
 
         refresh = Token.for_user(user=user)
@@ -121,3 +131,22 @@ class ResetPasswordAPIView(APIView):
 class UpdatePasswordAPIView(APIView):
     def get(self, request):
         return Response(status=status.HTTP_200_OK)
+
+
+class JWKSAPIView(APIView):
+    authentication_classes = []
+
+    def get(self, request) -> Response:
+        # ? Публичный ключ для локальной проверки токенов другими сервисами
+        jwt_settings = settings.SIMPLE_JWT
+        if jwt_settings["ALGORITHM"] not in ASYMMETRIC_ALGORITHMS:
+            return Response(data={"keys": []}, status=status.HTTP_200_OK)
+        public_key = jwt_settings["VERIFYING_KEY"]
+        algorithm = jwt.get_algorithm_by_name(jwt_settings["ALGORITHM"])
+        jwk = algorithm.to_jwk(algorithm.prepare_key(public_key), as_dict=True)
+        jwk.update(
+            kid=sha256(public_key.encode()).hexdigest()[:16],
+            alg=jwt_settings["ALGORITHM"],
+            use="sig",
+        )
+        return Response(data={"keys": [jwk]}, status=status.HTTP_200_OK)
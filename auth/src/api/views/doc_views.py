@@ -0,0 +1,75 @@
+from hashlib import blake2b
+from threading import Lock
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views import View
+
+# ? Порядок предпочтения: brotli, затем gzip, затем исходный файл
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+_schema_cache: dict[str, tuple[float, bytes, str]] = {}
+_schema_lock = Lock()
+
+
+def read_schema(suffix: str = "") -> tuple[bytes, str] | None:
+    """Собранный файл схемы из памяти; перечитывается при смене mtime."""
+    path = settings.OPENAPI_DIR / f"openapi.json{suffix}"
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    with _schema_lock:
+        cached = _schema_cache.get(str(path))
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+    content = path.read_bytes()
+    etag = f'"{blake2b(content, digest_size=16).hexdigest()}"'
+    with _schema_lock:
+        _schema_cache[str(path)] = (mtime, content, etag)
+    return content, etag
+
+
+def accepted_encodings(request) -> set[str]:
+    header = request.headers.get("Accept-Encoding", "")
+    encodings = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+class OpenAPISchemaView(View):
+    """Отдача OpenAPI-схемы, собранной командой generate_openapi."""
+
+    def get(self, request):
+        source = read_schema()
+        if source is None:
+            raise Http404("OpenAPI schema is not generated")
+        etag = source[1]
+        # ? Сжатые варианты получают свой ETag, чтобы кэши их не путали
+        accepted = accepted_encodings(request=request)
+        encoding = None
+        for name, suffix in ENCODINGS:
+            if name in accepted:
+                variant = read_schema(suffix=suffix)
+                if variant is not None:
+                    encoding, content = name, variant[0]
+                    etag = f'{etag[:-1]}-{name}"'
+                    break
+        else:
+            content = source[0]
+
+        if request.headers.get("If-None-Match") == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content=content, content_type="application/json")
+            if encoding:
+                response["Content-Encoding"] = encoding
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, max-age=0, must-revalidate"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
@@ -0,0 +1,114 @@
+from hashlib import blake2b
+from hmac import compare_digest
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, HttpResponseNotModified
+from razer_common.db import use_replica
+from razer_common.fastjson import dumps
+from rest_framework import status
+from rest_framework.parsers import MultiPartParser
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from ..doc.user_doc import (
+    avatar_swagger_schema,
+    session_generation_swagger_schema,
+    users_batch_swagger_schema,
+)
+from ..utils.auth_utils import JWTAuth
+from ..utils.response_utils import response_handler
+from ..utils.token_utils import get_session_generation
+from ..utils.user_utils import handle_avatar_upload, users_info, validate_avatar
+
+CON = settings.CONSTANTS
+RESP = settings.RESPONSES
+
+
+def is_service_request(request) -> bool:
+    key = request.headers.get("X-Service-Key", None)
+    if not settings.SERVICE_API_KEY or not key:
+        return False
+    return compare_digest(key, settings.SERVICE_API_KEY)
+
+
+def parse_ids(raw) -> list[int] | None:
+    if isinstance(raw, str):
+        raw = [item for item in raw.split(",") if item]
+    if not isinstance(raw, list) or not raw or len(raw) > CON.USER_BATCH_LIMIT:
+        return None
+    try:
+        return list({int(item) for item in raw})
+    except (TypeError, ValueError):
+        return None
+
+
+class UsersBatchAPIView(APIView):
+    authentication_classes = []
+
+    @users_batch_swagger_schema()
+    @response_handler
+    def get(self, request) -> Response:
+        return self.batch(request=request, raw_ids=request.GET.get("ids", None))
+
+    @users_batch_swagger_schema()
+    @response_handler
+    def post(self, request) -> Response:
+        return self.batch(request=request, raw_ids=request.data.get("ids", None))
+
+    def batch(self, request, raw_ids) -> HttpResponse:
+        if not is_service_request(request=request):
+            return RESP.INVALID_TOKEN
+        ids = parse_ids(raw=raw_ids)
+        if ids is None:
+            return RESP.BAD_REQUEST
+
+        with use_replica():
+            users = users_info(ids=ids)
+        found = {user["id"] for user in users}
+        body = dumps({"users": users, "missing": sorted(set(ids) - found)})
+        etag = f'"{blake2b(body, digest_size=16).hexdigest()}"'
+        if request.method == "GET" and request.headers.get("If-None-Match") == etag:
+            return HttpResponseNotModified(headers={"ETag": etag})
+        return HttpResponse(
+            content=body,
+            content_type="application/json",
+            headers={"ETag": etag},
+        )
+
+
+class SessionGenerationAPIView(APIView):
+    """Текущее поколение сессии для сервисов, у которых нет общего кэша."""
+
+    authentication_classes = []
+
+    @session_generation_swagger_schema()
+    @response_handler
+    def get(self, request, id: int) -> Response:
+        if not is_service_request(request=request):
+            return RESP.INVALID_TOKEN
+        generation = get_session_generation(user_id=id)
+        if generation is None:
+            return RESP.NOT_FOUND
+        return Response(data={"generation": generation})
+
+
+class AvatarAPIView(APIView):
+    authentication_classes = (JWTAuth,)
+    parser_classes = (MultiPartParser,)
+
+    @avatar_swagger_schema()
+    @response_handler
+    def post(self, request) -> Response:
+        avatar = request.FILES.get("avatar", None)
+        if avatar is None:
+            return RESP.NOT_ENOUGH_DATA
+        try:
+            validate_avatar(file=avatar)
+        except ValidationError as e:
+            return Response(
+                data={"error": e.message}, status=status.HTTP_400_BAD_REQUEST
+            )
+        # ? Ответ сразу с адресом загруженного файла, варианты строятся в фоне
+        url = handle_avatar_upload(user=request.user, avatar_file=avatar)
+        return Response(data={"avatarPath": url})
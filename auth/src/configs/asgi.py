@@ -2,6 +2,9 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "configs.settings")
 
 application = get_asgi_application()
+
+# ? Пул хеширования стартует в post_worker_init (gunicorn.conf.py) или лениво при
+# ? первом запросе: запуск здесь создал бы его в мастере до fork при preload_app
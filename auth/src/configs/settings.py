@@ -1,67 +1,114 @@
+import sys
 from os import getenv
 from pathlib import Path
 from datetime import timedelta
-from rest_framework.response import Response
 from rest_framework import status
 
 from dotenv import find_dotenv, load_dotenv
 
 load_dotenv(dotenv_path=find_dotenv())
 
+# ? Общий пакет razer_common лежит в корне репозитория (/shared в контейнере)
+sys.path.append(str(Path(__file__).resolve().parents[3] / "shared"))
+
+from razer_common.db import database_settings  # noqa: E402
+from razer_common.responses import StaticResponse  # noqa: E402
+
 
 class CONSTANTS:
     INITIALS_LEN = 100
+    PASSWORD_LEN = 256
     ROLE_CHOICES = (
         (r"User", r"Пользоватьель"),
         (r"Admin", r"Админ"),
     )
+    TOKEN_CACHE_SIZE = 10000
+    TOKEN_CACHE_TTL = 30
+    # ? "generation" - счётчик в User, "table" - записи TokenSession
+    SESSION_MODE = getenv(key="SESSION_MODE", default="generation")
+    HASH_WORKERS = int(getenv(key="HASH_WORKERS", default=0))
+    HASH_QUEUE_LIMIT = int(getenv(key="HASH_QUEUE_LIMIT", default=64))
+    AVATAR_DIR = "avatars"
+    AVATAR_SIZES = (500, 128, 64)
+    AVATAR_MAX_PIXELS = 40_000_000
+    AVATAR_WORKERS = int(getenv(key="AVATAR_WORKERS", default=2))
+    USER_BATCH_LIMIT = 5000
+    PROFILING_INTERVAL = float(getenv(key="PROFILING_INTERVAL", default=0.005))
+    PROFILING_RULES_TTL = 10
+    THROTTLE_MAX_KEYS = 100_000
+    PROFILING_MAX_FILES = int(getenv(key="PROFILING_MAX_FILES", default=200))
 
 
 class RESPONSES:
-    SUCCESS = Response(
+    SUCCESS = StaticResponse(
         data={"message": "Успешно выполнено"},
         status=status.HTTP_200_OK,
     )
-    BAD_REQUEST = Response(
+    BAD_REQUEST = StaticResponse(
         data={"error": "Неверный запрос"},
         status=status.HTTP_400_BAD_REQUEST,
     )
-    ALREADY_EXISTS = Response(
+    ALREADY_EXISTS = StaticResponse(
         data={"error": "Уже существует"},
         status=status.HTTP_400_BAD_REQUEST,
     )
-    NOT_ENOUGH_DATA = Response(
+    NOT_ENOUGH_DATA = StaticResponse(
         data={"error": "Недостаточно данных"},
         status=status.HTTP_400_BAD_REQUEST,
     )
-    INVALID_CRED = Response(
+    INVALID_CRED = StaticResponse(
         data={"error": "Неверные данные"},
         status=status.HTTP_400_BAD_REQUEST,
     )
-    INVALID_TOKEN = Response(
+    INVALID_TOKEN = StaticResponse(
         data={"error": "Невалидный токен"},
         status=status.HTTP_401_UNAUTHORIZED,
     )
-    NOT_FOUND = Response(
+    NOT_FOUND = StaticResponse(
         data={"error": "Не найдено"},
         status=status.HTTP_404_NOT_FOUND,
     )
-    SERVER_ERROR = Response(
+    SERVER_ERROR = StaticResponse(
         data={"error": "Ошибка сервера"},
         status=status.HTTP_500_INTERNAL_SERVER_ERROR,
     )
+    BUSY = StaticResponse(
+        data={"error": "Сервис перегружен"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+    )
+    THROTTLED = StaticResponse(
+        data={"error": "Слишком много запросов"},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
 
 
 SECRET_KEY = getenv(key="SECRET_KEY")
 
+JWT_ALGORITHM = getenv(key="JWT_ALGORITHM", default="HS256")
+
+JWT_PRIVATE_KEY_FILE = getenv(key="JWT_PRIVATE_KEY_FILE")
+
+JWT_PUBLIC_KEY_FILE = getenv(key="JWT_PUBLIC_KEY_FILE")
+
+SERVICE_API_KEY = getenv(key="SERVICE_API_KEY")
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-DEBUG = True
+# ? По умолчанию DEBUG выключен, docker-compose для разработки ставит DEBUG=1
+DEBUG = getenv(key="DEBUG", default="0") == "1"
+
+# ? Под manage.py test тоже: тесты собирают схему через generate_openapi
+TESTING = sys.argv[1:2] == ["test"]
+API_DOCS_LIVE = (
+    getenv(key="API_DOCS_LIVE", default="1" if DEBUG or TESTING else "0") == "1"
+)
 
 ALLOWED_HOSTS = [
     "localhost",
     "127.0.0.1",
     "0.0.0.0",
+    *filter(None, getenv(key="ALLOWED_HOSTS", default="").split(",")),
 ]
 
 INSTALLED_APPS = [
@@ -73,11 +120,14 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "corsheaders",
-    "drf_yasg",
     "api",
 ]
 
+if API_DOCS_LIVE:
+    INSTALLED_APPS.insert(-1, "drf_yasg")
+
 MIDDLEWARE = [
+    "razer_common.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -86,10 +136,35 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.ProfilingMiddleware",
 ]
 
 CORS_ALLOW_CREDENTIALS = True
 
+# ? local - token bucket в памяти процесса, cache - общий счётчик в CACHES
+THROTTLE_BACKEND = getenv(key="THROTTLE_BACKEND", default="local")
+
+THROTTLE_RATES = {
+    "signin_ip": getenv(key="THROTTLE_SIGNIN_IP", default="30/min"),
+    "signin_email": getenv(key="THROTTLE_SIGNIN_EMAIL", default="10/min"),
+    "signup_ip": getenv(key="THROTTLE_SIGNUP_IP", default="10/min"),
+    "signup_email": getenv(key="THROTTLE_SIGNUP_EMAIL", default="5/min"),
+}
+
+METRICS_SLOW_REQUEST_MS = int(getenv(key="METRICS_SLOW_REQUEST_MS", default=1000))
+
+METRICS_TOKEN = getenv(key="METRICS_TOKEN")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "razer": {"handlers": ["console"], "level": getenv("LOG_LEVEL", "INFO")},
+        "api": {"handlers": ["console"], "level": getenv("LOG_LEVEL", "INFO")},
+    },
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
     "http://0.0.0.0:3000",
@@ -108,7 +183,7 @@ CSRF_TRUSTED_ORIGINS = [
     "http://localhost:8000",
 ]
 
-ROOT_URLCONF = "backend.urls"
+ROOT_URLCONF = "configs.urls"
 
 TEMPLATES = [
     {
@@ -126,13 +201,42 @@ TEMPLATES = [
     },
 ]
 
-WSGI_APPLICATION = "backend.wsgi.application"
+WSGI_APPLICATION = "configs.wsgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+DATABASES = database_settings(base_dir=BASE_DIR)
+
+DATABASE_ROUTERS = ["razer_common.db.ReplicaRouter"]
+
+# ? Поколения сессий: auth пишет их без срока жизни, video читает. Общий
+# ? для обоих сервисов только Redis; без него video спрашивает auth
+SESSION_CACHE_URL = getenv(key="SESSION_CACHE_URL", default=getenv(key="REDIS_URL"))
+SESSION_CACHE_SHARED = bool(SESSION_CACHE_URL)
+
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": getenv(key="REDIS_URL"),
+        }
+        if getenv(key="REDIS_URL")
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    ),
+    "sessions": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": SESSION_CACHE_URL,
+            "TIMEOUT": None,
+            "KEY_PREFIX": "razer",
+        }
+        if SESSION_CACHE_SHARED
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "sessions",
+            "TIMEOUT": None,
+        }
+    ),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -150,6 +254,48 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASH_TIER = getenv(key="PASSWORD_HASH_TIER", default="default")
+
+PASSWORD_HASH_TIERS = {
+    "low": {"algorithm": "pbkdf2_sha256", "iterations": 300000},
+    "default": {"algorithm": "pbkdf2_sha256", "iterations": 870000},
+    "high": {"algorithm": "pbkdf2_sha256", "iterations": 1500000},
+    "scrypt": {
+        "algorithm": "scrypt",
+        "work_factor": 2**14,
+        "block_size": 8,
+        "parallelism": 1,
+    },
+    "argon2": {
+        "algorithm": "argon2",
+        "time_cost": 2,
+        "memory_cost": 65536,
+        "parallelism": 1,
+    },
+}
+
+TIERED_PASSWORD_HASHERS = {
+    "pbkdf2_sha256": "api.hashers.TieredPBKDF2PasswordHasher",
+    "scrypt": "api.hashers.TieredScryptPasswordHasher",
+    "argon2": "api.hashers.TieredArgon2PasswordHasher",
+}
+
+PREFERRED_PASSWORD_HASHER = TIERED_PASSWORD_HASHERS[
+    PASSWORD_HASH_TIERS[PASSWORD_HASH_TIER]["algorithm"]
+]
+
+# ? Первый хешер используется для новых паролей, остальные только проверяют
+PASSWORD_HASHERS = [
+    PREFERRED_PASSWORD_HASHER,
+    *(
+        hasher
+        for hasher in TIERED_PASSWORD_HASHERS.values()
+        if hasher != PREFERRED_PASSWORD_HASHER
+    ),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+
 LANGUAGE_CODE = "en-us"
 
 TIME_ZONE = "UTC"
@@ -160,9 +306,33 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# ? В образе статика собирается вне /app, чтобы её не перекрывал bind mount
+STATIC_ROOT = Path(getenv(key="STATIC_ROOT", default=BASE_DIR / "static"))
+
+MEDIA_URL = "media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
+OPENAPI_DIR = Path(getenv(key="OPENAPI_DIR", default=BASE_DIR / "openapi"))
+
+PROFILING_DIR = Path(getenv(key="PROFILING_DIR", default=BASE_DIR / "profiles"))
+
+PROFILING_TOKEN = getenv(key="PROFILING_TOKEN")
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
+    # ? Число прокси (nginx) перед сервисом для определения IP клиента
+    "NUM_PROXIES": int(getenv(key="NUM_PROXIES", default=0)),
+    "DEFAULT_RENDERER_CLASSES": (
+        "razer_common.fastjson.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "razer_common.fastjson.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
@@ -174,9 +344,13 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "UPDATE_LAST_LOGIN": True,
-    "ALGORITHM": "HS256",
-    "SIGNING_KEY": SECRET_KEY,
-    "VERIFYING_KEY": "",
+    "ALGORITHM": JWT_ALGORITHM,
+    "SIGNING_KEY": (
+        Path(JWT_PRIVATE_KEY_FILE).read_text() if JWT_PRIVATE_KEY_FILE else SECRET_KEY
+    ),
+    "VERIFYING_KEY": (
+        Path(JWT_PUBLIC_KEY_FILE).read_text() if JWT_PUBLIC_KEY_FILE else ""
+    ),
     "AUDIENCE": None,
     "ISSUER": None,
     "JSON_ENCODER": None,
@@ -1,7 +1,11 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
+from razer_common.metrics import metrics_view
 
 urlpatterns = [
     path(route="admin/", view=admin.site.urls),
     path(route="api/", view=include(arg="api.urls")),
-]
+    path(route="metrics", view=metrics_view, name="metrics"),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
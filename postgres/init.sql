@@ -0,0 +1,2 @@
+-- Базы сервисов: auth создаётся через POSTGRES_DB
+CREATE DATABASE video OWNER razer;
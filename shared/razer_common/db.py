@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from os import getenv
+from pathlib import Path
+from random import choice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+
+# ? OPTIONS для SQLite по значению SQLITE_PROFILE
+SQLITE_PROFILES = {
+    # ? Исходные настройки Django: журнал отката, только для сравнения
+    "journal": {},
+    "default": {"init_command": "PRAGMA journal_mode=WAL;"},
+    # ? Для установок, которые остаются на SQLite под нагрузкой
+    "performance": {
+        "init_command": (
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+            "PRAGMA mmap_size=268435456;"
+            "PRAGMA temp_store=MEMORY;"
+        ),
+        # ? busy timeout в секундах вместо мгновенного "database is locked"
+        "timeout": 20,
+        # ? atomic() сразу берёт блокировку записи, без гонки при повышении
+        "transaction_mode": "IMMEDIATE",
+    },
+}
+
+
+def database_settings(base_dir: Path) -> dict:
+    """
+    DATABASES из переменных окружения.
+
+    DB_ENGINE=postgres включает PostgreSQL (DB_NAME, DB_USER, DB_PASSWORD,
+    DB_HOST, DB_PORT) и реплики из DB_REPLICA_HOSTS через запятую. Без него
+    используется SQLite (DB_SQLITE_PATH) с настройками из SQLITE_PROFILE.
+    """
+    if getenv("DB_ENGINE", "sqlite") != "postgres":
+        profile = getenv("SQLITE_PROFILE", "default")
+        if profile not in SQLITE_PROFILES:
+            raise ImproperlyConfigured(f"Unknown SQLITE_PROFILE {profile!r}")
+        return {
+            "default": {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": getenv("DB_SQLITE_PATH") or base_dir / "db.sqlite3",
+                "OPTIONS": {**SQLITE_PROFILES[profile]},
+            }
+        }
+
+    default = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": getenv("DB_NAME", "razer"),
+        "USER": getenv("DB_USER", "razer"),
+        "PASSWORD": getenv("DB_PASSWORD", ""),
+        "HOST": getenv("DB_HOST", "localhost"),
+        "PORT": getenv("DB_PORT", "5432"),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    if getenv("DB_POOL", "0") == "1":
+        # ? Пул psycopg несовместим с постоянными соединениями Django
+        default["CONN_MAX_AGE"] = 0
+        default["OPTIONS"]["pool"] = {
+            "min_size": int(getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(getenv("DB_POOL_MAX_SIZE", 10)),
+            "timeout": int(getenv("DB_POOL_TIMEOUT", 10)),
+        }
+    else:
+        default["CONN_MAX_AGE"] = int(getenv("DB_CONN_MAX_AGE", 60))
+
+    databases = {"default": default}
+    hosts = filter(None, getenv("DB_REPLICA_HOSTS", "").split(","))
+    for index, host in enumerate(hosts):
+        host, _, port = host.strip().partition(":")
+        databases[f"replica_{index}"] = {
+            **default,
+            "OPTIONS": {**default["OPTIONS"]},
+            "HOST": host,
+            "PORT": port or default["PORT"],
+            "TEST": {"MIRROR": "default"},
+        }
+    return databases
+
+
+@contextmanager
+def use_replica():
+    """Чтения внутри блока уходят на реплики, если они настроены."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Запись и чтение по умолчанию идут в default; на реплики попадают только
+    чтения из блока use_replica, где допустимо небольшое отставание.
+    """
+
+    def __init__(self) -> None:
+        self.replicas = [alias for alias in settings.DATABASES if alias != "default"]
+
+    def db_for_read(self, model, **hints) -> str | None:
+        if self.replicas and _use_replica.get():
+            return choice(self.replicas)
+        return "default"
+
+    def db_for_write(self, model, **hints) -> str:
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        return db == "default"
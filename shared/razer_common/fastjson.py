@@ -0,0 +1,72 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import TimedRendererMixin
+from .responses import PrerenderedResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ? Типы, которых нет в orjson (Decimal, lazy-строки, QuerySet), - через DRF
+_encoder = JSONEncoder()
+
+# ? Даты тоже через DRF: миллисекунды и Z вместо микросекунд и +00:00
+_options = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson is not None
+    else None
+)
+
+
+def dumps(data) -> bytes:
+    """Компактный UTF-8 JSON; orjson, если установлен, иначе stdlib json."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default, option=_options)
+    return json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def loads(content: bytes | str):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class BaseFastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # ? Отступы нужны только browsable API, их отдаём обычному рендереру
+        if self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONRenderer(TimedRendererMixin, BaseFastJSONRenderer):
+    pass
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except ValueError as e:
+            raise ParseError(f"JSON parse error - {e}") from None
+
+
+class FastJsonResponse(PrerenderedResponse):
+    """Замена JsonResponse для view без DRF, с атрибутом data."""
+
+    def __init__(self, data, status: int = 200, headers=None) -> None:
+        super().__init__(content=dumps(data), data=data, status=status, headers=headers)
+
+
+def backend() -> str:
+    return "orjson" if orjson is not None else "json"
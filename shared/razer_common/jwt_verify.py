@@ -0,0 +1,172 @@
+from dataclasses import dataclass, field
+from json import loads
+from logging import getLogger
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Callable
+from urllib.request import urlopen
+
+import jwt
+
+logger = getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "RS384", "RS512", "ES256", "ES384", "EdDSA")
+
+
+class TokenError(Exception):
+    pass
+
+
+def session_generation_key(user_id) -> str:
+    return f"session-generation:{user_id}"
+
+
+@dataclass(frozen=True)
+class VerifiedToken:
+    user_id: int
+    generation: int | None
+    claims: dict = field(repr=False)
+
+
+class JWKSCache:
+    """
+    Локальная копия JWKS-документа.
+
+    Ключи перечитываются в фоне каждые `ttl` секунд, а при встрече
+    неизвестного `kid` - не чаще раза в `min_refresh` секунд.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: int = 300,
+        min_refresh: int = 30,
+        timeout: int = 5,
+    ) -> None:
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh = min_refresh
+        self.timeout = timeout
+        self._keys: dict[str | None, jwt.PyJWK] = {}
+        self._refreshed_at = None
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+    def refresh(self) -> None:
+        self._refreshed_at = monotonic()
+        with urlopen(self.url, timeout=self.timeout) as response:
+            document = loads(response.read())
+        keys = {}
+        for data in document.get("keys", []):
+            try:
+                key = jwt.PyJWK(jwk_data=data)
+            except jwt.PyJWKError:
+                logger.warning("Skipping unsupported JWK %s", data.get("kid"))
+                continue
+            keys[data.get("kid")] = key
+        with self._lock:
+            self._keys = keys
+
+    def get_key(self, kid: str | None) -> jwt.PyJWK:
+        key = self._lookup(kid=kid)
+        if key is None and (
+            self._refreshed_at is None
+            or monotonic() - self._refreshed_at >= self.min_refresh
+        ):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("JWKS refresh from %s failed", self.url)
+            key = self._lookup(kid=kid)
+        if key is None:
+            raise TokenError(f"Unknown signing key {kid!r}")
+        return key
+
+    def _lookup(self, kid: str | None) -> jwt.PyJWK | None:
+        with self._lock:
+            if kid is None and len(self._keys) == 1:
+                return next(iter(self._keys.values()))
+            return self._keys.get(kid)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = Thread(target=self._run, name="jwks-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(timeout=self.ttl):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("JWKS refresh from %s failed", self.url)
+
+
+class TokenVerifier:
+    """
+    Проверка токенов только по их содержимому: подпись, exp, тип и
+    поколение сессии. Обращений к базе сервиса auth нет; поколение, если
+    задан `generation_lookup`, берётся из общего кэша. Если поколение
+    узнать не удалось (lookup вернул None), токен отклоняется.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        key: str = None,
+        jwks: JWKSCache = None,
+        token_type: str = "access",
+        leeway: int = 0,
+        audience: str = None,
+        issuer: str = None,
+        generation_lookup: Callable[[int], int | None] = None,
+    ) -> None:
+        if key is None and jwks is None:
+            raise ValueError("Either key or jwks is required")
+        self.algorithm = algorithm
+        self.key = key
+        self.jwks = jwks
+        self.token_type = token_type
+        self.leeway = leeway
+        self.audience = audience
+        self.issuer = issuer
+        self.generation_lookup = generation_lookup
+
+    def signing_key(self, raw_token: str):
+        if self.jwks is None:
+            return self.key
+        try:
+            kid = jwt.get_unverified_header(raw_token).get("kid")
+        except jwt.InvalidTokenError as e:
+            raise TokenError(str(e)) from None
+        return self.jwks.get_key(kid=kid).key
+
+    def verify(self, raw_token: str) -> VerifiedToken:
+        try:
+            claims = jwt.decode(
+                raw_token,
+                key=self.signing_key(raw_token=raw_token),
+                algorithms=[self.algorithm],
+                leeway=self.leeway,
+                audience=self.audience,
+                issuer=self.issuer,
+                options={"require": ["exp", "user_id"]},
+            )
+        except jwt.InvalidTokenError as e:
+            raise TokenError(str(e)) from None
+        if claims.get("token_type") != self.token_type:
+            raise TokenError("Wrong token type")
+        generation = claims.get("generation")
+        if self.generation_lookup is not None:
+            current = self.generation_lookup(claims["user_id"])
+            if current is None or current != generation:
+                raise TokenError("Session expired")
+        return VerifiedToken(
+            user_id=claims["user_id"],
+            generation=generation,
+            claims=claims,
+        )
@@ -0,0 +1,239 @@
+from contextvars import ContextVar
+from hmac import compare_digest
+from json import dumps
+from logging import getLogger
+from os import environ
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    disable_created_metrics,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+from rest_framework.renderers import JSONRenderer
+
+logger = getLogger("razer.metrics")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# ? Серии *_created есть только без multiprocess: вывод одинаковый в обоих режимах
+disable_created_metrics()
+
+_current: ContextVar["RequestStats | None"] = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "render_time")
+
+    def __init__(self) -> None:
+        self.queries: list[tuple[float, str]] = []
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = perf_counter() - started
+        stats.db_time += elapsed
+        stats.queries.append((elapsed, sql))
+
+
+def install_query_recorder(sender, connection, **kwargs) -> None:
+    # ? Обёртка на каждое соединение, включая потоки sync_to_async:
+    # ? статистика запроса приходит туда через contextvar
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid="razer-metrics")
+
+
+class MetricsRegistry:
+    """
+    Метрики запросов на prometheus_client. Под gunicorn (каталог задаёт
+    PROMETHEUS_MULTIPROC_DIR в gunicorn.conf.py) каждый воркер пишет значения
+    в свои mmap-файлы, и /metrics любого воркера отдаёт сумму по всем
+    процессам, включая завершённые. Без переменной - метрики процесса.
+    """
+
+    def __init__(self) -> None:
+        self._registry = CollectorRegistry()
+        labels = ("view", "method", "status")
+        self.duration = Histogram(
+            "http_request_duration_seconds",
+            "Request latency by view",
+            labels,
+            buckets=DURATION_BUCKETS,
+            registry=self._registry,
+        )
+        self.queries = Histogram(
+            "http_request_db_queries",
+            "SQL queries per request",
+            labels,
+            buckets=QUERY_BUCKETS,
+            registry=self._registry,
+        )
+        # ? Counter сам добавляет к имени суффикс _total
+        self.counters = {
+            name: Counter(f"http_request_{name}", help, labels, registry=self._registry)
+            for name, help in (
+                ("db_seconds", "Time spent in SQL"),
+                ("render_seconds", "Time spent rendering responses"),
+                ("response_bytes", "Response body size"),
+            )
+        }
+
+    def observe(
+        self,
+        labels: tuple,
+        duration: float,
+        stats: RequestStats,
+        response_bytes: int,
+    ) -> None:
+        self.duration.labels(*labels).observe(duration)
+        self.queries.labels(*labels).observe(len(stats.queries))
+        for name, value in (
+            ("db_seconds", stats.db_time),
+            ("render_seconds", stats.render_time),
+            ("response_bytes", response_bytes),
+        ):
+            self.counters[name].labels(*labels).inc(value)
+
+    def render(self) -> bytes:
+        if not environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            return generate_latest(self._registry)
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return generate_latest(registry)
+
+    def clear(self) -> None:
+        for metric in (self.duration, self.queries, *self.counters.values()):
+            metric.clear()
+
+
+registry = MetricsRegistry()
+
+
+class TimedRendererMixin:
+    """Учитывает время сериализации рендерера DRF в метриках запроса."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        started = perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats.render_time += perf_counter() - started
+
+
+class TimedJSONRenderer(TimedRendererMixin, JSONRenderer):
+    pass
+
+
+class MetricsMiddleware:
+    """
+    Задержка, число и время SQL-запросов, время сериализации и размер ответа
+    по каждому view. Медленные запросы пишутся в лог вместе с SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # ? Соединения, открытые до загрузки middleware, сигнал уже пропустили
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(sender=None, connection=connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, perf_counter() - started)
+        return response
+
+    def finish(self, request, response, stats: RequestStats, duration: float) -> None:
+        match = request.resolver_match
+        # ? Для неразрешённых путей одна метка, чтобы не раздувать число серий
+        view = match.view_name if match else "<unmatched>"
+        if response.streaming:
+            size = int(response.get("Content-Length", 0))
+        else:
+            size = len(response.content)
+        registry.observe(
+            labels=(view, request.method, response.status_code),
+            duration=duration,
+            stats=stats,
+            response_bytes=size,
+        )
+        if duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            slowest = sorted(stats.queries, reverse=True)[:5]
+            logger.warning(
+                dumps(
+                    {
+                        "event": "slow_request",
+                        "view": view,
+                        "method": request.method,
+                        "path": request.path,
+                        "status": response.status_code,
+                        "duration_ms": round(duration * 1000, 2),
+                        "queries": len(stats.queries),
+                        "db_ms": round(stats.db_time * 1000, 2),
+                        "render_ms": round(stats.render_time * 1000, 2),
+                        "response_bytes": size,
+                        "slowest_sql": [
+                            {"ms": round(elapsed * 1000, 2), "sql": sql[:1000]}
+                            for elapsed, sql in slowest
+                        ],
+                    },
+                    ensure_ascii=False,
+                )
+            )
+
+
+def metrics_view(request) -> HttpResponse:
+    token = settings.METRICS_TOKEN
+    if token:
+        header = request.headers.get("Authorization", "")
+        if not compare_digest(header, f"Bearer {token}"):
+            return HttpResponseForbidden()
+    return HttpResponse(
+        content=registry.render(),
+        content_type=CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,67 @@
+import sys
+from collections import Counter
+from os import replace
+from pathlib import Path
+from threading import Event, Thread, get_ident
+
+
+class StackSampler:
+    """
+    Статистический профилировщик одного потока: раз в `interval` секунд
+    снимает его стек через sys._current_frames и считает одинаковые стеки.
+    Результат - collapsed stacks, которые понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(
+        self,
+        thread_id: int = None,
+        interval: float = 0.005,
+        max_depth: int = 128,
+    ) -> None:
+        self.thread_id = thread_id or get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter[str] = Counter()
+        self._stop = Event()
+        self._thread = None
+
+    def start(self) -> "StackSampler":
+        self._thread = Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(timeout=self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            self.stacks[self._collapse(frame=frame)] += 1
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            filename = "/".join(code.co_filename.rsplit("/", 2)[-2:])
+            names.append(f"{filename}:{code.co_name}:{code.co_firstlineno}")
+            frame = frame.f_back
+        # ? Корень стека слева, как требует формат collapsed
+        return ";".join(reversed(names))
+
+
+def write_collapsed(stacks: Counter, path: Path) -> None:
+    temp = path.with_name(f".{path.name}.tmp")
+    temp.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.items()))
+    replace(temp, path)
+
+
+def rotate(directory: Path, keep: int, pattern: str = "*.folded") -> None:
+    """Оставляет в каталоге только `keep` самых новых профилей."""
+    files = sorted(directory.glob(pattern), key=lambda file: file.stat().st_mtime)
+    for file in files[: max(0, len(files) - keep)]:
+        file.unlink(missing_ok=True)
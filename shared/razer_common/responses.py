@@ -0,0 +1,46 @@
+from json import dumps
+from types import MappingProxyType
+
+from django.http import HttpResponse
+
+
+class PrerenderedResponse(HttpResponse):
+    """
+    HttpResponse с готовым телом. Атрибут `data` повторяет тело, как у
+    Response из DRF, чтобы вызывающий код и тесты могли его читать.
+    """
+
+    def __init__(self, content: bytes, data, status: int, headers=None) -> None:
+        super().__init__(
+            content=content,
+            status=status,
+            content_type="application/json",
+            headers=headers,
+        )
+        self.data = data
+
+
+class StaticResponse:
+    """
+    Неизменяемый ответ с постоянным телом.
+
+    Тело сериализуется один раз при импорте настроек, а при каждом обращении
+    к атрибуту класса создаётся новый PrerenderedResponse: изменения одного
+    ответа (cookie, заголовки) не попадают в другие запросы, а DRF не тратит
+    время на выбор рендерера.
+    """
+
+    def __init__(self, data: dict, status: int, headers: dict = None) -> None:
+        self.data = MappingProxyType(data)
+        self.status = status
+        self.headers = MappingProxyType(headers or {})
+        # ? Так же, как JSONRenderer DRF: UTF-8 без экранирования и без пробелов
+        self.content = dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def __get__(self, instance, owner) -> PrerenderedResponse:
+        return PrerenderedResponse(
+            content=self.content,
+            data=self.data,
+            status=self.status,
+            headers=dict(self.headers),
+        )
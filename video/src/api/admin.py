@@ -1 +1,31 @@
 from django.contrib import admin
+
+from .models import Screenshot, VideoJob, VideoRequest
+
+
+class VideoRequestInline(admin.TabularInline):
+    model = VideoRequest
+    extra = 0
+    readonly_fields = ("user_id", "created_at")
+
+
+@admin.register(VideoJob)
+class VideoJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "video_id",
+        "status",
+        "attempts",
+        "locked_by",
+        "created_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("video_id", "source_url")
+    readonly_fields = ("locked_by", "locked_until", "started_at", "finished_at")
+    inlines = (VideoRequestInline,)
+
+
+@admin.register(Screenshot)
+class ScreenshotAdmin(admin.ModelAdmin):
+    list_display = ("video_id", "time", "phash", "image")
+    search_fields = ("video_id", "phash")
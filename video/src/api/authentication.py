@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import caches
+from razer_common.jwt_verify import (
+    JWKSCache,
+    TokenError,
+    TokenVerifier,
+    VerifiedToken,
+    session_generation_key,
+)
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .utils.auth_client import fetch_session_generation
+
+_verifier = None
+
+
+@dataclass(frozen=True)
+class ClaimsUser:
+    id: int
+    role: str | None = None
+    is_authenticated: bool = True
+    is_anonymous: bool = False
+
+
+def session_generation(user_id: int) -> int | None:
+    """
+    Текущее поколение сессии: из общего с auth кэша, при промахе или без
+    общего кэша - у самого auth. None означает отказ в доступе.
+    """
+    if settings.SESSION_CACHE_SHARED:
+        generation = caches["sessions"].get(key=session_generation_key(user_id=user_id))
+        if generation is not None:
+            return generation
+    return fetch_session_generation(user_id=user_id)
+
+
+def get_verifier() -> TokenVerifier:
+    global _verifier
+    if _verifier is None:
+        jwks = None
+        if settings.JWT_JWKS_URL:
+            jwks = JWKSCache(url=settings.JWT_JWKS_URL, ttl=settings.JWT_JWKS_TTL)
+            jwks.start()
+        _verifier = TokenVerifier(
+            algorithm=settings.SIMPLE_JWT["ALGORITHM"],
+            key=settings.SIMPLE_JWT["VERIFYING_KEY"]
+            or settings.SIMPLE_JWT["SIGNING_KEY"],
+            jwks=jwks,
+            leeway=settings.SIMPLE_JWT["LEEWAY"],
+            audience=settings.SIMPLE_JWT["AUDIENCE"],
+            issuer=settings.SIMPLE_JWT["ISSUER"],
+            generation_lookup=session_generation,
+        )
+    return _verifier
+
+
+class ClaimsAuthentication(BaseAuthentication):
+    """Аутентификация только по содержимому токена, без запросов к auth."""
+
+    def authenticate(self, request) -> tuple[ClaimsUser, VerifiedToken] | None:
+        raw_token = request.COOKIES.get("token")
+        if raw_token is None:
+            header = request.headers.get("Authorization", "").split()
+            if len(header) != 2 or header[0] != "Bearer":
+                return None
+            raw_token = header[1]
+        try:
+            token = get_verifier().verify(raw_token=raw_token)
+        except TokenError as e:
+            raise AuthenticationFailed(detail=str(e), code="invalid_token") from None
+        return ClaimsUser(id=token.user_id, role=token.claims.get("role")), token
+
+    def authenticate_header(self, request) -> str:
+        return "Bearer"
@@ -0,0 +1,73 @@
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...utils.frame_utils import (
+    extract_keyframes,
+    probe_duration,
+    scene_scores,
+    select_candidates,
+)
+
+CON = settings.CONSTANTS
+
+
+class Command(BaseCommand):
+    help = "Замеряет извлечение ключевых кадров и поиск смен сцен на видеофайле"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("path", type=Path, help="Видеофайл")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Процессов-декодеров, 0 - FRAME_WORKERS или число ядер",
+        )
+        parser.add_argument(
+            "--compare-full",
+            action="store_true",
+            help="Для сравнения декодировать все кадры в одном процессе",
+        )
+
+    def handle(self, *args, **options) -> None:
+        path = options["path"]
+        duration = probe_duration(path=path)
+
+        started = perf_counter()
+        times, thumbs = extract_keyframes(path=path, workers=options["workers"])
+        decoded = perf_counter() - started
+        candidates = select_candidates(times=times, scores=scene_scores(thumbs))
+        elapsed = perf_counter() - started
+
+        self.stdout.write(f"duration:    {duration:.1f} s")
+        self.stdout.write(f"keyframes:   {len(times)}")
+        self.stdout.write(
+            f"candidates:  {len(candidates)} "
+            f"({sum(candidate['cut'] for candidate in candidates)} cuts)"
+        )
+        self.stdout.write(f"decode:      {decoded:.2f} s")
+        self.stdout.write(
+            f"total:       {elapsed:.2f} s ({elapsed / duration:.4f} of real time)"
+        )
+
+        if options["compare_full"]:
+            started = perf_counter()
+            count = self.decode_all(path=path)
+            elapsed = perf_counter() - started
+            self.stdout.write(
+                f"all frames:  {count} in {elapsed:.2f} s "
+                f"({elapsed / duration:.4f} of real time)"
+            )
+
+    def decode_all(self, path: Path) -> int:
+        import av
+
+        width, height = CON.FRAME_THUMB_SIZE
+        count = 0
+        with av.open(str(path)) as container:
+            for frame in container.decode(video=0):
+                frame.reformat(width=width, height=height, format="gray").to_ndarray()
+                count += 1
+        return count
@@ -0,0 +1,151 @@
+from io import BytesIO
+from json import dumps
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from razer_common.fastjson import FastJSONParser, FastJSONRenderer, backend
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+PARAGRAPH = (
+    "Ведущий объясняет, как настроить кадр и свет перед записью, и показывает, "
+    "какие ошибки чаще всего встречаются у начинающих авторов. "
+) * 3
+
+
+def article_payload(paragraphs: int) -> dict:
+    return {
+        "id": 1,
+        "videoId": "dQw4w9WgXcQ",
+        "title": "Статья по видео",
+        "paragraphs": [
+            {
+                "index": index,
+                "start": index * 12.5,
+                "end": index * 12.5 + 11.75,
+                "text": PARAGRAPH,
+                "frames": [
+                    {
+                        "time": index * 12.5 + offset,
+                        "url": f"/media/frames/{index:05d}_{offset}.jpg",
+                        "hash": "c3a5f0e1b2d49786",
+                    }
+                    for offset in range(3)
+                ],
+            }
+            for index in range(paragraphs)
+        ],
+    }
+
+
+def users_payload(users: int) -> dict:
+    return {
+        "users": [
+            {
+                "id": id,
+                "email": f"user{id}@example.com",
+                "name": f"Пользователь {id}",
+                "role": "brand",
+                "isActive": True,
+                "avatarPath": None,
+                "avatarVariants": None,
+            }
+            for id in range(users)
+        ],
+        "missing": [],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает скорость JSONRenderer/JSONParser DRF и FastJSON на типичных ответах"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--paragraphs", type=int, default=300, help="Абзацев в статье"
+        )
+        parser.add_argument(
+            "--users", type=int, default=500, help="Пользователей в пачке"
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=1.0,
+            help="Время замера одной операции в секундах",
+        )
+        parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+
+    def handle(self, *args, **options) -> None:
+        payloads = {
+            "article": article_payload(paragraphs=options["paragraphs"]),
+            "users": users_payload(users=options["users"]),
+        }
+        results = []
+        for name, payload in payloads.items():
+            body = JSONRenderer().render(payload)
+            for label, renderer in (
+                ("drf", JSONRenderer()),
+                (backend(), FastJSONRenderer()),
+            ):
+                results.append(
+                    self.measure(
+                        payload=name,
+                        operation="render",
+                        implementation=label,
+                        function=lambda: renderer.render(payload),
+                        size=len(body),
+                        duration=options["duration"],
+                    )
+                )
+            for label, parser in (("drf", JSONParser()), (backend(), FastJSONParser())):
+                results.append(
+                    self.measure(
+                        payload=name,
+                        operation="parse",
+                        implementation=label,
+                        function=lambda: parser.parse(BytesIO(body)),
+                        size=len(body),
+                        duration=options["duration"],
+                    )
+                )
+
+        if options["json"]:
+            self.stdout.write(
+                dumps({"backend": backend(), "results": results}, indent=2)
+            )
+            return
+        self.stdout.write(f"fast backend: {backend()}")
+        for result in results:
+            self.stdout.write(
+                f"{result['payload']:<8} {result['operation']:<7} "
+                f"{result['implementation']:<7} {result['bytes']:>9} B "
+                f"{result['ops_per_second']:>10.1f} op/s "
+                f"{result['mb_per_second']:>8.1f} MB/s"
+            )
+
+    def measure(
+        self,
+        payload: str,
+        operation: str,
+        implementation: str,
+        function,
+        size: int,
+        duration: float,
+    ) -> dict:
+        count = 0
+        started = perf_counter()
+        while True:
+            function()
+            count += 1
+            elapsed = perf_counter() - started
+            if elapsed >= duration:
+                break
+        return {
+            "payload": payload,
+            "operation": operation,
+            "implementation": implementation,
+            "bytes": size,
+            "ops_per_second": count / elapsed,
+            "mb_per_second": count * size / elapsed / 1_000_000,
+        }
@@ -0,0 +1,103 @@
+import multiprocessing
+import signal
+from logging import getLogger
+from os import getpid
+from socket import gethostname
+from time import sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ...utils.job_utils import Worker
+
+CON = settings.CONSTANTS
+
+logger = getLogger("api")
+
+
+def worker_main(prefix: str, burst: bool) -> None:
+    worker = Worker(worker_id=f"{prefix}:{getpid()}")
+
+    # ? Текущая задача дорабатывается, новые не берутся
+    def stop(signum, frame) -> None:
+        worker.stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if burst:
+        while not worker.stopping.is_set() and worker.run_once():
+            pass
+    else:
+        worker.run()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Запускает процессы-воркеры очереди VideoJob. Команду можно запускать "
+        "на нескольких узлах: задачи распределяются через базу"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=CON.JOB_WORKERS,
+            help="Количество процессов-воркеров",
+        )
+        parser.add_argument(
+            "--name",
+            default=gethostname(),
+            help="Префикс имени воркера в locked_by",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Обработать очередь и выйти",
+        )
+
+    def handle(self, *args, **options) -> None:
+        # ? Соединения с базой не должны переходить в дочерние процессы
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        stopping = False
+        processes = []
+
+        def stop(signum, frame) -> None:
+            nonlocal stopping
+            stopping = True
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        def spawn() -> multiprocessing.Process:
+            process = context.Process(
+                target=worker_main, args=(options["name"], options["burst"])
+            )
+            process.start()
+            return process
+
+        processes.extend(spawn() for _ in range(options["processes"]))
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        self.stdout.write(f"Started {len(processes)} video workers")
+
+        while processes:
+            sleep(1)
+            for index, process in enumerate(processes):
+                if process.is_alive():
+                    continue
+                process.join()
+                if stopping or options["burst"] or process.exitcode == 0:
+                    processes[index] = None
+                    continue
+                # ? Упавший процесс заменяется новым, его задачу вернёт
+                # ? requeue_expired после истечения аренды
+                logger.warning(
+                    "Video worker %s exited with %s, restarting",
+                    process.pid,
+                    process.exitcode,
+                )
+                processes[index] = spawn()
+            processes[:] = [process for process in processes if process is not None]
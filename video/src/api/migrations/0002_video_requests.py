@@ -0,0 +1,83 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from api.utils.source_utils import parse_video_id
+
+
+def split_requests(apps, schema_editor):
+    """
+    Автор задачи становится её первым запросом, задачи получают ID видео.
+    Дублирующие активные задачи одного видео закрываются, а их запросы
+    переходят к первой.
+    """
+    VideoJob = apps.get_model('api', 'VideoJob')
+    VideoRequest = apps.get_model('api', 'VideoRequest')
+    active = {}
+    for job in VideoJob.objects.order_by('id'):
+        video_id = parse_video_id(url=job.source_url) or ''
+        target = job
+        if job.status in ('queued', 'running'):
+            if not video_id:
+                job.status = 'failed'
+                job.error = 'Ссылка не распознана как видео YouTube'
+            elif video_id in active:
+                target = active[video_id]
+                job.status = 'failed'
+                job.error = f'Объединена с задачей {target.id}'
+            else:
+                active[video_id] = job
+        job.video_id = video_id
+        job.save(update_fields=('video_id', 'status', 'error'))
+        VideoRequest.objects.get_or_create(job=target, user_id=job.user_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.PositiveIntegerField(verbose_name='ID пользователя')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Запрос видео',
+                'verbose_name_plural': 'Запросы видео',
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.AddField(
+            model_name='videorequest',
+            name='job',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='requests', to='api.videojob', verbose_name='Задача'),
+        ),
+        migrations.AddConstraint(
+            model_name='videorequest',
+            constraint=models.UniqueConstraint(fields=('user_id', 'job'), name='api_videorequest_user_job_uniq'),
+        ),
+        migrations.AddField(
+            model_name='videojob',
+            name='video_id',
+            field=models.CharField(blank=True, default='', max_length=11, verbose_name='ID видео'),
+        ),
+        migrations.RunPython(split_requests, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='videojob',
+            name='user_id',
+        ),
+        migrations.AddIndex(
+            model_name='videojob',
+            index=models.Index(fields=['video_id', 'status'], name='api_videojob_video_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='videojob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('queued', 'running'))), fields=('video_id',), name='api_videojob_active_video_uniq'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_video_requests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Screenshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=11, verbose_name='ID видео')),
+                ('time', models.FloatField(verbose_name='Время, с')),
+                ('phash', models.CharField(max_length=16, verbose_name='pHash')),
+                ('dhash', models.CharField(max_length=16, verbose_name='dHash')),
+                ('image', models.ImageField(upload_to='frames/', verbose_name='Изображение')),
+            ],
+            options={
+                'verbose_name': 'Скриншот',
+                'verbose_name_plural': 'Скриншоты',
+                'ordering': ('video_id', 'time'),
+                'constraints': [models.UniqueConstraint(fields=('video_id', 'time'), name='api_screenshot_video_time_uniq')],
+            },
+        ),
+    ]
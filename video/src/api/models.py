@@ -1 +1,170 @@
 from django.db import models
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+CON = settings.CONSTANTS
+
+
+class VideoJob(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    video_id = models.CharField(
+        verbose_name="ID видео",
+        max_length=CON.VIDEO_ID_LEN,
+        blank=True,
+        default="",
+    )
+    source_url = models.CharField(
+        verbose_name="Ссылка на видео",
+        max_length=CON.SOURCE_URL_LEN,
+    )
+    status = models.CharField(
+        verbose_name="Статус",
+        max_length=16,
+        choices=CON.JOB_STATUS_CHOICES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name="Попыток",
+        default=0,
+    )
+    run_after = models.DateTimeField(
+        verbose_name="Не раньше",
+        default=timezone.now,
+    )
+    locked_by = models.CharField(
+        verbose_name="Воркер",
+        max_length=100,
+        blank=True,
+        default="",
+    )
+    locked_until = models.DateTimeField(
+        verbose_name="Аренда до",
+        null=True,
+        blank=True,
+    )
+    result = models.JSONField(
+        verbose_name="Результат",
+        null=True,
+        blank=True,
+    )
+    error = models.TextField(
+        verbose_name="Ошибка",
+        blank=True,
+        default="",
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Дата создания",
+        auto_now_add=True,
+    )
+    started_at = models.DateTimeField(
+        verbose_name="Дата начала",
+        null=True,
+        blank=True,
+    )
+    finished_at = models.DateTimeField(
+        verbose_name="Дата завершения",
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = "Задача обработки видео"
+        verbose_name_plural = "Задачи обработки видео"
+        ordering = ("-id",)
+        constraints = (
+            # ? Одна активная задача на видео: повторные запросы к ней присоединяются
+            models.UniqueConstraint(
+                fields=("video_id",),
+                name="api_videojob_active_video_uniq",
+                condition=Q(status__in=("queued", "running")),
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("video_id", "status"),
+                name="api_videojob_video_idx",
+            ),
+            # ? Частичные индексы остаются маленькими: в них только живые задачи
+            models.Index(
+                fields=("run_after", "id"),
+                name="api_videojob_queued_idx",
+                condition=Q(status="queued"),
+            ),
+            models.Index(
+                fields=("locked_until",),
+                name="api_videojob_running_idx",
+                condition=Q(status="running"),
+            ),
+        )
+
+
+class VideoRequest(models.Model):
+    """Запрос пользователя на видео; несколько запросов делят одну задачу."""
+
+    job = models.ForeignKey(
+        verbose_name="Задача",
+        to=VideoJob,
+        on_delete=models.CASCADE,
+        related_name="requests",
+    )
+    user_id = models.PositiveIntegerField(
+        verbose_name="ID пользователя",
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Дата создания",
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = "Запрос видео"
+        verbose_name_plural = "Запросы видео"
+        ordering = ("-created_at",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user_id", "job"),
+                name="api_videorequest_user_job_uniq",
+            ),
+        )
+
+
+class Screenshot(models.Model):
+    """
+    Скриншот, оставшийся после дедупликации. Хеши хранятся, чтобы искать
+    похожие кадры и в других видео (например, заставки одного канала).
+    """
+
+    video_id = models.CharField(
+        verbose_name="ID видео",
+        max_length=CON.VIDEO_ID_LEN,
+    )
+    time = models.FloatField(
+        verbose_name="Время, с",
+    )
+    phash = models.CharField(
+        verbose_name="pHash",
+        max_length=16,
+    )
+    dhash = models.CharField(
+        verbose_name="dHash",
+        max_length=16,
+    )
+    image = models.ImageField(
+        verbose_name="Изображение",
+        upload_to="frames/",
+    )
+
+    class Meta:
+        verbose_name = "Скриншот"
+        verbose_name_plural = "Скриншоты"
+        ordering = ("video_id", "time")
+        constraints = (
+            models.UniqueConstraint(
+                fields=("video_id", "time"),
+                name="api_screenshot_video_time_uniq",
+            ),
+        )
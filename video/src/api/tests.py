@@ -1 +1,820 @@
-from django.test import TestCase
+import os
+from datetime import datetime, timedelta, timezone
+from importlib.util import find_spec
+from itertools import chain, count, islice
+from unittest import skipUnless
+from json import dumps
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import jwt
+import numpy as np
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from razer_common.jwt_verify import (
+    JWKSCache,
+    TokenError,
+    TokenVerifier,
+    session_generation_key,
+)
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from .authentication import ClaimsAuthentication
+from .models import Screenshot, VideoJob
+from .utils import auth_client, job_utils
+from .utils.caption_utils import (
+    Cue,
+    iter_cues,
+    paragraphs,
+    parse_timestamp,
+    read_cues,
+    segment,
+)
+from .utils.dedup_utils import (
+    BKTree,
+    DuplicateIndex,
+    dedup,
+    dhash,
+    frame_hashes,
+    hamming,
+    phash,
+    save_screenshot,
+    similar_screenshots,
+)
+from .utils.frame_utils import (
+    decode_keyframes,
+    extract_keyframes,
+    scene_scores,
+    select_candidates,
+)
+from .utils.ingest_utils import (
+    FetchError,
+    LocalFetcher,
+    MediaStore,
+    fetch,
+    fetch_captions,
+)
+from .utils.job_utils import (
+    Worker,
+    claim,
+    complete,
+    enqueue,
+    fail,
+    heartbeat,
+    requeue_expired,
+)
+from .utils.source_utils import parse_video_id
+
+
+def make_token(key, algorithm: str = "HS256", **claims) -> str:
+    payload = {
+        "token_type": "access",
+        "user_id": 1,
+        "generation": 1,
+        "exp": datetime.now(tz=timezone.utc) + timedelta(minutes=1),
+    }
+    payload.update(claims)
+    return jwt.encode(payload=payload, key=key, algorithm=algorithm)
+
+
+@override_settings(SESSION_CACHE_SHARED=True)
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self) -> None:
+        caches["sessions"].clear()
+        caches["sessions"].set(key=session_generation_key(user_id=1), value=1)
+        self.factory = APIRequestFactory()
+        self.key = settings.SIMPLE_JWT["SIGNING_KEY"]
+
+    def authenticate(self, token: str):
+        request = self.factory.get(path="/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        return ClaimsAuthentication().authenticate(request=request)
+
+    def test_valid_token_without_db(self) -> None:
+        with self.assertNumQueries(0):
+            user, token = self.authenticate(token=make_token(key=self.key))
+        self.assertEqual(user.id, 1)
+        self.assertEqual(token.generation, 1)
+
+    def test_expired_token(self) -> None:
+        expired = datetime.now(tz=timezone.utc) - timedelta(seconds=1)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token=make_token(key=self.key, exp=expired))
+
+    def test_refresh_token_rejected(self) -> None:
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token=make_token(key=self.key, token_type="refresh"))
+
+    def test_rotated_generation_rejected(self) -> None:
+        caches["sessions"].set(key=session_generation_key(user_id=1), value=2)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token=make_token(key=self.key))
+
+    def test_cache_miss_asks_auth(self) -> None:
+        caches["sessions"].clear()
+        with patch(
+            "api.authentication.fetch_session_generation", return_value=1
+        ) as fetch_generation:
+            user, _ = self.authenticate(token=make_token(key=self.key))
+        fetch_generation.assert_called_once_with(user_id=1)
+        self.assertEqual(user.id, 1)
+
+    def test_unknown_generation_rejected(self) -> None:
+        # ? Ни кэша, ни ответа auth: токен не принимается
+        caches["sessions"].clear()
+        with patch("api.authentication.fetch_session_generation", return_value=None):
+            with self.assertRaises(AuthenticationFailed):
+                self.authenticate(token=make_token(key=self.key))
+
+
+class FakeResponse:
+    def __init__(self, body: bytes, etag: str) -> None:
+        self.body = body
+        self.headers = {"ETag": etag}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def read(self) -> bytes:
+        return self.body
+
+
+class AuthClientTests(TestCase):
+    def setUp(self) -> None:
+        auth_client._etag_cache.clear()
+
+    def test_etag_cache_is_bounded(self) -> None:
+        def respond(request, timeout):
+            return FakeResponse(body=b'{"users": []}', etag=f'"{request.full_url}"')
+
+        with patch.object(auth_client, "urlopen", side_effect=respond), patch.object(
+            settings.CONSTANTS, "USER_ETAG_CACHE_SIZE", 2
+        ):
+            for user_id in range(1, 6):
+                auth_client.fetch_users(ids=[user_id])
+        self.assertEqual(list(auth_client._etag_cache), ["4", "5"])
+
+
+class JWKSVerifierTests(TestCase):
+    def setUp(self) -> None:
+        self.private_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048
+        )
+        public_pem = self.private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        algorithm = jwt.get_algorithm_by_name("RS256")
+        jwk = algorithm.to_jwk(algorithm.prepare_key(public_pem), as_dict=True)
+        jwk.update(kid="main", alg="RS256")
+        self.tmp = TemporaryDirectory()
+        jwks_path = Path(self.tmp.name) / "jwks.json"
+        jwks_path.write_text(dumps({"keys": [jwk]}))
+        self.verifier = TokenVerifier(
+            algorithm="RS256",
+            jwks=JWKSCache(url=jwks_path.as_uri()),
+        )
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_rs256_token_verified_from_jwks(self) -> None:
+        token = make_token(key=self.private_key, algorithm="RS256")
+        self.assertEqual(self.verifier.verify(raw_token=token).user_id, 1)
+
+    def test_foreign_key_rejected(self) -> None:
+        other = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        with self.assertRaises(TokenError):
+            self.verifier.verify(raw_token=make_token(key=other, algorithm="RS256"))
+
+
+def store_url(job, context: dict) -> None:
+    context["url"] = job.source_url
+
+
+def broken_stage(job, context: dict) -> None:
+    raise RuntimeError("boom")
+
+
+class VideoJobQueueTests(TestCase):
+    def setUp(self) -> None:
+        self.job = enqueue(user_id=1, video_id="dQw4w9WgXcQ")
+
+    def test_enqueue_coalesces_requests(self) -> None:
+        self.assertEqual(enqueue(user_id=1, video_id="dQw4w9WgXcQ").id, self.job.id)
+        self.assertEqual(enqueue(user_id=2, video_id="dQw4w9WgXcQ").id, self.job.id)
+        self.assertEqual(self.job.requests.count(), 2)
+
+        # ? Готовая задача переиспользуется, после ошибки создаётся новая
+        VideoJob.objects.update(status=VideoJob.DONE)
+        self.assertEqual(enqueue(user_id=3, video_id="dQw4w9WgXcQ").id, self.job.id)
+        VideoJob.objects.update(status=VideoJob.FAILED)
+        self.assertNotEqual(enqueue(user_id=3, video_id="dQw4w9WgXcQ").id, self.job.id)
+
+    def test_claim_is_exclusive(self) -> None:
+        [job] = claim(worker_id="a")
+        self.assertEqual(job.status, VideoJob.RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.locked_by, "a")
+        self.assertEqual(claim(worker_id="b"), [])
+
+    def test_future_jobs_not_claimed(self) -> None:
+        VideoJob.objects.update(run_after=now() + timedelta(minutes=1))
+        self.assertEqual(claim(worker_id="a"), [])
+
+    def test_fail_retries_with_backoff_then_fails(self) -> None:
+        [job] = claim(worker_id="a")
+        self.assertTrue(fail(job=job, worker_id="a", error="boom"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, VideoJob.QUEUED)
+        self.assertGreater(job.run_after, now())
+
+        VideoJob.objects.update(attempts=settings.CONSTANTS.JOB_MAX_ATTEMPTS - 1)
+        VideoJob.objects.update(run_after=now())
+        [job] = claim(worker_id="a")
+        fail(job=job, worker_id="a", error="boom")
+        job.refresh_from_db()
+        self.assertEqual(job.status, VideoJob.FAILED)
+        self.assertEqual(job.error, "boom")
+
+    def test_expired_lease_is_requeued(self) -> None:
+        [job] = claim(worker_id="a")
+        VideoJob.objects.update(locked_until=now() - timedelta(seconds=1))
+        self.assertEqual(requeue_expired(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, VideoJob.QUEUED)
+        # ? Старый воркер больше не владеет задачей
+        self.assertFalse(heartbeat(job=job, worker_id="a"))
+        self.assertFalse(complete(job=job, worker_id="a", result={}))
+
+    def test_heartbeat_before_requeue_keeps_lease(self) -> None:
+        [job] = claim(worker_id="a")
+        VideoJob.objects.update(locked_until=now() - timedelta(seconds=1))
+
+        def late_fail(job: VideoJob, **kwargs) -> bool:
+            # ? Воркер продлил аренду между выборкой и UPDATE
+            heartbeat(job=job, worker_id="a")
+            return fail(job=job, **kwargs)
+
+        with patch.object(job_utils, "fail", side_effect=late_fail):
+            self.assertEqual(requeue_expired(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, VideoJob.RUNNING)
+        self.assertEqual(job.locked_by, "a")
+
+    @override_settings(VIDEO_PIPELINE=["api.tests.store_url"])
+    def test_worker_runs_pipeline(self) -> None:
+        self.assertTrue(Worker(worker_id="w").run_once())
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, VideoJob.DONE)
+        self.assertEqual(self.job.result, {"url": self.job.source_url})
+        self.assertFalse(Worker(worker_id="w").run_once())
+
+    @override_settings(VIDEO_PIPELINE=["api.tests.broken_stage"])
+    def test_worker_records_error(self) -> None:
+        with self.assertLogs(logger="api", level="ERROR"):
+            Worker(worker_id="w").run_once()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, VideoJob.QUEUED)
+        self.assertEqual(self.job.error, "RuntimeError: boom")
+
+
+@override_settings(SESSION_CACHE_SHARED=True)
+class VideoJobAPITests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        caches["sessions"].set(key=session_generation_key(user_id=1), value=1)
+        token = make_token(key=settings.SIMPLE_JWT["SIGNING_KEY"])
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_submit_and_status(self) -> None:
+        response = self.client.post(
+            path=reverse(viewname="jobs"),
+            data={"url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], VideoJob.QUEUED)
+
+        response = self.client.get(
+            path=reverse(viewname="job", kwargs={"id": response.data["id"]})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self.client.get(reverse("jobs")).data["jobs"]), 1)
+
+    def test_invalid_url(self) -> None:
+        for url in ("ftp://youtu.be/dQw4w9WgXcQ", "https://vimeo.com/1"):
+            response = self.client.post(
+                path=reverse(viewname="jobs"), data={"url": url}, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unhandled_error(self) -> None:
+        with patch("api.views.enqueue", side_effect=RuntimeError), self.assertLogs(
+            logger="api", level="ERROR"
+        ):
+            response = self.client.post(
+                path=reverse(viewname="jobs"),
+                data={"url": "https://youtu.be/dQw4w9WgXcQ"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data, {"message": "An error occurred"})
+
+    def test_processed_video_returned_immediately(self) -> None:
+        job = enqueue(user_id=2, video_id="dQw4w9WgXcQ")
+        VideoJob.objects.update(status=VideoJob.DONE, result={})
+        response = self.client.post(
+            path=reverse(viewname="jobs"),
+            data={"url": "https://youtu.be/dQw4w9WgXcQ?t=42"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], job.id)
+
+    def test_foreign_job_hidden(self) -> None:
+        job = enqueue(user_id=2, video_id="dQw4w9WgXcQ")
+        response = self.client.get(path=reverse(viewname="job", kwargs={"id": job.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_requires_token(self) -> None:
+        self.client.credentials()
+        response = self.client.get(path=reverse(viewname="jobs"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SourceUtilsTests(TestCase):
+    def test_parse_video_id(self) -> None:
+        for url in (
+            "dQw4w9WgXcQ",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL1&t=10s",
+            "youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+            "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://youtu.be/dQw4w9WgXcQ?si=abc",
+            "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+            "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+        ):
+            self.assertEqual(parse_video_id(url=url), "dQw4w9WgXcQ", url)
+
+    def test_rejects_other_urls(self) -> None:
+        for url in (
+            "https://vimeo.com/dQw4w9WgXcQ",
+            "https://www.youtube.com/watch?v=short",
+            "https://www.youtube.com/channel/dQw4w9WgXcQ",
+            "javascript:alert(1)",
+            "https://youtu.be/",
+        ):
+            self.assertIsNone(parse_video_id(url=url), url)
+
+
+class CountingFetcher(LocalFetcher):
+    calls = 0
+    caption_calls = 0
+
+    def fetch(self, video_id: str, directory: Path) -> Path:
+        CountingFetcher.calls += 1
+        return super().fetch(video_id=video_id, directory=directory)
+
+    def fetch_captions(self, video_id: str, directory: Path) -> Path | None:
+        CountingFetcher.caption_calls += 1
+        return super().fetch_captions(video_id=video_id, directory=directory)
+
+
+class IngestTests(TestCase):
+    def setUp(self) -> None:
+        self.tmp = TemporaryDirectory()
+        self.sources = Path(self.tmp.name) / "sources"
+        self.sources.mkdir()
+        for video_id, content in (
+            ("aaaaaaaaaaa", b"a" * 100),
+            ("bbbbbbbbbbb", b"b" * 100),
+            ("ccccccccccc", b"a" * 100),
+        ):
+            (self.sources / f"{video_id}.mp4").write_bytes(content)
+        self.store = MediaStore(root=Path(self.tmp.name) / "store", quota=250)
+        CountingFetcher.calls = CountingFetcher.caption_calls = 0
+        self.settings = override_settings(
+            VIDEO_FETCHER="api.tests.CountingFetcher",
+            VIDEO_LOCAL_SOURCE_DIR=str(self.sources),
+        )
+        self.settings.enable()
+
+    def tearDown(self) -> None:
+        self.settings.disable()
+        self.tmp.cleanup()
+
+    def test_fetch_once_and_dedupe_content(self) -> None:
+        first = fetch(video_id="aaaaaaaaaaa", store=self.store)
+        self.assertEqual(fetch(video_id="aaaaaaaaaaa", store=self.store), first)
+        self.assertEqual(CountingFetcher.calls, 1)
+        # ? Другое видео с тем же содержимым хранится одним файлом
+        self.assertEqual(fetch(video_id="ccccccccccc", store=self.store), first)
+        self.assertEqual(len(list(self.store.root.glob("blobs/*/*"))), 1)
+
+    def test_lru_eviction_under_quota(self) -> None:
+        old = fetch(video_id="aaaaaaaaaaa", store=self.store)
+        os.utime(old, (0, 0))
+        self.store.quota = 150
+        fetch(video_id="bbbbbbbbbbb", store=self.store)
+        self.assertFalse(old.exists())
+        self.assertIsNone(self.store.lookup(key="aaaaaaaaaaa"))
+        fetch(video_id="aaaaaaaaaaa", store=self.store)
+        self.assertEqual(CountingFetcher.calls, 3)
+
+    def test_recent_files_survive_eviction(self) -> None:
+        # ? Файл выдан lookup другому воркеру, но ещё не открыт
+        first = fetch(video_id="aaaaaaaaaaa", store=self.store)
+        self.store.quota = 150
+        fetch(video_id="bbbbbbbbbbb", store=self.store)
+        self.assertTrue(first.exists())
+        os.utime(first, (0, 0))
+        self.assertEqual(self.store.evict(), [first.name])
+
+    def test_missing_captions_are_remembered(self) -> None:
+        for _ in range(2):
+            self.assertIsNone(fetch_captions(video_id="bbbbbbbbbbb", store=self.store))
+        self.assertEqual(CountingFetcher.caption_calls, 1)
+        # ? Запись устаревает, и источник спрашивают снова
+        index = self.store.root / "sources" / "bbbbbbbbbbb.captions"
+        os.utime(index, (0, 0))
+        (self.sources / "bbbbbbbbbbb.vtt").write_text(VTT)
+        captions = fetch_captions(video_id="bbbbbbbbbbb", store=self.store)
+        self.assertEqual(captions.read_text(), VTT)
+        self.assertEqual(CountingFetcher.caption_calls, 2)
+
+    def test_missing_source(self) -> None:
+        with self.assertRaises(FetchError):
+            fetch(video_id="zzzzzzzzzzz", store=self.store)
+        self.assertEqual(list(self.store.root.glob("tmp/*")), [])
+
+    def test_captions_are_stored_apart_from_video(self) -> None:
+        (self.sources / "aaaaaaaaaaa.vtt").write_text(VTT)
+        captions = fetch_captions(video_id="aaaaaaaaaaa", store=self.store)
+        self.assertEqual(captions.read_text(), VTT)
+        self.assertEqual(
+            fetch(video_id="aaaaaaaaaaa", store=self.store).read_bytes(), b"a" * 100
+        )
+        self.assertIsNone(fetch_captions(video_id="bbbbbbbbbbb", store=self.store))
+
+
+def synthetic_scenes(levels: list[int], length: int, noise: int = 0) -> np.ndarray:
+    """Кадры 36x64: по length кадров на сцену с яркостью из levels."""
+    rng = np.random.default_rng(seed=0)
+    frames = np.concatenate(
+        [np.full((length, 36, 64), level, dtype=np.int16) for level in levels]
+    )
+    frames += rng.integers(-noise, noise + 1, size=frames.shape, dtype=np.int16)
+    return np.clip(frames, 0, 255).astype(np.uint8)
+
+
+class SceneDetectionTests(TestCase):
+    def test_scores_peak_on_cuts(self) -> None:
+        scores = scene_scores(synthetic_scenes(levels=[30, 200, 90], length=5, noise=8))
+        self.assertEqual(len(scores), 14)
+        self.assertEqual(set(np.flatnonzero(scores > 0.3)), {4, 9})
+        self.assertLess(np.delete(scores, [4, 9]).max(), 0.1)
+
+    def test_candidates(self) -> None:
+        thumbs = synthetic_scenes(levels=[30, 200], length=20, noise=4)
+        times = np.arange(len(thumbs), dtype=float) * 2
+        candidates = select_candidates(times=times, scores=scene_scores(thumbs))
+        self.assertEqual(
+            [(candidate["time"], candidate["cut"]) for candidate in candidates],
+            [(0.0, True), (30.0, False), (40.0, True), (70.0, False)],
+        )
+
+    def test_cuts_closer_than_min_gap_merged(self) -> None:
+        thumbs = synthetic_scenes(levels=[30, 200, 30, 200], length=1)
+        times = np.array([0.0, 0.5, 1.0, 10.0])
+        candidates = select_candidates(times=times, scores=scene_scores(thumbs))
+        self.assertEqual([candidate["time"] for candidate in candidates], [0.0, 10.0])
+
+
+@skipUnless(find_spec("av"), "PyAV не установлен")
+class KeyframeDecodeTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        import av
+
+        cls.tmp = TemporaryDirectory()
+        cls.path = Path(cls.tmp.name) / "scenes.mp4"
+        # ? 12 секунд по 10 кадров, ключевой кадр раз в секунду, смена на 6 с
+        with av.open(str(cls.path), "w") as container:
+            stream = container.add_stream("mpeg4", rate=10)
+            stream.width, stream.height = 160, 90
+            stream.pix_fmt = "yuv420p"
+            stream.gop_size = 10
+            for index in range(120):
+                level = 40 if index < 60 else 210
+                image = np.full((90, 160, 3), level, dtype=np.uint8)
+                image[:, index % 160] = 255 - level
+                frame = av.VideoFrame.from_ndarray(image, format="rgb24")
+                container.mux(stream.encode(frame))
+            container.mux(stream.encode())
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp.cleanup()
+        super().tearDownClass()
+
+    def test_decode_only_keyframes(self) -> None:
+        times, thumbs = decode_keyframes(self.path, 0, float("inf"))
+        self.assertEqual(times.tolist(), [float(second) for second in range(12)])
+        self.assertEqual(thumbs.shape, (12, 36, 64))
+        candidates = select_candidates(times=times, scores=scene_scores(thumbs))
+        self.assertEqual([candidate["time"] for candidate in candidates], [0.0, 6.0])
+
+    def test_segments_in_process_pool(self) -> None:
+        single = decode_keyframes(self.path, 0, float("inf"))
+        with patch.object(settings.CONSTANTS, "FRAME_MIN_SEGMENT_SECONDS", 1):
+            times, thumbs = extract_keyframes(path=self.path, workers=3)
+        self.assertEqual(times.tolist(), single[0].tolist())
+        self.assertTrue(np.array_equal(thumbs, single[1]))
+
+
+def textured_images(count: int, size: tuple[int, int], seed: int) -> np.ndarray:
+    """Разные случайные изображения с крупными деталями, похожие на кадры."""
+    rng = np.random.default_rng(seed=seed)
+    coarse = rng.integers(0, 256, size=(count, 8, 8)).astype(np.float64)
+    height, width = size
+    # ? Ступенчатое увеличение сетки 8x8 сохраняет энергию средних частот
+    rows = np.arange(height) * 8 // height
+    cols = np.arange(width) * 8 // width
+    return coarse[:, rows][:, :, cols]
+
+
+class PerceptualHashTests(TestCase):
+    def test_hashes_stable_under_noise_and_brightness(self) -> None:
+        images = textured_images(count=20, size=(32, 32), seed=1)
+        rng = np.random.default_rng(seed=2)
+        changed = np.clip(images * 0.9 + 10 + rng.normal(0, 3, images.shape), 0, 255)
+        near = hamming(a=phash(images=images), b=phash(images=changed))
+        self.assertLessEqual(near.max(), settings.CONSTANTS.DEDUP_PHASH_RADIUS)
+
+        hashes = phash(images=images)
+        far = [
+            hamming(a=hashes[i], b=hashes[j])
+            for i in range(len(hashes))
+            for j in range(i + 1, len(hashes))
+        ]
+        self.assertGreater(min(far), settings.CONSTANTS.DEDUP_PHASH_RADIUS)
+
+    def test_dhash(self) -> None:
+        gradient = np.tile(np.arange(9, dtype=np.uint8), (8, 1))
+        self.assertEqual(int(dhash(images=gradient[None])[0]), 2**64 - 1)
+        self.assertEqual(int(dhash(images=gradient[None, :, ::-1])[0]), 0)
+
+    def test_bk_tree_matches_brute_force(self) -> None:
+        rng = np.random.default_rng(seed=3)
+        keys = [int(key) for key in rng.integers(0, 2**63, size=500, dtype=np.int64)]
+        # ? Соседи в радиусе: несколько изменённых битов
+        keys += [key ^ (1 << 5) ^ (1 << 40) for key in keys[:50]]
+        tree = BKTree()
+        for index, key in enumerate(keys):
+            tree.add(key=key, item=index)
+        for query in keys[:60]:
+            expected = {
+                index
+                for index, key in enumerate(keys)
+                if (query ^ key).bit_count() <= 6
+            }
+            found = {item for _, item in tree.search(key=query, radius=6)}
+            self.assertEqual(found, expected)
+
+    def test_duplicate_index_checks_both_hashes(self) -> None:
+        index = DuplicateIndex()
+        index.add(phash=0, dhash=0, item="a")
+        self.assertEqual(index.find(phash=1, dhash=1), "a")
+        self.assertIsNone(index.find(phash=1, dhash=2**64 - 1))
+
+
+@skipUnless(find_spec("av"), "PyAV не установлен")
+class DedupStageTests(TestCase):
+    def setUp(self) -> None:
+        import av
+
+        self.tmp = TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.settings = override_settings(
+            MEDIA_ROOT=str(root / "media"), VIDEO_STORE_DIR=root / "store"
+        )
+        self.settings.enable()
+        self.store = MediaStore(root=root / "store", quota=2**30)
+
+        # ? Слайды A, A, B, A по 4 с: повтор A в том же окне - дубликат
+        slides = (textured_images(count=2, size=(90, 160), seed=4) * 0.8).astype(
+            np.uint8
+        )
+        source = self.store.temp_dir() / "slides.mp4"
+        with av.open(str(source), "w") as container:
+            stream = container.add_stream("mpeg4", rate=5)
+            stream.width, stream.height = 160, 90
+            stream.pix_fmt = "yuv420p"
+            stream.gop_size = 5
+            for slide in (0, 0, 1, 0):
+                image = np.repeat(slides[slide][:, :, None], 3, axis=2)
+                for _ in range(20):
+                    frame = av.VideoFrame.from_ndarray(image, format="rgb24")
+                    container.mux(stream.encode(frame))
+            container.mux(stream.encode())
+        self.digest = self.store.put(key="slidesslide", source=source).name
+
+    def tearDown(self) -> None:
+        self.settings.disable()
+        self.tmp.cleanup()
+
+    def test_files_named_by_content(self) -> None:
+        import av
+
+        # ? Одна яркость, разный цвет: перцептивные хеши совпадают
+        luma = textured_images(count=1, size=(90, 160), seed=5)[0].astype(np.uint8)
+        red, green = (
+            av.VideoFrame.from_ndarray(
+                np.concatenate([luma, np.full((45, 160), chroma, dtype=np.uint8)]),
+                format="yuv420p",
+            )
+            for chroma in (60, 200)
+        )
+        self.assertEqual(frame_hashes(frame=red), frame_hashes(frame=green))
+        self.assertNotEqual(save_screenshot(frame=red), save_screenshot(frame=green))
+        self.assertEqual(save_screenshot(frame=red), save_screenshot(frame=red))
+
+    def test_one_frame_per_group_per_window(self) -> None:
+        job = VideoJob(video_id="slidesslide")
+        context = {
+            "media": {"digest": self.digest},
+            "frames": [
+                {"time": float(time), "score": 1.0, "cut": True}
+                for time in (0, 4, 8, 12)
+            ],
+        }
+        with patch.object(settings.CONSTANTS, "DEDUP_WINDOW_SECONDS", 10.0):
+            dedup(job=job, context=context)
+        self.assertEqual(
+            [frame["time"] for frame in context["frames"]], [0.0, 8.0, 12.0]
+        )
+        self.assertEqual(context["duplicates"], 1)
+        images = {frame["image"] for frame in context["frames"]}
+        # ? Слайд A в разных окнах - один файл
+        self.assertEqual(len(images), 2)
+        for name in images:
+            self.assertTrue((Path(settings.MEDIA_ROOT) / name).exists())
+        self.assertEqual(Screenshot.objects.filter(video_id=job.video_id).count(), 3)
+
+        first = Screenshot.objects.get(video_id=job.video_id, time=0.0)
+        Screenshot.objects.create(
+            video_id="otherotherx",
+            time=5.0,
+            phash=first.phash,
+            dhash=first.dhash,
+            image=first.image.name,
+        )
+        similar = similar_screenshots(
+            phash=first.phash, dhash=first.dhash, video_ids=["otherotherx"]
+        )
+        self.assertEqual([screenshot.time for screenshot in similar], [5.0])
+
+
+VTT = """WEBVTT
+Kind: captions
+
+NOTE Автоматические субтитры
+
+00:00:00.000 --> 00:00:02.500 align:start position:0%
+Привет<00:00:01.000><c> всем</c>
+
+00:00:02.500 --> 00:00:02.510
+Привет всем
+
+00:00:02.510 --> 00:00:05.000
+Привет всем
+сегодня про &quot;кэш&quot;.
+"""
+
+SRT = """1
+00:00:01,000 --> 00:00:03,000
+{\\an8}Первая строка
+вторая строка
+
+2
+00:00:04,500 --> 00:00:06,000
+<i>Конец.</i>
+"""
+
+
+def cues(*spans: tuple[float, float, str]):
+    return (Cue(start=start, end=end, text=text) for start, end, text in spans)
+
+
+class CaptionTests(TestCase):
+    def test_parse_timestamp(self) -> None:
+        self.assertEqual(parse_timestamp("01:02:03.500"), 3723.5)
+        self.assertEqual(parse_timestamp("01:02:03,500"), 3723.5)
+        self.assertEqual(parse_timestamp("02:03.250"), 123.25)
+        with self.assertRaises(ValueError):
+            parse_timestamp("3.5")
+
+    def test_vtt_rolling_lines_and_markup(self) -> None:
+        self.assertEqual(
+            list(iter_cues(lines=VTT.splitlines(keepends=True))),
+            [
+                Cue(start=0.0, end=2.5, text="Привет всем"),
+                Cue(start=2.51, end=5.0, text='сегодня про "кэш".'),
+            ],
+        )
+
+    def test_srt_file(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "captions.srt"
+            path.write_text(SRT, encoding="utf-8-sig")
+            self.assertEqual(
+                list(read_cues(path=path)),
+                [
+                    Cue(start=1.0, end=3.0, text="Первая строка вторая строка"),
+                    Cue(start=4.5, end=6.0, text="Конец."),
+                ],
+            )
+
+    def test_break_on_pause(self) -> None:
+        result = list(segment(cues=cues((0, 2, "раз"), (2, 4, "два"), (7, 8, "три"))))
+        self.assertEqual([item.text for item in result], ["раз два", "три"])
+        self.assertEqual((result[0].start, result[0].end), (0, 4))
+
+    def test_break_on_sentence_after_target(self) -> None:
+        spans = [(i * 5, i * 5 + 5, f"фраза {i}.") for i in range(20)]
+        result = list(segment(cues=cues(*spans)))
+        self.assertTrue(
+            all(
+                settings.CONSTANTS.PARAGRAPH_TARGET_SECONDS
+                <= item.end - item.start
+                < settings.CONSTANTS.PARAGRAPH_TARGET_SECONDS + 5
+                for item in result[:-1]
+            )
+        )
+
+    def test_break_on_sentence_near_cut(self) -> None:
+        spans = [(i * 5, i * 5 + 5, f"фраза {i}.") for i in range(6)]
+        result = list(segment(cues=cues(*spans), cuts=[20.5]))
+        self.assertEqual(
+            [(item.start, item.end) for item in result], [(0, 20), (20, 30)]
+        )
+
+    def test_hard_break_without_sentences(self) -> None:
+        spans = [(i, i + 1, "слово") for i in range(200)]
+        result = list(segment(cues=cues(*spans)))
+        self.assertTrue(
+            all(
+                item.end - item.start <= settings.CONSTANTS.PARAGRAPH_MAX_SECONDS
+                for item in result
+            )
+        )
+        self.assertEqual(sum(len(item.text.split()) for item in result), 200)
+
+    def test_streaming(self) -> None:
+        # ? Бесконечный поток реплик: абзацы отдаются, не дожидаясь конца
+        endless = (Cue(start=i, end=i + 1, text="слово.") for i in count())
+        stream = segment(cues=endless)
+        first, second = next(stream), next(stream)
+        self.assertEqual(first.end, second.start)
+
+        lines = chain.from_iterable(
+            (
+                f"{i}\n",
+                f"00:00:{i % 60:02}.000 --> 00:00:{i % 60:02}.500\n",
+                f"слово {i}.\n",
+                "\n",
+            )
+            for i in count()
+        )
+        self.assertEqual(list(islice(iter_cues(lines=lines), 3))[2].text, "слово 2.")
+
+    def test_stage_without_captions(self) -> None:
+        with TemporaryDirectory() as tmp, override_settings(
+            VIDEO_FETCHER="api.utils.ingest_utils.LocalFetcher",
+            VIDEO_LOCAL_SOURCE_DIR=tmp,
+            VIDEO_STORE_DIR=Path(tmp) / "store",
+        ):
+            job = VideoJob(video_id="nocaptions1")
+            context = {"frames": []}
+            paragraphs(job=job, context=context)
+            self.assertEqual(context["paragraphs"], [])
+
+            (Path(tmp) / "withcaption.vtt").write_text(VTT)
+            job.video_id = "withcaption"
+            context = {"frames": [{"time": 2.0, "cut": True}]}
+            paragraphs(job=job, context=context)
+            self.assertEqual(
+                context["paragraphs"],
+                [{"start": 0.0, "end": 5.0, "text": 'Привет всем сегодня про "кэш".'}],
+            )
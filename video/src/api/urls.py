@@ -0,0 +1,16 @@
+from django.urls import path
+
+from .views import VideoJobAPIView, VideoJobsAPIView
+
+urlpatterns = [
+    path(
+        route="jobs",
+        view=VideoJobsAPIView.as_view(),
+        name="jobs",
+    ),
+    path(
+        route="jobs/<int:id>",
+        view=VideoJobAPIView.as_view(),
+        name="job",
+    ),
+]
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from logging import getLogger
+from threading import Lock
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from razer_common.fastjson import loads
+
+CON = settings.CONSTANTS
+
+logger = getLogger(__name__)
+
+# ? LRU: ключ - строка id пачки, их множество в долгоживущем воркере не ограничено
+_etag_cache: OrderedDict[str, tuple[str, list[dict]]] = OrderedDict()
+_etag_lock = Lock()
+
+
+def fetch_users(ids: list[int]) -> dict[int, dict]:
+    """Данные авторов из сервиса auth пачками, с переиспользованием ETag."""
+    ids = sorted(set(ids))
+    users = {}
+    for start in range(0, len(ids), CON.USER_BATCH_CHUNK):
+        chunk = ",".join(str(id) for id in ids[start : start + CON.USER_BATCH_CHUNK])
+        for user in _fetch_chunk(chunk=chunk):
+            users[user["id"]] = user
+    return users
+
+
+def _fetch_chunk(chunk: str) -> list[dict]:
+    with _etag_lock:
+        cached = _etag_cache.get(chunk)
+        if cached:
+            _etag_cache.move_to_end(chunk)
+    headers = {"X-Service-Key": settings.SERVICE_API_KEY or ""}
+    if cached:
+        headers["If-None-Match"] = cached[0]
+    request = Request(
+        url=f"{settings.AUTH_SERVICE_URL}/api/users/batch?{urlencode({'ids': chunk})}",
+        headers=headers,
+    )
+    try:
+        with urlopen(request, timeout=CON.AUTH_SERVICE_TIMEOUT) as response:
+            users = loads(response.read())["users"]
+            etag = response.headers.get("ETag")
+    except HTTPError as e:
+        if e.code == 304 and cached:
+            return cached[1]
+        raise
+    if etag:
+        with _etag_lock:
+            _etag_cache[chunk] = (etag, users)
+            _etag_cache.move_to_end(chunk)
+            while len(_etag_cache) > CON.USER_ETAG_CACHE_SIZE:
+                _etag_cache.popitem(last=False)
+    return users
+
+
+def fetch_session_generation(user_id: int) -> int | None:
+    """Поколение сессии из сервиса auth; None, если его не удалось узнать."""
+    request = Request(
+        url=f"{settings.AUTH_SERVICE_URL}/api/users/{int(user_id)}/session",
+        headers={"X-Service-Key": settings.SERVICE_API_KEY or ""},
+    )
+    try:
+        with urlopen(request, timeout=CON.AUTH_SERVICE_TIMEOUT) as response:
+            return loads(response.read())["generation"]
+    except HTTPError as e:
+        if e.code != 404:
+            logger.warning("Session generation lookup for %s failed: %s", user_id, e)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Session generation lookup for %s failed: %s", user_id, e)
+    return None
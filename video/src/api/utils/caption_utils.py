@@ -0,0 +1,158 @@
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from html import unescape
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from django.conf import settings
+
+from .ingest_utils import fetch_captions
+
+CON = settings.CONSTANTS
+
+TAG = re.compile(r"<[^>]*>|\{\\[^}]*\}")
+SPACES = re.compile(r"\s+")
+SENTENCE_END = re.compile(r"[.!?…][\"'»”)\]]*$")
+
+
+@dataclass(frozen=True, slots=True)
+class Cue:
+    start: float
+    end: float
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class Paragraph:
+    start: float
+    end: float
+    text: str
+
+    def as_dict(self) -> dict:
+        return {
+            "start": round(self.start, 3),
+            "end": round(self.end, 3),
+            "text": self.text,
+        }
+
+
+def parse_timestamp(value: str) -> float:
+    """00:01:02.345 (WebVTT), 00:01:02,345 (SRT) или 01:02.345."""
+    parts = value.strip().replace(",", ".").split(":")
+    if not 2 <= len(parts) <= 3:
+        raise ValueError(f"Неверное время {value!r}")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def clean_line(line: str) -> str:
+    return SPACES.sub(" ", unescape(TAG.sub("", line))).strip()
+
+
+def parse_block(block: list[str]) -> tuple[float, float, list[str]] | None:
+    """Блок между пустыми строками: номер или id, строка времени, текст."""
+    for index, line in enumerate(block):
+        if "-->" not in line:
+            continue
+        start, _, rest = line.partition("-->")
+        try:
+            # ? После времени окончания в WebVTT идут настройки: align:start ...
+            times = parse_timestamp(start), parse_timestamp(rest.split()[0])
+        except (ValueError, IndexError):
+            return None
+        return *times, [clean_line(text) for text in block[index + 1 :]]
+    # ? Заголовок WEBVTT, NOTE, STYLE, REGION
+    return None
+
+
+def iter_cues(lines: Iterable[str]) -> Iterator[Cue]:
+    """
+    Реплики WebVTT или SRT по мере чтения строк: в памяти только текущий блок.
+
+    В автоматических субтитрах YouTube каждая реплика повторяет строку
+    предыдущей (бегущая строка), такие повторы отбрасываются.
+    """
+    previous = set()
+    block = []
+    # ? Пустая строка в конце закрывает последний блок
+    for line in chain(lines, [""]):
+        line = line.rstrip("\r\n")
+        if line.strip():
+            block.append(line)
+            continue
+        if not block:
+            continue
+        parsed = parse_block(block=block)
+        block = []
+        if parsed is None:
+            continue
+        start, end, texts = parsed
+        new = [text for text in texts if text and text not in previous]
+        previous = set(texts)
+        if new:
+            yield Cue(start=start, end=end, text=" ".join(new))
+
+
+def read_cues(path: Path) -> Iterator[Cue]:
+    # ? utf-8-sig: файлы из Windows-редакторов часто начинаются с BOM
+    with open(path, encoding="utf-8-sig", errors="replace") as file:
+        yield from iter_cues(lines=file)
+
+
+def segment(cues: Iterable[Cue], cuts: Iterable[float] = ()) -> Iterator[Paragraph]:
+    """
+    Склеивает реплики в абзацы и отдаёт каждый, как только он закончен.
+
+    Абзац заканчивается на паузе в речи не короче PARAGRAPH_PAUSE_SECONDS,
+    на конце предложения после PARAGRAPH_TARGET_SECONDS, на конце предложения
+    рядом со сменой сцены (cuts) после PARAGRAPH_MIN_SECONDS и принудительно
+    после PARAGRAPH_MAX_SECONDS. В памяти только реплики текущего абзаца.
+    """
+    cuts = sorted(cuts)
+    texts = []
+    start = end = 0.0
+
+    def near_cut(time: float) -> bool:
+        index = bisect_left(cuts, time - CON.SCENE_CUT_TOLERANCE)
+        return index < len(cuts) and cuts[index] <= time + CON.SCENE_CUT_TOLERANCE
+
+    for cue in cues:
+        if texts and cue.start - end >= CON.PARAGRAPH_PAUSE_SECONDS:
+            yield Paragraph(start=start, end=end, text=" ".join(texts))
+            texts = []
+        if not texts:
+            start, end = cue.start, cue.end
+        texts.append(cue.text)
+        end = max(end, cue.end)
+        duration = end - start
+        if duration >= CON.PARAGRAPH_MAX_SECONDS or (
+            SENTENCE_END.search(cue.text) is not None
+            and (
+                duration >= CON.PARAGRAPH_TARGET_SECONDS
+                or (duration >= CON.PARAGRAPH_MIN_SECONDS and near_cut(time=end))
+            )
+        ):
+            yield Paragraph(start=start, end=end, text=" ".join(texts))
+            texts = []
+    if texts:
+        yield Paragraph(start=start, end=end, text=" ".join(texts))
+
+
+def paragraphs(job, context: dict) -> None:
+    """
+    Этап VIDEO_PIPELINE: текст видео по абзацам с границами, подогнанными
+    к сменам сцен. Без субтитров абзацев нет, dedup работает по окнам.
+    """
+    path = fetch_captions(video_id=job.video_id)
+    if path is None:
+        context["paragraphs"] = []
+        return
+    cuts = [frame["time"] for frame in context.get("frames", []) if frame["cut"]]
+    context["paragraphs"] = [
+        paragraph.as_dict()
+        for paragraph in segment(cues=read_cues(path=path), cuts=cuts)
+    ]
@@ -0,0 +1,222 @@
+from bisect import bisect_right
+from functools import lru_cache
+from hashlib import sha256
+from io import BytesIO
+from os import makedirs, path, remove, replace
+from uuid import uuid4
+
+import numpy as np
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from ..models import Screenshot
+from .frame_utils import decode_frames_at
+from .ingest_utils import get_store
+
+CON = settings.CONSTANTS
+
+
+@lru_cache(maxsize=None)
+def dct_matrix(size: int) -> np.ndarray:
+    n = np.arange(size)
+    return np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size))
+
+
+def pack_bits(bits: np.ndarray) -> np.ndarray:
+    """(N, 64) bool -> (N,) uint64, старший бит - первый."""
+    return np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def phash(images: np.ndarray) -> np.ndarray:
+    """
+    pHash пачки серых изображений 32x32: знаки низкочастотных коэффициентов
+    DCT 8x8 относительно их медианы (без постоянной составляющей).
+    """
+    matrix = dct_matrix(size=images.shape[-1])
+    coefficients = matrix @ images.astype(np.float64) @ matrix.T
+    low = coefficients[:, :8, :8].reshape(len(images), 64)
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    return pack_bits(bits=low > median)
+
+
+def dhash(images: np.ndarray) -> np.ndarray:
+    """dHash пачки серых изображений 8x9: ярче ли пиксель соседа справа."""
+    bits = images[:, :, 1:] > images[:, :, :-1]
+    return pack_bits(bits=bits.reshape(len(images), 64))
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.bitwise_count(np.bitwise_xor(a, b))
+
+
+class BKTree:
+    """
+    Дерево Буркхарда-Келлера по расстоянию Хэмминга: поиск всех хешей
+    в радиусе r без полного перебора. Потомки узла лежат по расстоянию до
+    него, и по неравенству треугольника проверяются только ветви d +- r.
+    """
+
+    def __init__(self) -> None:
+        self.root = None
+        self.size = 0
+
+    def add(self, key: int, item) -> None:
+        self.size += 1
+        node = (key, item, {})
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = (key ^ current[0]).bit_count()
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, key: int, radius: int) -> list[tuple[int, object]]:
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_key, item, children = stack.pop()
+            distance = (key ^ node_key).bit_count()
+            if distance <= radius:
+                found.append((distance, item))
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return sorted(found, key=lambda pair: pair[0])
+
+
+class DuplicateIndex:
+    """
+    Группы похожих кадров: pHash ищется в BK-дереве, совпадение
+    подтверждается dHash. Первый кадр группы становится её представителем.
+    """
+
+    def __init__(self) -> None:
+        self.tree = BKTree()
+
+    def find(self, phash: int, dhash: int):
+        for _, (item_dhash, item) in self.tree.search(
+            key=phash, radius=CON.DEDUP_PHASH_RADIUS
+        ):
+            if (dhash ^ item_dhash).bit_count() <= CON.DEDUP_DHASH_RADIUS:
+                return item
+        return None
+
+    def add(self, phash: int, dhash: int, item) -> None:
+        self.tree.add(key=phash, item=(dhash, item))
+
+
+def windows_from(context: dict) -> list[float]:
+    """Начала окон дедупликации: абзацы, если уже есть, иначе равные отрезки."""
+    paragraphs = context.get("paragraphs")
+    if paragraphs:
+        return [paragraph["start"] for paragraph in paragraphs]
+    end = max((frame["time"] for frame in context["frames"]), default=0)
+    return np.arange(
+        0, end + CON.DEDUP_WINDOW_SECONDS, CON.DEDUP_WINDOW_SECONDS
+    ).tolist()
+
+
+def frame_hashes(frame) -> tuple[int, int]:
+    small = frame.reformat(width=32, height=32, format="gray").to_ndarray()
+    tiny = frame.reformat(width=9, height=8, format="gray").to_ndarray()
+    return int(phash(images=small[None])[0]), int(dhash(images=tiny[None])[0])
+
+
+def save_screenshot(frame) -> str:
+    """
+    Кадр в JPEG с именем по sha256 самого файла. Перцептивные хеши только
+    группируют кадры: по ним разные картинки (цвет, текст на слайде) могут
+    совпасть. Одинаковые файлы разных видео хранятся один раз.
+    """
+    image = frame.to_image()
+    if image.width > CON.SCREENSHOT_MAX_WIDTH:
+        height = round(image.height * CON.SCREENSHOT_MAX_WIDTH / image.width)
+        image = image.resize((CON.SCREENSHOT_MAX_WIDTH, height))
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=CON.SCREENSHOT_QUALITY)
+    content = buffer.getvalue()
+    digest = sha256(content).hexdigest()
+    name = f"{CON.FRAMES_DIR}/{digest[:2]}/{digest}.jpg"
+    full_path = default_storage.path(name=name)
+    if path.exists(full_path):
+        return name
+    makedirs(path.dirname(full_path), exist_ok=True)
+    tmp_path = f"{full_path}.{uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(content)
+        replace(tmp_path, full_path)
+    finally:
+        if path.exists(tmp_path):
+            remove(tmp_path)
+    return name
+
+
+def dedup(job, context: dict) -> None:
+    """
+    Этап VIDEO_PIPELINE: из каждой группы почти одинаковых кандидатов
+    в пределах окна (абзаца) остаётся один кадр. Файл группы сохраняется
+    в media один раз на всё видео; между видео файлы общие, только если
+    совпадают байт в байт.
+    """
+    media_path = get_store().blob(digest=context["media"]["digest"])
+    candidates = {frame["time"]: frame for frame in context["frames"]}
+    starts = windows_from(context=context)
+    indexes = {}
+    images = DuplicateIndex()
+    kept = []
+    screenshots = []
+    for time, frame in decode_frames_at(path=media_path, times=list(candidates)):
+        frame_phash, frame_dhash = frame_hashes(frame=frame)
+        window = indexes.setdefault(bisect_right(starts, time), DuplicateIndex())
+        if window.find(phash=frame_phash, dhash=frame_dhash) is not None:
+            continue
+        window.add(phash=frame_phash, dhash=frame_dhash, item=time)
+
+        phash_hex, dhash_hex = f"{frame_phash:016x}", f"{frame_dhash:016x}"
+        # ? Тот же кадр в другом окне остаётся в статье, но файл у них общий
+        name = images.find(phash=frame_phash, dhash=frame_dhash)
+        if name is None:
+            name = save_screenshot(frame=frame)
+            images.add(phash=frame_phash, dhash=frame_dhash, item=name)
+        kept.append({**candidates[time], "phash": phash_hex, "image": name})
+        screenshots.append(
+            Screenshot(
+                video_id=job.video_id,
+                time=time,
+                phash=phash_hex,
+                dhash=dhash_hex,
+                image=name,
+            )
+        )
+
+    with transaction.atomic():
+        Screenshot.objects.filter(video_id=job.video_id).delete()
+        Screenshot.objects.bulk_create(screenshots)
+    context["duplicates"] = len(candidates) - len(kept)
+    context["frames"] = kept
+
+
+def similar_screenshots(
+    phash: str, dhash: str, video_ids: list[str]
+) -> list[Screenshot]:
+    """
+    Похожие кадры в других видео, например среди видео одного канала.
+    Для разового запроса дерево не строится: все хеши сравниваются
+    векторно, это один проход popcount по массиву.
+    """
+    screenshots = list(Screenshot.objects.filter(video_id__in=video_ids))
+    if not screenshots:
+        return []
+    phashes = np.array([int(item.phash, 16) for item in screenshots], dtype=np.uint64)
+    dhashes = np.array([int(item.dhash, 16) for item in screenshots], dtype=np.uint64)
+    matches = (
+        hamming(a=phashes, b=np.uint64(int(phash, 16))) <= CON.DEDUP_PHASH_RADIUS
+    ) & (hamming(a=dhashes, b=np.uint64(int(dhash, 16))) <= CON.DEDUP_DHASH_RADIUS)
+    return [screenshots[index] for index in np.flatnonzero(matches)]
@@ -0,0 +1,206 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from os import cpu_count
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .ingest_utils import get_store
+
+CON = settings.CONSTANTS
+
+
+class FrameError(Exception):
+    pass
+
+
+def _init_worker() -> None:
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _open(path: Path):
+    try:
+        import av
+    except ImportError:
+        raise FrameError("PyAV не установлен") from None
+    try:
+        return av.open(str(path))
+    except av.FFmpegError as e:
+        raise FrameError(f"Не удалось открыть {path}: {e}") from None
+
+
+def probe_duration(path: Path) -> float:
+    with _open(path=path) as container:
+        stream = container.streams.video[0]
+        if stream.duration is not None:
+            return float(stream.duration * stream.time_base)
+        if container.duration is not None:
+            return container.duration / 1_000_000
+    raise FrameError(f"Неизвестна длительность {path}")
+
+
+def decode_keyframes(
+    path: Path, start: float, end: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Время и уменьшенная яркость (uint8, FRAME_THUMB_SIZE) каждого ключевого
+    кадра из [start, end). Декодер пропускает все остальные кадры, поэтому
+    стоимость зависит от числа ключевых кадров, а не от длины видео.
+    """
+    width, height = CON.FRAME_THUMB_SIZE
+    times = []
+    thumbs = []
+    with _open(path=path) as container:
+        stream = container.streams.video[0]
+        stream.codec_context.skip_frame = "NONKEY"
+        # ? Параллельность - на уровне процессов, по одному декодеру на ядро
+        stream.thread_type = "SLICE"
+        stream.thread_count = 1
+        if start > 0:
+            container.seek(int(start / stream.time_base), stream=stream)
+        for frame in container.decode(stream):
+            if frame.pts is None:
+                continue
+            time = float(frame.pts * stream.time_base)
+            if time < start:
+                continue
+            if time >= end:
+                break
+            times.append(time)
+            thumbs.append(
+                frame.reformat(width=width, height=height, format="gray").to_ndarray()
+            )
+    if not times:
+        return np.empty(0), np.empty((0, height, width), dtype=np.uint8)
+    return np.array(times), np.stack(thumbs)
+
+
+def decode_frames_at(path: Path, times: list[float]):
+    """Кадры (av.VideoFrame) в моменты times - ключевые кадры, найденные ранее."""
+    with _open(path=path) as container:
+        stream = container.streams.video[0]
+        stream.codec_context.skip_frame = "NONKEY"
+        for time in sorted(times):
+            container.seek(int(time / stream.time_base), stream=stream)
+            for frame in container.decode(stream):
+                if (
+                    frame.pts is not None
+                    and frame.pts * stream.time_base >= time - 1e-3
+                ):
+                    yield time, frame
+                    break
+
+
+def scene_scores(thumbs: np.ndarray) -> np.ndarray:
+    """
+    Оценка смены сцены между соседними кадрами, от 0 до 1.
+
+    Расстояние между гистограммами яркости устойчиво к движению в кадре,
+    среднее попиксельное отличие ловит смену плана с похожей гистограммой.
+    """
+    count = len(thumbs)
+    if count < 2:
+        return np.empty(0)
+    bins = CON.SCENE_HISTOGRAM_BINS
+    shift = 8 - int(np.log2(bins))
+    # ? Гистограммы всех кадров одним bincount: у каждого кадра свой диапазон
+    indexes = (thumbs >> shift).reshape(count, -1).astype(np.int64)
+    indexes += np.arange(count)[:, None] * bins
+    histograms = np.bincount(indexes.ravel(), minlength=count * bins)
+    histograms = histograms.reshape(count, bins) / indexes.shape[1]
+    histogram_diff = np.abs(np.diff(histograms, axis=0)).sum(axis=1) / 2
+    luma_diff = np.abs(np.diff(thumbs.astype(np.int16), axis=0)).mean(axis=(1, 2))
+    return (
+        CON.SCENE_HISTOGRAM_WEIGHT * histogram_diff
+        + (1 - CON.SCENE_HISTOGRAM_WEIGHT) * luma_diff / 255
+    )
+
+
+def cut_threshold(scores: np.ndarray) -> float:
+    """
+    Порог смены сцены под конкретное видео: выброс относительно медианы
+    (MAD), но не ниже SCENE_CUT_MIN_THRESHOLD и не выше SCENE_CUT_THRESHOLD.
+    В статичном видео срабатывают и слабые смены, в динамичном - только явные.
+    """
+    if not len(scores):
+        return CON.SCENE_CUT_THRESHOLD
+    median = np.median(scores)
+    deviation = 1.4826 * np.median(np.abs(scores - median))
+    threshold = median + CON.SCENE_CUT_SIGMA * deviation
+    return float(
+        np.clip(threshold, CON.SCENE_CUT_MIN_THRESHOLD, CON.SCENE_CUT_THRESHOLD)
+    )
+
+
+def select_candidates(times: np.ndarray, scores: np.ndarray) -> list[dict]:
+    """
+    Моменты для скриншотов: начало каждой сцены и, в длинных сценах,
+    кадры не реже SCENE_MAX_SECONDS.
+
+    scores[i] - оценка перехода от кадра i к i + 1.
+    """
+    if not len(times):
+        return []
+    cuts = set((np.flatnonzero(scores >= cut_threshold(scores)) + 1).tolist())
+    picked = [(0, True)]
+    last_cut = last = times[0]
+    for index in range(1, len(times)):
+        time = times[index]
+        if index in cuts and time - last_cut >= CON.SCENE_MIN_SECONDS:
+            picked.append((index, True))
+            last_cut = last = time
+        elif time - last >= CON.SCENE_MAX_SECONDS:
+            picked.append((index, False))
+            last = time
+    return [
+        {
+            "time": round(float(times[index]), 3),
+            "score": round(float(scores[index - 1]), 3) if index else 1.0,
+            "cut": cut,
+        }
+        for index, cut in picked
+    ]
+
+
+def segments(duration: float, parts: int) -> list[tuple[float, float]]:
+    parts = max(1, min(parts, int(duration // CON.FRAME_MIN_SEGMENT_SECONDS) or 1))
+    bounds = np.linspace(0, duration, parts + 1)
+    bounds[-1] = float("inf")
+    return [(float(bounds[i]), float(bounds[i + 1])) for i in range(parts)]
+
+
+def extract_keyframes(path: Path, workers: int = None) -> tuple[np.ndarray, np.ndarray]:
+    """Ключевые кадры всего файла; отрезки декодируются параллельно."""
+    # ? Ядра делятся между JOB_WORKERS воркерами, каждый запускает свой пул
+    workers = workers or CON.FRAME_WORKERS or max(1, cpu_count() // CON.JOB_WORKERS)
+    parts = segments(duration=probe_duration(path=path), parts=workers)
+    if len(parts) == 1:
+        return decode_keyframes(path, *parts[0])
+    with ProcessPoolExecutor(
+        max_workers=len(parts),
+        mp_context=get_context(method="spawn"),
+        initializer=_init_worker,
+    ) as executor:
+        results = list(
+            executor.map(
+                decode_keyframes,
+                [path] * len(parts),
+                *zip(*parts),
+            )
+        )
+    return (
+        np.concatenate([times for times, _ in results]),
+        np.concatenate([thumbs for _, thumbs in results]),
+    )
+
+
+def keyframes(job, context: dict) -> None:
+    """Этап VIDEO_PIPELINE: кандидаты в скриншоты по сменам сцен."""
+    path = get_store().blob(digest=context["media"]["digest"])
+    times, thumbs = extract_keyframes(path=path)
+    context["frames"] = select_candidates(times=times, scores=scene_scores(thumbs))
@@ -0,0 +1,282 @@
+import fcntl
+import os
+import shutil
+from contextlib import contextmanager
+from hashlib import sha256
+from logging import getLogger
+from pathlib import Path
+from tempfile import mkdtemp
+from time import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .source_utils import canonical_url
+
+CON = settings.CONSTANTS
+
+logger = getLogger(__name__)
+
+
+CAPTION_SUFFIXES = (".vtt", ".srt")
+
+
+class FetchError(Exception):
+    pass
+
+
+class MediaStore:
+    """
+    Локальное хранилище скачанных видео, адресуемое по содержимому.
+
+    blobs/ab/<sha256> - сами файлы, одинаковое содержимое хранится один раз;
+    sources/<key> - digest файла для видео (<video_id>) или его субтитров
+    (<video_id>.captions), NO_FILE - файла у источника нет (например,
+    субтитров), запись действует VIDEO_STORE_MISSING_TTL секунд по mtime;
+    locks/ - блокировки загрузки.
+    Время последнего использования - mtime файла, по нему при превышении
+    квоты удаляются давно не нужные файлы (LRU).
+    """
+
+    NO_FILE = "-"
+
+    def __init__(self, root: Path, quota: int) -> None:
+        self.root = Path(root)
+        self.quota = quota
+        for name in ("blobs", "sources", "locks", "tmp"):
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+
+    def blob(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    def lookup(self, key: str) -> Path | None:
+        try:
+            digest = (self.root / "sources" / key).read_text().strip()
+        except FileNotFoundError:
+            return None
+        if digest == self.NO_FILE:
+            return None
+        path = self.blob(digest=digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # ? Файл вытеснен, запись об источнике устарела
+            return None
+        return path
+
+    def missing(self, key: str) -> bool:
+        """Источник недавно ответил, что файла нет: повторная загрузка не нужна."""
+        index = self.root / "sources" / key
+        try:
+            if index.read_text().strip() != self.NO_FILE:
+                return False
+            age = time() - index.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return age < CON.VIDEO_STORE_MISSING_TTL
+
+    def mark_missing(self, key: str) -> None:
+        self._write_source(key=key, value=self.NO_FILE)
+
+    def _write_source(self, key: str, value: str) -> None:
+        index = self.root / "sources" / key
+        temp = index.with_name(f".{key}.tmp")
+        temp.write_text(value)
+        os.replace(temp, index)
+
+    def put(self, key: str, source: Path) -> Path:
+        """Переносит скачанный файл в хранилище; source должен лежать в tmp."""
+        hasher = sha256()
+        with open(source, "rb") as file:
+            while chunk := file.read(CON.VIDEO_STORE_CHUNK):
+                hasher.update(chunk)
+        path = self.blob(digest=hasher.hexdigest())
+        path.parent.mkdir(exist_ok=True)
+        if path.exists():
+            source.unlink()
+            os.utime(path)
+        else:
+            os.replace(source, path)
+        self._write_source(key=key, value=path.name)
+        return path
+
+    def temp_dir(self) -> Path:
+        # ? В том же разделе, что и blobs, чтобы put обходился os.replace
+        return Path(mkdtemp(dir=self.root / "tmp"))
+
+    @contextmanager
+    def lock(self, key: str):
+        """Межпроцессная блокировка: один файл на узле скачивается один раз."""
+        with open(self.root / "locks" / f"{key}.lock", "w") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def evict(self, keep: set[str] = frozenset()) -> list[str]:
+        """Удаляет давно не использованные файлы, пока размер больше квоты."""
+        blobs = []
+        total = 0
+        for path in (self.root / "blobs").glob("*/*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            blobs.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        removed = []
+        # ? Недавно выданный lookup файл ещё может открываться другим воркером
+        recent = time() - CON.VIDEO_STORE_GRACE_SECONDS
+        for mtime, size, path in sorted(blobs):
+            if total <= self.quota:
+                break
+            if path.name in keep or mtime > recent:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed.append(path.name)
+        if removed:
+            logger.info("Evicted %s media files from %s", len(removed), self.root)
+        return removed
+
+
+class LocalFetcher:
+    """
+    Копирует <video_id>.* из VIDEO_LOCAL_SOURCE_DIR, субтитры - из
+    <video_id>.vtt или .srt там же: тесты и работа без сети.
+    """
+
+    def fetch(self, video_id: str, directory: Path) -> Path:
+        source_dir = Path(settings.VIDEO_LOCAL_SOURCE_DIR or "")
+        matches = sorted(
+            path
+            for path in source_dir.glob(f"{video_id}.*")
+            if path.suffix not in CAPTION_SUFFIXES
+        )
+        if not settings.VIDEO_LOCAL_SOURCE_DIR or not matches:
+            raise FetchError(f"Видео {video_id} нет в {source_dir}")
+        target = directory / matches[0].name
+        shutil.copyfile(matches[0], target)
+        return target
+
+    def fetch_captions(self, video_id: str, directory: Path) -> Path | None:
+        if not settings.VIDEO_LOCAL_SOURCE_DIR:
+            return None
+        for suffix in CAPTION_SUFFIXES:
+            source = Path(settings.VIDEO_LOCAL_SOURCE_DIR) / f"{video_id}{suffix}"
+            if source.exists():
+                target = directory / source.name
+                shutil.copyfile(source, target)
+                return target
+        return None
+
+
+class YtDlpFetcher:
+    def download(self, video_id: str, options: dict) -> dict:
+        try:
+            from yt_dlp import YoutubeDL
+            from yt_dlp.utils import DownloadError
+        except ImportError:
+            raise FetchError("yt-dlp не установлен") from None
+
+        options = {"quiet": True, "noprogress": True, "noplaylist": True, **options}
+        try:
+            with YoutubeDL(params=options) as ydl:
+                info = ydl.extract_info(canonical_url(video_id=video_id), download=True)
+                info["_filename"] = ydl.prepare_filename(info)
+                return info
+        except DownloadError as e:
+            raise FetchError(str(e)) from None
+
+    def fetch(self, video_id: str, directory: Path) -> Path:
+        height = CON.VIDEO_MAX_HEIGHT
+        info = self.download(
+            video_id=video_id,
+            options={
+                # ? Один файл со звуком и видео, без склейки через ffmpeg
+                "format": f"b[height<={height}][ext=mp4]/b[height<={height}]/b",
+                "outtmpl": str(directory / "%(id)s.%(ext)s"),
+            },
+        )
+        return Path(info["_filename"])
+
+    def fetch_captions(self, video_id: str, directory: Path) -> Path | None:
+        # ? Ручные субтитры, если есть, иначе автоматические
+        self.download(
+            video_id=video_id,
+            options={
+                "skip_download": True,
+                "writesubtitles": True,
+                "writeautomaticsub": True,
+                "subtitleslangs": list(CON.CAPTION_LANGUAGES),
+                "subtitlesformat": "vtt/srt/best",
+                "outtmpl": str(directory / "%(id)s.%(ext)s"),
+            },
+        )
+        for language in CON.CAPTION_LANGUAGES:
+            for suffix in CAPTION_SUFFIXES:
+                path = directory / f"{video_id}.{language}{suffix}"
+                if path.exists():
+                    return path
+        return None
+
+
+def get_store() -> MediaStore:
+    return MediaStore(root=settings.VIDEO_STORE_DIR, quota=CON.VIDEO_STORE_QUOTA)
+
+
+def cached(store: MediaStore, key: str, download) -> Path | None:
+    """
+    Файл из хранилища или download(directory) -> Path | None под блокировкой
+    ключа: параллельные запросы одного файла на узле ждут одну загрузку.
+    """
+    path = store.lookup(key=key)
+    if path is not None or store.missing(key=key):
+        return path
+    with store.lock(key=key):
+        # ? Пока ждали блокировку, файл мог скачать другой процесс
+        path = store.lookup(key=key)
+        if path is not None or store.missing(key=key):
+            return path
+        directory = store.temp_dir()
+        try:
+            downloaded = download(directory)
+            if downloaded is None:
+                store.mark_missing(key=key)
+                return None
+            path = store.put(key=key, source=downloaded)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    store.evict(keep={path.name})
+    return path
+
+
+def fetch(video_id: str, store: MediaStore = None) -> Path:
+    """Путь к файлу видео; скачивается, только если его нет в хранилище."""
+    fetcher = import_string(settings.VIDEO_FETCHER)()
+    return cached(
+        store=store or get_store(),
+        key=video_id,
+        download=lambda directory: fetcher.fetch(
+            video_id=video_id, directory=directory
+        ),
+    )
+
+
+def fetch_captions(video_id: str, store: MediaStore = None) -> Path | None:
+    """Файл субтитров (WebVTT или SRT) или None, если у видео их нет."""
+    fetcher = import_string(settings.VIDEO_FETCHER)()
+    return cached(
+        store=store or get_store(),
+        key=f"{video_id}.captions",
+        download=lambda directory: fetcher.fetch_captions(
+            video_id=video_id, directory=directory
+        ),
+    )
+
+
+def ingest(job, context: dict) -> None:
+    """Этап VIDEO_PIPELINE: исходный файл видео в локальном хранилище."""
+    path = fetch(video_id=job.video_id)
+    context["media"] = {"digest": path.name, "size": path.stat().st_size}
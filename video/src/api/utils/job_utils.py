@@ -0,0 +1,225 @@
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from logging import getLogger
+from random import uniform
+from threading import Event, Thread
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ..models import VideoJob, VideoRequest
+from .source_utils import canonical_url
+
+CON = settings.CONSTANTS
+
+logger = getLogger(__name__)
+
+
+def enqueue(user_id: int, video_id: str) -> VideoJob:
+    """
+    Задача для видео с подпиской пользователя на неё.
+
+    Запросы одного видео от разных пользователей присоединяются к активной
+    или уже выполненной задаче; новая создаётся, только если прошлая
+    закончилась ошибкой или задач не было.
+    """
+    job = (
+        VideoJob.objects.filter(video_id=video_id)
+        .exclude(status=VideoJob.FAILED)
+        .order_by("-id")
+        .first()
+    )
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = VideoJob.objects.create(
+                    video_id=video_id, source_url=canonical_url(video_id=video_id)
+                )
+        except IntegrityError:
+            # ? Параллельный запрос успел создать активную задачу
+            return enqueue(user_id=user_id, video_id=video_id)
+    VideoRequest.objects.get_or_create(job=job, user_id=user_id)
+    return job
+
+
+def retry_delay(attempt: int) -> float:
+    """Экспоненциальная задержка с jitter, чтобы повторы не шли волной."""
+    delay = min(
+        CON.JOB_RETRY_MAX_SECONDS, CON.JOB_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+    )
+    return uniform(delay / 2, delay)
+
+
+def claim(worker_id: str, limit: int = 1) -> list[VideoJob]:
+    """
+    Забирает готовые задачи в аренду.
+
+    На PostgreSQL строки блокируются через SELECT ... FOR UPDATE SKIP LOCKED:
+    воркеры на разных узлах не ждут друг друга и не получают одну задачу
+    дважды. В SQLite такой блокировки нет, и от двойной выдачи защищает
+    условие в UPDATE; транзакция там не нужна, а SELECT и UPDATE внутри неё
+    приводят к "database is locked" при повышении блокировки.
+    """
+    now = timezone.now()
+    jobs = VideoJob.objects.filter(status=VideoJob.QUEUED, run_after__lte=now).order_by(
+        "run_after", "id"
+    )
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    claimed = []
+    with transaction.atomic() if skip_locked else nullcontext():
+        if skip_locked:
+            candidates = jobs.select_for_update(skip_locked=True)[:limit]
+        else:
+            # ? Запас на задачи, которые успеют забрать другие воркеры
+            candidates = jobs[: limit * 5]
+        for id in candidates.values_list("id", flat=True):
+            updated = VideoJob.objects.filter(id=id, status=VideoJob.QUEUED).update(
+                status=VideoJob.RUNNING,
+                attempts=F("attempts") + 1,
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=CON.JOB_LEASE_SECONDS),
+                started_at=now,
+            )
+            if updated:
+                claimed.append(id)
+            if len(claimed) == limit:
+                break
+    return list(VideoJob.objects.filter(id__in=claimed).order_by("run_after", "id"))
+
+
+def heartbeat(job: VideoJob, worker_id: str) -> bool:
+    """Продлевает аренду; False, если задачу уже забрали у этого воркера."""
+    return bool(
+        VideoJob.objects.filter(
+            id=job.id, status=VideoJob.RUNNING, locked_by=worker_id
+        ).update(locked_until=timezone.now() + timedelta(seconds=CON.JOB_LEASE_SECONDS))
+    )
+
+
+def complete(job: VideoJob, worker_id: str, result: dict) -> bool:
+    return bool(
+        VideoJob.objects.filter(
+            id=job.id, status=VideoJob.RUNNING, locked_by=worker_id
+        ).update(
+            status=VideoJob.DONE,
+            result=result,
+            error="",
+            locked_by="",
+            locked_until=None,
+            finished_at=timezone.now(),
+        )
+    )
+
+
+def fail(
+    job: VideoJob, worker_id: str, error: str, expired_before: datetime = None
+) -> bool:
+    """
+    Повтор с задержкой или окончательная ошибка после JOB_MAX_ATTEMPTS.
+
+    С expired_before задача меняется, только если аренда всё ещё истекла:
+    heartbeat между выборкой и UPDATE оставляет её воркеру.
+    """
+    now = timezone.now()
+    lookups = {"locked_until__lt": expired_before} if expired_before else {}
+    if job.attempts >= CON.JOB_MAX_ATTEMPTS:
+        changes = {"status": VideoJob.FAILED, "finished_at": now}
+    else:
+        changes = {
+            "status": VideoJob.QUEUED,
+            "run_after": now + timedelta(seconds=retry_delay(attempt=job.attempts)),
+        }
+    return bool(
+        VideoJob.objects.filter(
+            id=job.id, status=VideoJob.RUNNING, locked_by=worker_id, **lookups
+        ).update(error=error, locked_by="", locked_until=None, **changes)
+    )
+
+
+def requeue_expired() -> int:
+    """Возвращает в очередь задачи воркеров, которые перестали слать heartbeat."""
+    count = 0
+    now = timezone.now()
+    expired = VideoJob.objects.filter(status=VideoJob.RUNNING, locked_until__lt=now)
+    for job in expired.only("id", "attempts", "locked_by"):
+        count += fail(
+            job=job,
+            worker_id=job.locked_by,
+            error=f"Аренда воркера {job.locked_by} истекла",
+            expired_before=now,
+        )
+    return count
+
+
+def run_pipeline(job: VideoJob) -> dict:
+    context = {}
+    for path in settings.VIDEO_PIPELINE:
+        import_string(path)(job, context)
+    return context
+
+
+class Heartbeat(Thread):
+    """Фоновое продление аренды, пока основной поток обрабатывает задачу."""
+
+    def __init__(self, job: VideoJob, worker_id: str) -> None:
+        super().__init__(name=f"heartbeat-{job.id}", daemon=True)
+        self.job = job
+        self.worker_id = worker_id
+        self.lost = Event()
+        self._done = Event()
+
+    def run(self) -> None:
+        try:
+            while not self._done.wait(timeout=CON.JOB_HEARTBEAT_SECONDS):
+                if not heartbeat(job=self.job, worker_id=self.worker_id):
+                    self.lost.set()
+                    return
+        finally:
+            connection.close()
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+class Worker:
+    def __init__(self, worker_id: str) -> None:
+        self.worker_id = worker_id
+        self.stopping = Event()
+
+    def run(self) -> None:
+        logger.info("Worker %s started", self.worker_id)
+        while not self.stopping.is_set():
+            if not self.run_once():
+                # ? Пауза с jitter, чтобы простаивающие воркеры не опрашивали
+                # ? базу синхронно
+                self.stopping.wait(timeout=uniform(0.5, 1.5) * CON.JOB_POLL_SECONDS)
+        logger.info("Worker %s stopped", self.worker_id)
+
+    def run_once(self) -> bool:
+        """Обрабатывает одну задачу; False, если очередь пуста."""
+        requeue_expired()
+        jobs = claim(worker_id=self.worker_id)
+        if not jobs:
+            return False
+        self.process(job=jobs[0])
+        return True
+
+    def process(self, job: VideoJob) -> None:
+        beat = Heartbeat(job=job, worker_id=self.worker_id)
+        beat.start()
+        try:
+            result = run_pipeline(job=job)
+        except Exception as e:
+            beat.stop()
+            logger.exception("Job %s failed on attempt %s", job.id, job.attempts)
+            fail(job=job, worker_id=self.worker_id, error=f"{type(e).__name__}: {e}")
+            return
+        beat.stop()
+        if beat.lost.is_set() or not complete(
+            job=job, worker_id=self.worker_id, result=result
+        ):
+            logger.warning("Job %s lease lost, result discarded", job.id)
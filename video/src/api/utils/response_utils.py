@@ -0,0 +1,22 @@
+from functools import wraps
+from logging import getLogger
+
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = getLogger(__name__)
+
+
+def response_handler(function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            logger.exception("Unhandled error in %s", function.__qualname__)
+            return Response(
+                data={"message": "An error occurred"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+    return wrapper
@@ -0,0 +1,56 @@
+import re
+from urllib.parse import parse_qs, urlsplit
+
+VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+YOUTUBE_HOSTS = {
+    "youtube.com",
+    "m.youtube.com",
+    "music.youtube.com",
+    "youtube-nocookie.com",
+}
+
+# ? Пути, в которых ID идёт следующим сегментом: /embed/<id>, /shorts/<id>
+ID_PATH_PREFIXES = {"embed", "shorts", "live", "v", "e"}
+
+
+def parse_video_id(url: str) -> str | None:
+    """
+    ID видео YouTube из ссылки любого вида или None.
+
+    Разные ссылки на одно видео (watch, youtu.be, shorts, embed, с таймкодом
+    и трекингом) дают один ID, по нему задачи и загрузки не дублируются.
+    """
+    url = url.strip()
+    if VIDEO_ID_RE.match(url):
+        return url
+    if "://" not in url:
+        url = f"https://{url}"
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https"):
+        return None
+    host = (parts.hostname or "").removeprefix("www.")
+    segments = [segment for segment in parts.path.split("/") if segment]
+
+    if host == "youtu.be":
+        candidate = segments[0] if segments else None
+    elif host in YOUTUBE_HOSTS:
+        if segments == ["watch"]:
+            candidate = parse_qs(parts.query).get("v", [None])[0]
+        elif len(segments) >= 2 and segments[0] in ID_PATH_PREFIXES:
+            candidate = segments[1]
+        else:
+            candidate = None
+    else:
+        return None
+
+    if candidate and VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+def canonical_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
@@ -1 +1,70 @@
-from django.shortcuts import render
+from django.conf import settings
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import VideoJob
+from .utils.job_utils import enqueue
+from .utils.response_utils import response_handler
+from .utils.source_utils import parse_video_id
+
+CON = settings.CONSTANTS
+RESP = settings.RESPONSES
+
+
+def job_info(job: VideoJob) -> dict:
+    return {
+        "id": job.id,
+        "videoId": job.video_id,
+        "sourceUrl": job.source_url,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error or None,
+        "result": job.result,
+        "createdAt": job.created_at,
+        "startedAt": job.started_at,
+        "finishedAt": job.finished_at,
+    }
+
+
+class VideoJobsAPIView(APIView):
+    """Постановка видео в очередь; сама обработка идёт в run_video_workers."""
+
+    permission_classes = (IsAuthenticated,)
+
+    @response_handler
+    def get(self, request) -> Response:
+        jobs = VideoJob.objects.filter(requests__user_id=request.user.id).order_by(
+            "-requests__created_at"
+        )[: CON.JOB_LIST_LIMIT]
+        return Response(data={"jobs": [job_info(job=job) for job in jobs]})
+
+    @response_handler
+    def post(self, request) -> Response:
+        url = request.data.get("url", None)
+        if not isinstance(url, str) or not url:
+            return RESP.NOT_ENOUGH_DATA
+        if len(url) > CON.SOURCE_URL_LEN:
+            return RESP.BAD_REQUEST
+        video_id = parse_video_id(url=url)
+        if video_id is None:
+            return RESP.BAD_REQUEST
+
+        job = enqueue(user_id=request.user.id, video_id=video_id)
+        # ? Видео, уже обработанное для другого пользователя, отдаётся сразу
+        if job.status == VideoJob.DONE:
+            return Response(data=job_info(job=job), status=status.HTTP_200_OK)
+        return Response(data=job_info(job=job), status=status.HTTP_202_ACCEPTED)
+
+
+class VideoJobAPIView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @response_handler
+    def get(self, request, id: int) -> Response:
+        try:
+            job = VideoJob.objects.get(id=id, requests__user_id=request.user.id)
+        except VideoJob.DoesNotExist:
+            return RESP.NOT_FOUND
+        return Response(data=job_info(job=job))
@@ -1,48 +1,112 @@
+import sys
 from os import getenv
 from pathlib import Path
 from datetime import timedelta
-from rest_framework.response import Response
 from rest_framework import status
 
 from dotenv import find_dotenv, load_dotenv
 
 load_dotenv(dotenv_path=find_dotenv())
 
+# ? Общий пакет razer_common лежит в корне репозитория (/shared в контейнере)
+sys.path.append(str(Path(__file__).resolve().parents[3] / "shared"))
+
+from razer_common.db import database_settings  # noqa: E402
+from razer_common.responses import StaticResponse  # noqa: E402
+
 
 class CONSTANTS:
     INITIALS_LEN = 100
+    USER_BATCH_CHUNK = 500
+    USER_ETAG_CACHE_SIZE = 1000
+    AUTH_SERVICE_TIMEOUT = 5
+    SOURCE_URL_LEN = 500
+    VIDEO_ID_LEN = 11
+    JOB_STATUS_CHOICES = (
+        (r"queued", r"В очереди"),
+        (r"running", r"Выполняется"),
+        (r"done", r"Готово"),
+        (r"failed", r"Ошибка"),
+    )
+    JOB_LIST_LIMIT = 50
+    # ? Воркер продлевает аренду каждые JOB_HEARTBEAT_SECONDS; задача, аренда
+    # ? которой истекла, считается брошенной и возвращается в очередь
+    JOB_LEASE_SECONDS = int(getenv(key="JOB_LEASE_SECONDS", default=60))
+    JOB_HEARTBEAT_SECONDS = int(getenv(key="JOB_HEARTBEAT_SECONDS", default=15))
+    JOB_MAX_ATTEMPTS = int(getenv(key="JOB_MAX_ATTEMPTS", default=5))
+    JOB_RETRY_BASE_SECONDS = 10
+    JOB_RETRY_MAX_SECONDS = 900
+    JOB_POLL_SECONDS = float(getenv(key="JOB_POLL_SECONDS", default=2))
+    JOB_WORKERS = int(getenv(key="JOB_WORKERS", default=2))
+    VIDEO_MAX_HEIGHT = 720
+    VIDEO_STORE_CHUNK = 1 << 20
+    VIDEO_STORE_QUOTA = int(getenv(key="VIDEO_STORE_QUOTA_MB", default=20480)) << 20
+    # ? Сколько помнить, что у видео нет субтитров, и сколько не вытеснять
+    # ? только что выданный файл
+    VIDEO_STORE_MISSING_TTL = int(getenv(key="VIDEO_STORE_MISSING_TTL", default=21600))
+    VIDEO_STORE_GRACE_SECONDS = 900
+    # ? Процессов-декодеров на задачу, 0 - ядра поровну между JOB_WORKERS
+    FRAME_WORKERS = int(getenv(key="FRAME_WORKERS", default=0))
+    FRAME_MIN_SEGMENT_SECONDS = 120
+    FRAME_THUMB_SIZE = (64, 36)
+    SCENE_HISTOGRAM_BINS = 32
+    SCENE_HISTOGRAM_WEIGHT = 0.7
+    # ? Оценка выше SCENE_CUT_THRESHOLD - всегда смена сцены, ниже MIN - никогда
+    SCENE_CUT_THRESHOLD = float(getenv(key="SCENE_CUT_THRESHOLD", default=0.3))
+    SCENE_CUT_MIN_THRESHOLD = 0.1
+    SCENE_CUT_SIGMA = 4.0
+    SCENE_MIN_SECONDS = 2.0
+    SCENE_MAX_SECONDS = 30.0
+    FRAMES_DIR = "frames"
+    SCREENSHOT_MAX_WIDTH = 1280
+    SCREENSHOT_QUALITY = 85
+    # ? Кадры ближе этих расстояний Хэмминга (из 64 бит) считаются одинаковыми
+    DEDUP_PHASH_RADIUS = 10
+    DEDUP_DHASH_RADIUS = 12
+    # ? Окно, в котором остаётся один кадр из группы, если абзацев ещё нет
+    DEDUP_WINDOW_SECONDS = 60.0
+    # ? Языки субтитров по убыванию предпочтения
+    CAPTION_LANGUAGES = tuple(
+        getenv(key="CAPTION_LANGUAGES", default="ru,en").split(",")
+    )
+    PARAGRAPH_PAUSE_SECONDS = 2.0
+    PARAGRAPH_MIN_SECONDS = 15.0
+    PARAGRAPH_TARGET_SECONDS = 45.0
+    PARAGRAPH_MAX_SECONDS = 90.0
+    # ? Конец предложения ближе этого к смене сцены закрывает абзац раньше
+    SCENE_CUT_TOLERANCE = 1.0
 
 
 class RESPONSES:
-    SUCCESS = Response(
+    SUCCESS = StaticResponse(
         data={"message": "Успешно выполнено"},
         status=status.HTTP_200_OK,
     )
-    BAD_REQUEST = Response(
+    BAD_REQUEST = StaticResponse(
         data={"error": "Неверный запрос"},
         status=status.HTTP_400_BAD_REQUEST,
     )
-    ALREADY_EXISTS = Response(
+    ALREADY_EXISTS = StaticResponse(
         data={"error": "Уже существует"},
         status=status.HTTP_400_BAD_REQUEST,
     )
-    NOT_ENOUGH_DATA = Response(
+    NOT_ENOUGH_DATA = StaticResponse(
         data={"error": "Недостаточно данных"},
         status=status.HTTP_400_BAD_REQUEST,
     )
-    INVALID_CRED = Response(
+    INVALID_CRED = StaticResponse(
         data={"error": "Неверные данные"},
         status=status.HTTP_400_BAD_REQUEST,
     )
-    INVALID_TOKEN = Response(
+    INVALID_TOKEN = StaticResponse(
         data={"error": "Невалидный токен"},
         status=status.HTTP_401_UNAUTHORIZED,
     )
-    NOT_FOUND = Response(
+    NOT_FOUND = StaticResponse(
         data={"error": "Не найдено"},
         status=status.HTTP_404_NOT_FOUND,
     )
-    SERVER_ERROR = Response(
+    SERVER_ERROR = StaticResponse(
         data={"error": "Ошибка сервера"},
         status=status.HTTP_500_INTERNAL_SERVER_ERROR,
     )
@@ -50,14 +114,30 @@ class RESPONSES:
 
 SECRET_KEY = getenv(key="SECRET_KEY")
 
+JWT_ALGORITHM = getenv(key="JWT_ALGORITHM", default="HS256")
+
+JWT_PRIVATE_KEY_FILE = getenv(key="JWT_PRIVATE_KEY_FILE")
+
+JWT_PUBLIC_KEY_FILE = getenv(key="JWT_PUBLIC_KEY_FILE")
+
+JWT_JWKS_URL = getenv(key="JWT_JWKS_URL")
+
+JWT_JWKS_TTL = int(getenv(key="JWT_JWKS_TTL", default=300))
+
+SERVICE_API_KEY = getenv(key="SERVICE_API_KEY")
+
+AUTH_SERVICE_URL = getenv(key="AUTH_SERVICE_URL", default="http://auth:8000")
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-DEBUG = True
+# ? По умолчанию DEBUG выключен, docker-compose для разработки ставит DEBUG=1
+DEBUG = getenv(key="DEBUG", default="0") == "1"
 
 ALLOWED_HOSTS = [
     "localhost",
     "127.0.0.1",
     "0.0.0.0",
+    *filter(None, getenv(key="ALLOWED_HOSTS", default="").split(",")),
 ]
 
 INSTALLED_APPS = [
@@ -74,6 +154,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "razer_common.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -86,6 +167,20 @@ MIDDLEWARE = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+METRICS_SLOW_REQUEST_MS = int(getenv(key="METRICS_SLOW_REQUEST_MS", default=1000))
+
+METRICS_TOKEN = getenv(key="METRICS_TOKEN")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "razer": {"handlers": ["console"], "level": getenv("LOG_LEVEL", "INFO")},
+        "api": {"handlers": ["console"], "level": getenv("LOG_LEVEL", "INFO")},
+    },
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
     "http://0.0.0.0:3000",
@@ -104,7 +199,7 @@ CSRF_TRUSTED_ORIGINS = [
     "http://localhost:8000",
 ]
 
-ROOT_URLCONF = "backend.urls"
+ROOT_URLCONF = "configs.urls"
 
 TEMPLATES = [
     {
@@ -122,13 +217,42 @@ TEMPLATES = [
     },
 ]
 
-WSGI_APPLICATION = "backend.wsgi.application"
+WSGI_APPLICATION = "configs.wsgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+DATABASES = database_settings(base_dir=BASE_DIR)
+
+DATABASE_ROUTERS = ["razer_common.db.ReplicaRouter"]
+
+# ? Поколения сессий: auth пишет их без срока жизни, video читает. Общий
+# ? для обоих сервисов только Redis; без него video спрашивает auth
+SESSION_CACHE_URL = getenv(key="SESSION_CACHE_URL", default=getenv(key="REDIS_URL"))
+SESSION_CACHE_SHARED = bool(SESSION_CACHE_URL)
+
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": getenv(key="REDIS_URL"),
+        }
+        if getenv(key="REDIS_URL")
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    ),
+    "sessions": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": SESSION_CACHE_URL,
+            "TIMEOUT": None,
+            "KEY_PREFIX": "razer",
+        }
+        if SESSION_CACHE_SHARED
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "sessions",
+            "TIMEOUT": None,
+        }
+    ),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -156,12 +280,45 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# ? В образе статика собирается вне /app, чтобы её не перекрывал bind mount
+STATIC_ROOT = Path(getenv(key="STATIC_ROOT", default=BASE_DIR / "static"))
+
+MEDIA_URL = "media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# ? Этапы обработки VideoJob по порядку: функции (job, context) -> None,
+# ? которые дополняют context; итоговый context сохраняется в job.result
+VIDEO_PIPELINE = [
+    "api.utils.ingest_utils.ingest",
+    "api.utils.frame_utils.keyframes",
+    "api.utils.caption_utils.paragraphs",
+    "api.utils.dedup_utils.dedup",
+]
+
+# ? Скачанные видео; на каждом узле с воркерами своё хранилище
+VIDEO_STORE_DIR = Path(getenv(key="VIDEO_STORE_DIR", default=BASE_DIR / "store"))
+
+# ? Загрузчик видео; LocalFetcher берёт файлы из VIDEO_LOCAL_SOURCE_DIR
+VIDEO_FETCHER = getenv(
+    key="VIDEO_FETCHER", default="api.utils.ingest_utils.YtDlpFetcher"
+)
+
+VIDEO_LOCAL_SOURCE_DIR = getenv(key="VIDEO_LOCAL_SOURCE_DIR")
+
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+    "DEFAULT_RENDERER_CLASSES": (
+        "razer_common.fastjson.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "razer_common.fastjson.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("api.authentication.ClaimsAuthentication",),
 }
 
 SIMPLE_JWT = {
@@ -170,9 +327,13 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
     "UPDATE_LAST_LOGIN": True,
-    "ALGORITHM": "HS256",
-    "SIGNING_KEY": SECRET_KEY,
-    "VERIFYING_KEY": "",
+    "ALGORITHM": JWT_ALGORITHM,
+    "SIGNING_KEY": (
+        Path(JWT_PRIVATE_KEY_FILE).read_text() if JWT_PRIVATE_KEY_FILE else SECRET_KEY
+    ),
+    "VERIFYING_KEY": (
+        Path(JWT_PUBLIC_KEY_FILE).read_text() if JWT_PUBLIC_KEY_FILE else ""
+    ),
     "AUDIENCE": None,
     "ISSUER": None,
     "JSON_ENCODER": None,
@@ -1,6 +1,11 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
+from razer_common.metrics import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-]
+    path("api/", include("api.urls")),
+    path("metrics", metrics_view, name="metrics"),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)